@@ -0,0 +1,114 @@
+"""Latency and prompt size of the two-call vs single-call engine modes.
+
+Run from the webq_be directory:
+
+    python benchmarks/bench_engine_modes.py [--latency-ms 350] [--per-1k-tokens-ms 40]
+
+The LLM is simulated: each completion sleeps for a fixed round-trip latency
+plus a prompt-size-dependent component, and answers with valid JSON for
+whichever prompt it receives. No database or API key is needed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webq_be.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from webq_app.ai_engine import AIRecommendationEngine  # noqa: E402
+from webq_app.catalog import CatalogSnapshot  # noqa: E402
+from webq_app.llm_cache import NullResponseCache  # noqa: E402
+from webq_app.models import LearningResource, Student  # noqa: E402
+
+
+def approx_tokens(text):
+    # Rough rule of thumb for English/JSON with Llama tokenizers
+    return len(text) // 4
+
+
+class SimulatedCompletions:
+    def __init__(self, latency_ms, per_1k_tokens_ms, resource_ids):
+        self.latency_ms = latency_ms
+        self.per_1k_tokens_ms = per_1k_tokens_ms
+        self.resource_ids = resource_ids
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def create(self, messages, **kwargs):
+        prompt = messages[0]['content']
+        tokens = approx_tokens(prompt)
+        self.calls += 1
+        self.prompt_tokens += tokens
+        time.sleep((self.latency_ms + self.per_1k_tokens_ms * tokens / 1000) / 1000)
+
+        analysis = {"strengths": ["Consistency"], "weaknesses": [], "learning_style": "visual",
+                    "recommended_focus_areas": ["Practice"]}
+        recommendations = [
+            {"resource_id": rid, "confidence_score": 0.8, "reason": "Good fit"}
+            for rid in self.resource_ids[:5]
+        ]
+        if '"analysis"' in prompt:
+            body = {"analysis": analysis, "recommendations": recommendations}
+        elif '"recommendations"' in prompt:
+            body = {"recommendations": recommendations}
+        else:
+            body = analysis
+        content = json.dumps(body)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=350.0)
+    parser.add_argument('--per-1k-tokens-ms', type=float, default=40.0)
+    args = parser.parse_args()
+
+    resources = [
+        LearningResource(
+            pk=i + 1, resource_id=f'RES{i:03d}', title=f'Resource {i}', type='video',
+            difficulty_level='intermediate', course_id='CS101', recommendation_priority=5,
+        )
+        for i in range(50)
+    ]
+    catalog = CatalogSnapshot(resources, version=0)
+    # Unsaved, so it has no enrollments and the prompt skips course lists
+    student = Student(student_id='BENCH', performance_score=68.0)
+
+    print(f"{'mode':>12} {'calls/req':>10} {'prompt tok/req':>15} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode in AIRecommendationEngine.MODES:
+        engine = AIRecommendationEngine()
+        completions = SimulatedCompletions(
+            args.latency_ms, args.per_1k_tokens_ms, [r.resource_id for r in resources]
+        )
+        engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        engine.model = 'simulated'
+        engine.cache = NullResponseCache()
+
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            engine.generate_recommendations(
+                student, 5, catalog=catalog, existing_resource_ids=set(), mode=mode
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(
+            f"{mode:>12} {completions.calls / args.iterations:>10.1f}"
+            f" {completions.prompt_tokens / args.iterations:>15.0f}"
+            f" {statistics.median(timings):>9.1f} {p95:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Per-request overhead: a new AIRecommendationEngine per call vs the shared one.
+
+Run from the webq_be directory:
+
+    python benchmarks/bench_engine_reuse.py [--requests 200]
+
+A local HTTP server stands in for the Groq API and answers instantly, so
+the timings are client-side overhead: building the Groq client and opening
+a fresh connection per request, versus reusing pooled keep-alive
+connections. Over TLS to the real API the gap is larger.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webq_be.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test.utils import override_settings  # noqa: E402
+from webq_app.ai_engine import AIRecommendationEngine  # noqa: E402
+from webq_app.engine_registry import get_engine, reset_engine  # noqa: E402
+
+RESPONSE = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": AIRecommendationEngine.MODEL,
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "{\"strengths\": []}"},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        CompletionHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, engine_factory, requests):
+    CompletionHandler.connections = 0
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        engine_factory()._chat("benchmark prompt", use_cache=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{label:>22} {statistics.mean(timings):>9.3f} {statistics.median(timings):>9.3f}"
+        f" {timings[int(len(timings) * 0.99) - 1]:>9.3f} {CompletionHandler.connections:>12}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with override_settings(GROQ_API_KEY='bench', GROQ_BASE_URL=base_url, LLM_CACHE_BACKEND='none'):
+        print(f"{'engine':>22} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'connections':>12}")
+        run('new per request', AIRecommendationEngine, args.requests)
+        run('shared (registry)', get_engine, args.requests)
+        reset_engine()
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Throughput of the rule-based fallback ranker: Python loop vs NumPy scorer.
+
+Run from the webq_be directory:
+
+    python benchmarks/bench_fallback_scoring.py [--sizes 1000 100000 1000000]
+
+No database is needed; resources are synthetic in-memory rows.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webq_be.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from webq_app import scoring  # noqa: E402
+from webq_app.models import LearningResource  # noqa: E402
+
+TYPES = [t for t, _ in LearningResource.RESOURCE_TYPES]
+LEVELS = [d for d, _ in LearningResource.DIFFICULTY_LEVELS]
+
+
+def make_resources(size, rng):
+    return [
+        SimpleNamespace(
+            pk=i + 1,
+            id=i + 1,
+            resource_id=f'RES{i:07d}',
+            type=rng.choice(TYPES),
+            difficulty_level=rng.choice(LEVELS),
+            recommendation_priority=rng.randint(1, 10),
+        )
+        for i in range(size)
+    ]
+
+
+def loop_top_k(resources, performance_score, k, exclude):
+    target_difficulty, target_types = scoring.fallback_targets(performance_score)
+    scored = []
+    for resource in resources:
+        if resource.id in exclude:
+            continue
+        score, reason = scoring.score_resource(resource, performance_score, target_difficulty, target_types)
+        scored.append((resource, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:k]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'resources':>10} {'score':>6} {'loop ms':>10} {'numpy ms':>10} {'numpy rows/s':>14} {'speedup':>8}")
+
+    for size in args.sizes:
+        resources = make_resources(size, rng)
+        arrays = scoring.ScoringArrays.from_resources(resources)
+        exclude = {r.pk for r in rng.sample(resources, min(size, 50))}
+
+        for performance_score in (40.0, 80.0):
+            loop = loop_top_k(resources, performance_score, args.k, exclude)
+            positions, _ = scoring.top_k(arrays, performance_score, args.k, exclude)
+            assert [r.pk for r, _ in loop] == [resources[p].pk for p in positions], 'rankings differ'
+
+            loop_time = best_of(lambda: loop_top_k(resources, performance_score, args.k, exclude), args.repeat)
+            numpy_time = best_of(lambda: scoring.top_k(arrays, performance_score, args.k, exclude), args.repeat)
+            print(
+                f"{size:>10} {performance_score:>6.0f} {loop_time * 1000:>10.2f} {numpy_time * 1000:>10.2f}"
+                f" {size / numpy_time:>14,.0f} {loop_time / numpy_time:>7.1f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""gunicorn settings: ``gunicorn`` picks this file up when started from webq_be/.
+
+Sets up Prometheus multiprocess mode so /metrics aggregates every worker
+instead of reporting whichever worker happened to answer the scrape, and
+saves the similarity index so restarts don't re-tokenize the whole catalog.
+Workers close their pooled LLM clients on the way out.
+"""
+import glob
+import os
+import re
+import tempfile
+
+wsgi_app = 'webq_be.wsgi:application'
+
+os.environ.setdefault('SIMILARITY_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'webq_similarity_index.npz'))
+
+
+def on_starting(server):
+    # Workers inherit this; they must not have imported prometheus_client
+    # yet, so don't combine it with --preload. Without an explicit
+    # PROMETHEUS_MULTIPROC_DIR each instance gets its own directory, named
+    # after its bind addresses, so two servers on one host never share one.
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not multiproc_dir:
+        instance = re.sub(r'[^A-Za-z0-9]+', '_', '_'.join(server.cfg.bind)).strip('_')
+        multiproc_dir = os.path.join(tempfile.gettempdir(), f'webq_prometheus_{instance}')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = multiproc_dir
+    os.makedirs(multiproc_dir, exist_ok=True)
+    # Samples from a previous run would otherwise be summed into this one.
+    # Only the metric files: the directory may be one the operator chose.
+    for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+        os.remove(path)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker, which then leaves through os._exit, skipping the
+    # atexit hook that would close the pooled LLM clients
+    try:
+        from webq_app import engine_registry
+        engine_registry.reset_engine()
+    except Exception as e:
+        server.log.error(f"Failed to close LLM clients in worker {worker.pid}: {e}")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
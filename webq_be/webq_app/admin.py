@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Student, LearningResource, Recommendation
+from .models import (
+    Student, LearningResource, Recommendation, LLMResponseCacheEntry, RecommendationJob,
+    AnalyticsRollup, Course, Enrollment
+)
+
+class EnrollmentInline(admin.TabularInline):
+    model = Enrollment
+    extra = 0
+    autocomplete_fields = ('course',)
+    readonly_fields = ('created_at', 'updated_at')
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
@@ -13,13 +22,20 @@ class StudentAdmin(admin.ModelAdmin):
             'fields': ('student_id', 'name', 'email')
         }),
         ('Performance Data', {
-            'fields': ('performance_score', 'completed_courses', 'pending_courses')
+            'fields': ('performance_score',)
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         })
     )
+    inlines = (EnrollmentInline,)
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
+    readonly_fields = ('created_at',)
 
 @admin.register(LearningResource)
 class LearningResourceAdmin(admin.ModelAdmin):
@@ -61,4 +77,24 @@ class RecommendationAdmin(admin.ModelAdmin):
         })
     )
     
-    readonly_fields = ('recommendation_date',)
\ No newline at end of file
+    readonly_fields = ('recommendation_date',)
+
+@admin.register(LLMResponseCacheEntry)
+class LLMResponseCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'model', 'created_at', 'expires_at')
+    list_filter = ('model',)
+    search_fields = ('key',)
+    readonly_fields = ('created_at',)
+
+@admin.register(RecommendationJob)
+class RecommendationJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'student', 'status', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('job_id', 'student__student_id')
+    readonly_fields = ('job_id', 'created_at', 'started_at', 'finished_at')
+
+@admin.register(AnalyticsRollup)
+class AnalyticsRollupAdmin(admin.ModelAdmin):
+    list_display = ('metric', 'value', 'updated_at')
+    search_fields = ('metric',)
+    readonly_fields = ('updated_at',)
@@ -1,27 +1,115 @@
 import logging
 import json
+import math
 import re
-from typing import List, Dict, Any
+import copy
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from groq import Groq
 from .models import Student, LearningResource, Recommendation
+from .catalog import CatalogSnapshot, get_catalog
+from . import candidates, metrics, resilience, scoring, timing
+from .llm_cache import get_response_cache, make_cache_key
+from .llm_transport import get_transport, transport_available
 
 logger = logging.getLogger(__name__)
 
 
-class AIRecommendationEngine:
+class RecommendationStreamParser:
+    """Pulls complete recommendation objects out of a partially streamed response"""
+
     def __init__(self):
-        if getattr(settings, "GROQ_API_KEY", None):
+        self.buffer = ""
+        self.position = None  # index just inside the recommendations array
+        self.finished = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> List[Dict]:
+        self.buffer += text
+        parsed = []
+        if self.position is None:
+            key = self.buffer.find('"recommendations"')
+            bracket = self.buffer.find("[", key) if key != -1 else -1
+            if bracket == -1:
+                return parsed
+            self.position = bracket + 1
+
+        while not self.finished:
+            # Skip separators between array items
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n,":
+                self.position += 1
+            if self.position >= len(self.buffer):
+                break
+            if self.buffer[self.position] == "]":
+                self.finished = True
+                break
             try:
-                self.client = Groq(api_key=settings.GROQ_API_KEY)
-                self.model = "llama-3.1-8b-instant" # model used
+                item, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                break  # object not complete yet
+            self.position = end
+            if isinstance(item, dict):
+                parsed.append(item)
+        return parsed
+
+
+class AIRecommendationEngine:
+    temperature = 0.4
+
+    # Generation modes: analysis and ranking as two LLM calls, as one, or
+    # ranked locally by content similarity without the LLM
+    MODE_TWO_CALL = 'two_call'
+    MODE_SINGLE_CALL = 'single_call'
+    MODE_SIMILARITY = 'similarity'
+    MODES = [MODE_TWO_CALL, MODE_SINGLE_CALL, MODE_SIMILARITY]
+
+    RELATED_SIMILARITY = 0.2  # cosine above which a reason names the pending courses
+
+    MODEL = "llama-3.1-8b-instant"  # model used
+
+    def __init__(self, client=None, async_client_provider=None):
+        """Build clients from settings, or use shared ones.
+
+        ``client`` is a ready Groq client and ``async_client_provider`` a
+        callable returning the AsyncGroq client for the running event loop;
+        see engine_registry, which shares pooled clients across requests.
+        """
+        self.cache = get_response_cache()
+        self._async_client = None
+        self._async_client_provider = async_client_provider
+        if client is not None:
+            self.client = client
+            self.model = self.MODEL
+        elif transport_available(get_transport()):
+            try:
+                transport = get_transport()
+                kwargs = {
+                    "api_key": getattr(settings, "GROQ_API_KEY", None) or None,
+                    "base_url": getattr(settings, "GROQ_BASE_URL", None) or None,
+                    "max_retries": 0,  # resilience.LLMCallPolicy retries within the latency budget
+                }
+                self.client = transport.client_class(**kwargs)
+                self._async_client = transport.async_client_class(**kwargs)
+                self.model = self.MODEL
                 logger.info("Groq AI model initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Groq client: {e}")
-                self.client, self.model = None, None
+                self.client, self._async_client, self.model = None, None, None
         else:
             logger.warning("Groq API key not configured. Using fallback logic.")
             self.client, self.model = None, None
+
+    @property
+    def async_client(self):
+        if self._async_client_provider is not None:
+            return self._async_client_provider()
+        return self._async_client
+
+    @async_client.setter
+    def async_client(self, value):
+        self._async_client_provider = None
+        self._async_client = value
     
     def clean_ai_response(self,ai_text):
         # Remove code fences
@@ -30,50 +118,159 @@ class AIRecommendationEngine:
         ai_text = re.sub(r"//.*", "", ai_text)
         return ai_text.strip()
 
-    def _chat(self, prompt: str) -> str:
-        """Send prompt to Groq and return response text"""
+    def _completion_params(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": 800,
+            "top_p": 1,
+        }
+
+    def _request_params(self, prompt: str, timeout=None, **extra) -> Dict[str, Any]:
+        params = {**self._completion_params(prompt), **extra}
+        # Omit rather than pass None, which the Groq client reads as "no timeout"
+        if timeout is not None:
+            params["timeout"] = timeout
+        return params
+
+    def _create(self, prompt: str, timeout=None):
+        """One completion attempt, timed and counted for /metrics"""
+        try:
+            with metrics.LLM_CALLS['chat'].time():
+                return self.client.chat.completions.create(**self._request_params(prompt, timeout))
+        except Exception as e:
+            metrics.record_llm_error(e)
+            raise
+
+    def _cache_get(self, cache_key: str) -> Optional[str]:
+        """Cached response, or None on a miss or when the cache can't be read"""
+        try:
+            return self.cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"LLM response cache lookup failed: {e}")
+            return None
+
+    def _cache_set(self, cache_key: str, content: str) -> None:
+        try:
+            self.cache.set(cache_key, content, model=self.model)
+        except Exception as e:
+            logger.error(f"Failed to cache LLM response: {e}")
+
+    def _chat(self, prompt: str, use_cache: bool = True) -> str:
+        """Send prompt to Groq and return response text
+
+        Identical prompts are answered from the response cache unless
+        ``use_cache`` is False; the fresh response is still stored. The call
+        runs under the shared resilience policy (budget, retries, breaker).
+        """
         if not self.client or not self.model:
             return ""
 
+        cache_key = make_cache_key(self.model, self.temperature, prompt)
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("Serving Groq response from cache")
+                return cached
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.4,
-                max_tokens=800,
-                top_p=1,
-            )
+            with timing.phase('llm'):
+                response = resilience.get_policy().call(lambda timeout: self._create(prompt, timeout))
             # print(response.choices[0].message.content.strip())
-            return response.choices[0].message.content.strip()
-        
+            content = response.choices[0].message.content.strip()
+
+        except resilience.CallSkipped as e:
+            logger.warning(f"Skipping Groq call: {e}")
+            metrics.LLM_SKIPPED.labels(e.reason).inc()
+            return ""
         except Exception as e:
             logger.error(f"Groq API call failed: {e}")
             return ""
 
-    def analyze_student_performance(self, student: Student) -> Dict[str, Any]:
-        """Analyze student performance and generate insights"""
-        performance_data = {
+        if content:
+            self._cache_set(cache_key, content)
+        return content
+
+    @timing.timed('llm')
+    def _chat_stream(self, prompt: str, use_cache: bool = True,
+                     deadline: resilience.Deadline = None) -> Iterator[str]:
+        """Like _chat, but yields the response text as Groq streams it
+
+        Only the latency budget and the circuit breaker apply: a retried or
+        hedged stream could repeat text that was already sent.
+        """
+        if not self.client or not self.model:
+            return
+
+        cache_key = make_cache_key(self.model, self.temperature, prompt)
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        policy = resilience.get_policy()
+        try:
+            timeout = policy.admit(deadline)
+        except resilience.CallSkipped as e:
+            logger.warning(f"Skipping Groq streaming call: {e}")
+            metrics.LLM_SKIPPED.labels(e.reason).inc()
+            return
+        start = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(**self._request_params(prompt, timeout, stream=True))
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error(f"Groq streaming call failed: {e}")
+            metrics.record_llm_error(e)
+            policy.settle(e)
+            return
+        except BaseException:
+            # GeneratorExit: the client went away mid-stream, so no outcome
+            policy.abandon()
+            raise
+        policy.settle()
+        # Includes the time our consumer spent between chunks
+        metrics.LLM_CALLS['stream'].observe(time.perf_counter() - start)
+
+        content = "".join(parts).strip()
+        if content:
+            self._cache_set(cache_key, content)
+
+    def _performance_data(self, student: Student) -> Dict[str, Any]:
+        # One enrollment read (or none when prefetched) for both lists
+        courses = student.get_courses()
+        completed_courses = courses['completed']
+        pending_courses = courses['pending']
+        return {
             "student_id": student.student_id,
             "performance_score": student.performance_score,
-            "completed_courses": student.get_completed_courses(),
-            "pending_courses": student.get_pending_courses(),
-            "total_completed": len(student.get_completed_courses()),
-            "total_pending": len(student.get_pending_courses()),
+            "completed_courses": completed_courses,
+            "pending_courses": pending_courses,
+            "total_completed": len(completed_courses),
+            "total_pending": len(pending_courses),
         }
 
-        logger.info(f"Analyzing student {student.student_id} with score {student.performance_score}")
-
+    def _base_analysis(self, performance_score: float) -> Dict[str, Any]:
         # Determine performance category
-        if student.performance_score >= 85:
+        if performance_score >= 85:
             category = "excellent"
-        elif student.performance_score >= 70:
+        elif performance_score >= 70:
             category = "good"
-        elif student.performance_score >= 50:
+        elif performance_score >= 50:
             category = "average"
         else:
             category = "needs_improvement"
 
-        analysis = {
+        return {
             "performance_category": category,
             "strengths": [],
             "weaknesses": [],
@@ -81,12 +278,35 @@ class AIRecommendationEngine:
             "recommended_focus_areas": [],
         }
 
+    def _existing_resource_ids(self, student: Student, existing_resource_ids=None):
+        """Pks of the resources already recommended to the student"""
+        if existing_resource_ids is None:
+            existing_resource_ids = set(
+                student.recommendation_set.values_list('resource__id', flat=True)
+            )
+        return existing_resource_ids
+
+    def _candidates(self, performance_data: Dict, catalog: CatalogSnapshot, existing_resource_ids) -> str:
+        """Shortlisted resources for the prompt, as a JSON array"""
+        return candidates.prompt_block(catalog, performance_data, existing_resource_ids)
+
+    @resilience.budgeted
+    def analyze_student_performance(self, student: Student, use_cache: bool = True,
+                                    performance_data: Dict = None) -> Dict[str, Any]:
+        """Analyze student performance and generate insights"""
+        if performance_data is None:
+            performance_data = self._performance_data(student)
+
+        logger.info(f"Analyzing student {student.student_id} with score {student.performance_score}")
+
+        analysis = self._base_analysis(student.performance_score)
+
         # AI-powered analysis if Groq is available
         if self.client:
             try:
                 prompt = self._create_analysis_prompt(performance_data)
                 logger.info("Sending analysis prompt to Groq")
-                ai_response = self._chat(prompt)
+                ai_response = self._chat(prompt, use_cache)
 
                 logger.info(f"Groq analysis response: {ai_response[:200]}...")
                 ai_analysis = self._parse_ai_analysis(ai_response)
@@ -102,35 +322,350 @@ class AIRecommendationEngine:
 
         return analysis
 
-    def generate_recommendations(self, student: Student, max_recommendations: int = 5) -> List[Dict]:
-        """Generate personalized learning recommendations"""
+    @resilience.budgeted
+    def generate_recommendations(self, student: Student, max_recommendations: int = 5,
+                                 catalog: CatalogSnapshot = None,
+                                 existing_resource_ids=None, use_cache: bool = True,
+                                 mode: str = None) -> List[Dict]:
+        """Generate personalized learning recommendations
+
+        Batch callers can pass the catalog snapshot and the set of resource
+        pks the student already has to avoid per-student queries. ``mode``
+        overrides the AI_ENGINE_MODE setting for this call. Both LLM calls
+        share one LLM_LATENCY_BUDGET; once it is spent, the rule-based
+        ranking answers.
+        """
         logger.info(f"Generating recommendations for student {student.student_id}")
 
-        analysis = self.analyze_student_performance(student)
-        available_resources = LearningResource.objects.all()
+        mode = self._resolve_mode(mode)
+        if mode == self.MODE_SIMILARITY:
+            return self._similarity_recommendations(
+                student, catalog if catalog is not None else get_catalog(),
+                max_recommendations, existing_resource_ids
+            )
+        if mode == self.MODE_SINGLE_CALL and self.client:
+            return self._single_call_recommendations(
+                student, catalog if catalog is not None else get_catalog(),
+                max_recommendations, existing_resource_ids, use_cache
+            )
+
+        performance_data = self._performance_data(student)
+        analysis = self.analyze_student_performance(student, use_cache, performance_data)
+        available_resources = catalog if catalog is not None else get_catalog()
 
-        logger.info(f"Total available resources: {available_resources.count()}")
+        logger.info(f"Total available resources: {len(available_resources)}")
 
         recommendations = []
         if self.client:
+            existing_resource_ids = self._existing_resource_ids(student, existing_resource_ids)
             try:
                 logger.info("Using AI for recommendation generation")
-                recommendations = self._ai_generate_recommendations(
-                    student, analysis, available_resources, max_recommendations
-                )
-                logger.info(f"AI generated {len(recommendations)} recommendations")
+                ai_response = self._chat(self._two_call_prompt(
+                    analysis, performance_data, available_resources,
+                    existing_resource_ids, max_recommendations
+                ), use_cache)
+                recommendations = self._two_call_result(ai_response, available_resources)
             except Exception as e:
                 logger.error(f"AI recommendation generation failed: {e}")
-                recommendations = self._fallback_recommendations(
-                    student, analysis, available_resources, max_recommendations
-                )
+
+        return self._ai_or_fallback(
+            recommendations, mode, student, analysis, available_resources,
+            max_recommendations, existing_resource_ids
+        )
+
+    def stream_recommendations(self, student: Student, max_recommendations: int = 5,
+                               catalog: CatalogSnapshot = None, existing_resource_ids=None,
+                               use_cache: bool = True, mode: str = None) -> Iterator[Tuple[str, Dict]]:
+        """Yield (event, payload) pairs as results become available.
+
+        The rule-based analysis comes first. In two-call mode the AI analysis
+        follows, then each validated recommendation as soon as it is parsed
+        from the streamed completion, with the rule-based ranking as the
+        fallback if the completion has no recommendations array. The other
+        modes answer in one piece, so their recommendations follow together.
+        """
+        mode = self._resolve_mode(mode)
+        performance_data = self._performance_data(student)
+        analysis = self._base_analysis(student.performance_score)
+        if catalog is None:
+            catalog = get_catalog()
+
+        fallback_analysis = self._fallback_analysis(performance_data, copy.deepcopy(analysis))
+        yield "analysis", {"source": "rule_based", "analysis": fallback_analysis}
+
+        if mode != self.MODE_TWO_CALL:
+            for rec in self.generate_recommendations(
+                student, max_recommendations, catalog, existing_resource_ids, use_cache, mode
+            ):
+                yield "recommendation", rec
+            return
+        # Set explicitly: a budget() block can't stay open across yields
+        deadline = resilience.Deadline()
+
+        if not self.client:
+            metrics.record_path('fallback', 'stream')
+            for rec in self._fallback_recommendations(
+                student, fallback_analysis, catalog, max_recommendations, existing_resource_ids
+            ):
+                yield "recommendation", rec
+            return
+
+        try:
+            with resilience.budget(deadline):
+                ai_response = self._chat(self._create_analysis_prompt(performance_data), use_cache)
+            analysis.update(self._parse_ai_analysis(ai_response))
+        except Exception as e:
+            logger.error(f"AI analysis failed: {e}")
+            analysis = fallback_analysis
+        yield "analysis", {"source": "ai", "analysis": analysis}
+
+        parser = RecommendationStreamParser()
+        seen = set()
+        existing_resource_ids = self._existing_resource_ids(student, existing_resource_ids)
+        prompt = self._create_recommendation_prompt(
+            analysis, self._candidates(performance_data, catalog, existing_resource_ids), max_recommendations
+        )
+        for delta in self._chat_stream(prompt, use_cache, deadline):
+            for rec in self._validate_recommendations(parser.feed(delta), catalog):
+                if rec["resource"].pk in seen or len(seen) >= max_recommendations:
+                    continue
+                seen.add(rec["resource"].pk)
+                yield "recommendation", rec
+
+        if seen or parser.position is not None:
+            metrics.record_path('ai', 'stream')
         else:
-            recommendations = self._fallback_recommendations(
-                student, analysis, available_resources, max_recommendations
-            )
+            # Nothing usable came back at all: fall back to the rule-based ranking
+            metrics.record_path('fallback', 'stream')
+            for rec in self._fallback_recommendations(
+                student, analysis, catalog, max_recommendations, existing_resource_ids
+            ):
+                yield "recommendation", rec
+
+    def _resolve_mode(self, mode: str = None) -> str:
+        mode = mode or getattr(settings, 'AI_ENGINE_MODE', self.MODE_TWO_CALL)
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown engine mode {mode!r}. Must be one of: {self.MODES}")
+        return mode
+
+    def _single_call_recommendations(self, student: Student, catalog: CatalogSnapshot,
+                                     max_recommendations: int, existing_resource_ids=None,
+                                     use_cache: bool = True) -> List[Dict]:
+        """Analysis and ranking from one structured prompt and response"""
+        performance_data = self._performance_data(student)
+        analysis = self._base_analysis(student.performance_score)
+        existing_resource_ids = self._existing_resource_ids(student, existing_resource_ids)
+
+        recommendations = []
+        try:
+            logger.info("Using single-call AI analysis and recommendation generation")
+            ai_response = self._chat(self._single_call_prompt(
+                performance_data, catalog, existing_resource_ids, max_recommendations
+            ), use_cache)
+            recommendations = self._single_call_result(ai_response, analysis, catalog)
+        except Exception as e:
+            logger.error(f"AI recommendation generation failed: {e}")
+        return self._ai_or_fallback(
+            recommendations, self.MODE_SINGLE_CALL, student, analysis, catalog,
+            max_recommendations, existing_resource_ids
+        )
+
+    # Steps shared by the sync and async pipelines; only the LLM call differs
 
+    def _single_call_prompt(self, performance_data: Dict, catalog: CatalogSnapshot,
+                            existing_resource_ids, max_recommendations: int) -> str:
+        return self._create_combined_prompt(
+            performance_data, self._candidates(performance_data, catalog, existing_resource_ids),
+            max_recommendations
+        )
+
+    def _single_call_result(self, ai_response: str, analysis: Dict, catalog: CatalogSnapshot) -> List[Dict]:
+        """Validated recommendations from a combined response; its analysis is merged into ``analysis``"""
+        logger.info(f"Groq combined response: {ai_response[:200]}...")
+        ai_analysis, ai_recs = self._parse_ai_combined(ai_response)
+        analysis.update(ai_analysis)
+        recommendations = self._validate_recommendations(ai_recs, catalog)
+        logger.info(f"AI generated {len(recommendations)} recommendations")
+        return recommendations
+
+    def _two_call_prompt(self, analysis: Dict, performance_data: Dict, catalog: CatalogSnapshot,
+                         existing_resource_ids, max_recommendations: int) -> str:
+        return self._create_recommendation_prompt(
+            analysis, self._candidates(performance_data, catalog, existing_resource_ids),
+            max_recommendations
+        )
+
+    def _two_call_result(self, ai_response: str, catalog: CatalogSnapshot) -> List[Dict]:
+        logger.info(f"Groq recommendation response: {ai_response[:200]}...")
+        recommendations = self._validate_recommendations(self._parse_ai_recommendations(ai_response), catalog)
+        logger.info(f"AI generated {len(recommendations)} recommendations")
         return recommendations
 
+    def _ai_or_fallback(self, recommendations: List[Dict], mode: str, student: Student, analysis: Dict,
+                        catalog: CatalogSnapshot, max_recommendations: int,
+                        existing_resource_ids=None) -> List[Dict]:
+        """The AI recommendations, or the rule-based ranking when there are none"""
+        # No client, a failed call, or nothing usable in the response
+        if recommendations:
+            metrics.record_path('ai', mode)
+            return recommendations
+        metrics.record_path('fallback', mode)
+        return self._fallback_recommendations(
+            student, analysis, catalog, max_recommendations, existing_resource_ids
+        )
+
+    def _similarity_recommendations(self, student: Student, catalog: CatalogSnapshot,
+                                    max_recommendations: int, existing_resource_ids=None,
+                                    performance_data: Dict = None) -> List[Dict]:
+        """Rule scores plus content similarity to the pending courses, no LLM call"""
+        if performance_data is None:
+            performance_data = self._performance_data(student)
+        existing_resource_ids = self._existing_resource_ids(student, existing_resource_ids)
+        performance_score = student.performance_score
+        target_difficulty, target_types = scoring.fallback_targets(performance_score)
+
+        similarities = candidates.pending_similarities(catalog, performance_data)
+        positions, scores = candidates.rank(
+            catalog, performance_data, existing_resource_ids, max_recommendations, similarities
+        )
+        recommendations = []
+        for position, score in zip(positions, scores):
+            resource = catalog.resources[position]
+            _, reason = scoring.score_resource(resource, performance_score, target_difficulty, target_types)
+            if similarities is not None and similarities[position] >= self.RELATED_SIMILARITY:
+                reason = f"Related to your pending courses; {reason}"
+            recommendations.append({
+                'resource': resource,
+                'score': score,
+                'confidence_score': min(score / 10, 1.0),
+                'reason': reason
+            })
+        metrics.record_path('similarity', self.MODE_SIMILARITY)
+        return recommendations
+
+    # Async API: same contract as the sync methods above, for ASGI views
+
+    async def _acreate(self, prompt: str, timeout=None):
+        try:
+            with metrics.LLM_CALLS['achat'].time():
+                return await self.async_client.chat.completions.create(**self._request_params(prompt, timeout))
+        except Exception as e:
+            metrics.record_llm_error(e)
+            raise
+
+    async def _achat(self, prompt: str, use_cache: bool = True) -> str:
+        """Async counterpart of _chat using the async Groq client"""
+        if not self.async_client or not self.model:
+            return ""
+
+        cache_key = make_cache_key(self.model, self.temperature, prompt)
+        if use_cache:
+            cached = await sync_to_async(self._cache_get)(cache_key)
+            if cached is not None:
+                logger.info("Serving Groq response from cache")
+                return cached
+
+        try:
+            with timing.phase('llm'):
+                response = await resilience.get_policy().acall(lambda timeout: self._acreate(prompt, timeout))
+            content = response.choices[0].message.content.strip()
+        except resilience.CallSkipped as e:
+            logger.warning(f"Skipping Groq call: {e}")
+            metrics.LLM_SKIPPED.labels(e.reason).inc()
+            return ""
+        except Exception as e:
+            logger.error(f"Groq API call failed: {e}")
+            return ""
+
+        if content:
+            await sync_to_async(self._cache_set)(cache_key, content)
+        return content
+
+    async def _aperformance_data(self, student: Student) -> Dict[str, Any]:
+        if 'enrollments' in getattr(student, '_prefetched_objects_cache', {}):
+            return self._performance_data(student)
+        # Enrollments still need a query, which can't run on the event loop
+        return await sync_to_async(self._performance_data)(student)
+
+    @resilience.budgeted
+    async def aanalyze_student_performance(self, student: Student, use_cache: bool = True,
+                                           performance_data: Dict = None) -> Dict[str, Any]:
+        """Async counterpart of analyze_student_performance"""
+        if performance_data is None:
+            performance_data = await self._aperformance_data(student)
+
+        logger.info(f"Analyzing student {student.student_id} with score {student.performance_score}")
+
+        analysis = self._base_analysis(student.performance_score)
+
+        if self.async_client:
+            try:
+                prompt = self._create_analysis_prompt(performance_data)
+                ai_response = await self._achat(prompt, use_cache)
+                analysis.update(self._parse_ai_analysis(ai_response))
+            except Exception as e:
+                logger.error(f"AI analysis failed: {e}")
+                analysis = self._fallback_analysis(performance_data, analysis)
+        else:
+            analysis = self._fallback_analysis(performance_data, analysis)
+
+        return analysis
+
+    @resilience.budgeted
+    async def agenerate_recommendations(self, student: Student, max_recommendations: int = 5,
+                                        catalog: CatalogSnapshot = None,
+                                        existing_resource_ids=None, use_cache: bool = True,
+                                        mode: str = None) -> List[Dict]:
+        """Async counterpart of generate_recommendations"""
+        logger.info(f"Generating recommendations for student {student.student_id}")
+
+        mode = self._resolve_mode(mode)
+        if catalog is None:
+            catalog = await sync_to_async(get_catalog)()
+
+        if existing_resource_ids is None:
+            existing_resource_ids = {
+                pk async for pk in student.recommendation_set.values_list('resource__id', flat=True)
+            }
+
+        if mode == self.MODE_SIMILARITY:
+            if not getattr(settings, 'SIMILARITY_BUILD_IN_BACKGROUND', True) and 'similarity_index' not in vars(catalog):
+                # Built inline when asked to, but still off the event loop
+                await sync_to_async(getattr)(catalog, 'similarity_index')
+            return self._similarity_recommendations(
+                student, catalog, max_recommendations, existing_resource_ids,
+                await self._aperformance_data(student)
+            )
+
+        performance_data = await self._aperformance_data(student)
+        recommendations = []
+        if mode == self.MODE_SINGLE_CALL and self.async_client:
+            analysis = self._base_analysis(student.performance_score)
+            try:
+                ai_response = await self._achat(self._single_call_prompt(
+                    performance_data, catalog, existing_resource_ids, max_recommendations
+                ), use_cache)
+                recommendations = self._single_call_result(ai_response, analysis, catalog)
+            except Exception as e:
+                logger.error(f"AI recommendation generation failed: {e}")
+        else:
+            analysis = await self.aanalyze_student_performance(student, use_cache, performance_data)
+            if self.async_client:
+                try:
+                    ai_response = await self._achat(self._two_call_prompt(
+                        analysis, performance_data, catalog, existing_resource_ids, max_recommendations
+                    ), use_cache)
+                    recommendations = self._two_call_result(ai_response, catalog)
+                except Exception as e:
+                    logger.error(f"AI recommendation generation failed: {e}")
+
+        # Pure CPU once the exclusion set is known, so no thread hop needed
+        return self._ai_or_fallback(
+            recommendations, mode, student, analysis, catalog,
+            max_recommendations, existing_resource_ids
+        )
+
+    @timing.timed('prompt')
     def _create_analysis_prompt(self, performance_data: Dict) -> str:
         return f"""
         Analyze this student's learning performance and provide insights:
@@ -153,6 +688,7 @@ class AIRecommendationEngine:
         Return only a valid JSON object without explanations, Markdown, or comments.
         """
 
+    @timing.timed('parse')
     def _parse_ai_analysis(self, ai_response: str) -> Dict:
         try:
             ai_response = self.clean_ai_response(ai_response)
@@ -164,29 +700,21 @@ class AIRecommendationEngine:
         except Exception as e:
             logger.error(f"Failed to parse AI analysis: {e}")
             logger.error(f"AI response was: {ai_response}")
+        if ai_response:
+            metrics.PARSE_FAILURES.labels('analysis').inc()
         return {}
 
-    def _ai_generate_recommendations(self, student: Student, analysis: Dict, resources, max_recommendations: int) -> List[Dict]:
-        resources_data = [
-            {
-                "id": r.resource_id,
-                "title": r.title,
-                "type": r.type,
-                "difficulty": r.difficulty_level,
-                "priority": r.recommendation_priority,
-                "course_id": r.course_id,
-            }
-            for r in resources
-        ]
-
-        prompt = f"""
+    @timing.timed('prompt')
+    def _create_recommendation_prompt(self, analysis: Dict, candidates: str,
+                                      max_recommendations: int) -> str:
+        return f"""
         Generate personalized learning recommendations for this student:
 
         Student Analysis:
         {json.dumps(analysis, indent=2)}
 
         Available Resources:
-        {json.dumps(resources_data[:20], indent=2)}
+        {candidates}
 
         Generate {max_recommendations} recommendations in JSON format:
         {{
@@ -200,11 +728,7 @@ class AIRecommendationEngine:
         }}
         """
 
-        ai_response = self._chat(prompt)
-        logger.info(f"Groq recommendation response: {ai_response[:200]}...")
-        ai_recs = self._parse_ai_recommendations(ai_response)
-        return self._validate_recommendations(ai_recs, resources)
-
+    @timing.timed('parse')
     def _parse_ai_recommendations(self, ai_response: str) -> List[Dict]:
         try:
             ai_response = self.clean_ai_response(ai_response)
@@ -217,24 +741,95 @@ class AIRecommendationEngine:
         except Exception as e:
             logger.error(f"Failed to parse AI recommendations: {e}")
             logger.error(f"AI response was: {ai_response}")
+        if ai_response:
+            metrics.PARSE_FAILURES.labels('recommendations').inc()
         return []
 
-    def _validate_recommendations(self, ai_recs: List[Dict], resources) -> List[Dict]:
+    @timing.timed('prompt')
+    def _create_combined_prompt(self, performance_data: Dict, candidates: str,
+                                max_recommendations: int) -> str:
+        return f"""
+        Analyze this student's learning performance and recommend learning resources.
+
+        Student Performance Data:
+        - Performance Score: {performance_data['performance_score']}/100
+        - Completed Courses: {performance_data['completed_courses']}
+        - Pending Courses: {performance_data['pending_courses']}
+        - Total Completed: {performance_data['total_completed']}
+        - Total Pending: {performance_data['total_pending']}
+
+        Available Resources:
+        {candidates}
+
+        First analyze the student, then pick {max_recommendations} resources that fit
+        the analysis. Respond in the following JSON format:
+        {{
+            "analysis": {{
+                "strengths": ["strength1", "strength2"],
+                "weaknesses": ["weakness1", "weakness2"],
+                "learning_style": "visual|auditory|kinesthetic|reading",
+                "recommended_focus_areas": ["area1", "area2"]
+            }},
+            "recommendations": [
+                {{
+                    "resource_id": "resource_id",
+                    "confidence_score": 0.8,
+                    "reason": "Why this resource is recommended"
+                }}
+            ]
+        }}
+
+        Return only a valid JSON object without explanations, Markdown, or comments.
+        """
+
+    @timing.timed('parse')
+    def _parse_ai_combined(self, ai_response: str):
+        """Split a combined response into (analysis, recommendations)"""
+        try:
+            ai_response = self.clean_ai_response(ai_response)
+            start = ai_response.find("{")
+            end = ai_response.rfind("}") + 1
+            if start != -1 and end > start:
+                data = json.loads(ai_response[start:end])
+                analysis = data.get("analysis")
+                return (analysis if isinstance(analysis, dict) else {}), data.get("recommendations", [])
+        except Exception as e:
+            logger.error(f"Failed to parse AI combined response: {e}")
+            logger.error(f"AI response was: {ai_response}")
+        if ai_response:
+            metrics.PARSE_FAILURES.labels('combined').inc()
+        return {}, []
+
+    @timing.timed('parse')
+    def _validate_recommendations(self, ai_recs: List[Dict], catalog: CatalogSnapshot) -> List[Dict]:
         validated = []
-        resource_ids = {r.resource_id: r for r in resources}
+        resource_ids = catalog.by_resource_id
 
         for rec in ai_recs:
+            if not isinstance(rec, dict):
+                continue
             resource_id = rec.get("resource_id")
             if resource_id in resource_ids:
                 validated.append(
                     {
                         "resource": resource_ids[resource_id],
-                        "confidence_score": min(max(rec.get("confidence_score", 0.5), 0.0), 1.0),
+                        "confidence_score": self._confidence_score(rec.get("confidence_score")),
                         "reason": rec.get("reason", "AI recommended based on performance analysis"),
                     }
                 )
         return validated
-    
+
+    @staticmethod
+    def _confidence_score(value) -> float:
+        """The model's score clamped to [0, 1]; 0.5 when it isn't a number"""
+        try:
+            score = float(value)
+        except (TypeError, ValueError):
+            return 0.5
+        if math.isnan(score):
+            return 0.5
+        return min(max(score, 0.0), 1.0)
+
     def _fallback_analysis(self, performance_data: Dict, base_analysis: Dict) -> Dict:
         """Rule-based fallback analysis"""
         score = performance_data['performance_score']
@@ -259,69 +854,45 @@ class AIRecommendationEngine:
 
         return base_analysis
 
+    @timing.timed('fallback')
     def _fallback_recommendations(self, student: Student, analysis: Dict, 
-                                resources, max_recommendations: int) -> List[Dict]:
+                                resources, max_recommendations: int,
+                                existing_resource_ids=None) -> List[Dict]:
         """Rule-based fallback recommendations"""
         logger.info(f"Starting fallback recommendations for student {student.student_id}")
         
-        recommendations = []
         performance_score = student.performance_score
         
         # Filter resources based on performance
-        if performance_score < 50:
-            target_difficulty = 'beginner'
-            target_types = ['tutorial', 'article']
-        elif performance_score < 75:
-            target_difficulty = 'intermediate'
-            target_types = ['tutorial', 'video', 'quiz']
-        else:
-            target_difficulty = 'advanced'
-            target_types = ['video', 'quiz', 'assignment']
+        target_difficulty, target_types = scoring.fallback_targets(performance_score)
 
         logger.info(f"Target difficulty: {target_difficulty}, Target types: {target_types}")
 
         # Get existing recommendations to avoid duplicates
-        # FIX: Use resource__id instead of resource_id
-        existing_resource_ids = set(
-            student.recommendation_set.values_list('resource__id', flat=True)
-        )
+        existing_resource_ids = self._existing_resource_ids(student, existing_resource_ids)
         
-        logger.info(f"Existing resource IDs to exclude: {existing_resource_ids}")
+        logger.info(f"Excluding {len(existing_resource_ids)} already recommended resources")
         logger.info(f"Total resources before filtering: {len(resources)}")
 
+        if scoring.np is not None and isinstance(resources, CatalogSnapshot):
+            final_recommendations = self._vectorized_fallback_recommendations(
+                resources, performance_score, target_difficulty, target_types,
+                existing_resource_ids, max_recommendations
+            )
+            logger.info(f"Returning {len(final_recommendations)} recommendations")
+            return final_recommendations
+
         # Filter and score resources
         scored_resources = []
         for resource in resources:
             if resource.id in existing_resource_ids:
-                logger.info(f"Skipping resource {resource.resource_id} - already recommended")
+                logger.debug(f"Skipping resource {resource.resource_id} - already recommended")
                 continue
                 
-            score = 0
-            reason_parts = []
-
-            # Difficulty match
-            if resource.difficulty_level == target_difficulty:
-                score += 3
-                reason_parts.append(f"Matches {target_difficulty} level")
-            
-            # Type preference
-            if resource.type in target_types:
-                score += 2
-                reason_parts.append(f"Recommended {resource.type} format")
-            
-            # Priority weight
-            score += resource.recommendation_priority / 10
-            
-            # Performance-based adjustments
-            if performance_score < 50 and resource.type == 'tutorial':
-                score += 2
-                reason_parts.append("Tutorial for concept reinforcement")
-            elif performance_score >= 75 and resource.type == 'assignment':
-                score += 2
-                reason_parts.append("Challenge assignment for skill development")
-
+            score, reason = scoring.score_resource(
+                resource, performance_score, target_difficulty, target_types
+            )
             confidence = min(score / 10, 1.0)
-            reason = "; ".join(reason_parts) or "Selected based on performance analysis"
             
             scored_resources.append({
                 'resource': resource,
@@ -330,7 +901,7 @@ class AIRecommendationEngine:
                 'reason': reason
             })
             
-            logger.info(f"Scored resource {resource.resource_id}: score={score}, confidence={confidence}")
+            logger.debug(f"Scored resource {resource.resource_id}: score={score}, confidence={confidence}")
 
         logger.info(f"Total scored resources: {len(scored_resources)}")
 
@@ -340,4 +911,27 @@ class AIRecommendationEngine:
         
         logger.info(f"Returning {len(final_recommendations)} recommendations")
         
-        return final_recommendations
\ No newline at end of file
+        return final_recommendations
+
+    def _vectorized_fallback_recommendations(self, catalog: CatalogSnapshot, performance_score: float,
+                                             target_difficulty: str, target_types: List[str],
+                                             existing_resource_ids, max_recommendations: int) -> List[Dict]:
+        """Same rules as the loop above, scored in one NumPy pass over the catalog"""
+        positions, scores = scoring.top_k(
+            catalog.scoring_arrays, performance_score, max_recommendations, existing_resource_ids
+        )
+
+        recommendations = []
+        for position, score in zip(positions.tolist(), scores.tolist()):
+            resource = catalog.resources[position]
+            # Reasons are only needed for the winners, so build them here
+            _, reason = scoring.score_resource(
+                resource, performance_score, target_difficulty, target_types
+            )
+            recommendations.append({
+                'resource': resource,
+                'score': score,
+                'confidence_score': min(score / 10, 1.0),
+                'reason': reason
+            })
+        return recommendations
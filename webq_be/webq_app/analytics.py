@@ -0,0 +1,150 @@
+import logging
+from typing import Dict, Iterable
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .models import AnalyticsRollup, LearningResource, Recommendation, Student
+
+logger = logging.getLogger(__name__)
+
+# Dashboard performance bands as (name, lower bound inclusive, upper bound exclusive)
+PERFORMANCE_BANDS = (
+    ('excellent', 85, None),
+    ('good', 70, 85),
+    ('average', 50, 70),
+    ('needs_improvement', None, 50),
+)
+
+SECTIONS = ('students', 'recommendations', 'resources')
+
+
+def rollup_enabled() -> bool:
+    return getattr(settings, 'ANALYTICS_USE_ROLLUP', False)
+
+
+def performance_band(score) -> str:
+    for name, lower, upper in PERFORMANCE_BANDS:
+        if (lower is None or score >= lower) and (upper is None or score < upper):
+            return name
+    return PERFORMANCE_BANDS[-1][0]
+
+
+def _band_filter(lower, upper) -> Q:
+    q = Q()
+    if lower is not None:
+        q &= Q(performance_score__gte=lower)
+    if upper is not None:
+        q &= Q(performance_score__lt=upper)
+    return q
+
+
+def compute_counts(sections: Iterable[str] = SECTIONS) -> Dict[str, int]:
+    """Count every dashboard metric with one conditional aggregate per table"""
+    counts = {}
+
+    if 'students' in sections:
+        counts.update({
+            f'students.{key}': value
+            for key, value in Student.objects.aggregate(
+                total=Count('id'),
+                **{
+                    f'performance.{name}': Count('id', filter=_band_filter(lower, upper))
+                    for name, lower, upper in PERFORMANCE_BANDS
+                }
+            ).items()
+        })
+
+    if 'recommendations' in sections:
+        counts.update({
+            f'recommendations.{key}': value
+            for key, value in Recommendation.objects.aggregate(
+                total=Count('id'),
+                **{
+                    f'status.{rec_status}': Count('id', filter=Q(status=rec_status))
+                    for rec_status, _ in Recommendation.STATUS_CHOICES
+                }
+            ).items()
+        })
+
+    if 'resources' in sections:
+        counts.update({
+            f'resources.{key}': value
+            for key, value in LearningResource.objects.aggregate(
+                total=Count('id'),
+                **{
+                    f'type.{res_type}': Count('id', filter=Q(type=res_type))
+                    for res_type, _ in LearningResource.RESOURCE_TYPES
+                }
+            ).items()
+        })
+
+    return counts
+
+
+def read_rollup() -> Dict[str, int]:
+    """Current rollup counters in a single query; empty until the first rebuild"""
+    return dict(AnalyticsRollup.objects.values_list('metric', 'value'))
+
+
+def rebuild_rollup(sections: Iterable[str] = SECTIONS) -> Dict[str, int]:
+    """Recount ``sections`` from the source tables and overwrite their counters"""
+    with transaction.atomic():
+        counts = compute_counts(sections)
+        AnalyticsRollup.objects.bulk_create(
+            [AnalyticsRollup(metric=metric, value=value) for metric, value in counts.items()],
+            update_conflicts=True,
+            unique_fields=['metric'],
+            update_fields=['value', 'updated_at'],
+        )
+    return counts
+
+
+def adjust_rollup(deltas: Dict[str, int]) -> None:
+    """Apply counter increments atomically; no-op while the rollup is disabled"""
+    if not rollup_enabled():
+        return
+    for metric, delta in deltas.items():
+        if not delta:
+            continue
+        updated = AnalyticsRollup.objects.filter(metric=metric).update(value=F('value') + delta)
+        if not updated:
+            # First time this metric is seen (e.g. a newly added choice)
+            rollup, created = AnalyticsRollup.objects.get_or_create(
+                metric=metric, defaults={'value': delta}
+            )
+            if not created:
+                AnalyticsRollup.objects.filter(pk=rollup.pk).update(value=F('value') + delta)
+
+
+def build_dashboard(counts: Dict[str, int]) -> Dict:
+    """Shape metric counters into the analytics dashboard response"""
+    return {
+        'overview': {
+            'total_students': counts.get('students.total', 0),
+            'total_resources': counts.get('resources.total', 0),
+            'total_recommendations': counts.get('recommendations.total', 0),
+        },
+        'performance_distribution': {
+            name: counts.get(f'students.performance.{name}', 0)
+            for name, _, _ in PERFORMANCE_BANDS
+        },
+        'recommendation_status_distribution': {
+            rec_status: counts.get(f'recommendations.status.{rec_status}', 0)
+            for rec_status, _ in Recommendation.STATUS_CHOICES
+        },
+        'resource_type_distribution': {
+            res_type: counts.get(f'resources.type.{res_type}', 0)
+            for res_type, _ in LearningResource.RESOURCE_TYPES
+        },
+    }
+
+
+def get_dashboard(live: bool = False) -> Dict:
+    """Dashboard from the rollup when enabled and populated, else counted live"""
+    if rollup_enabled() and not live:
+        counts = read_rollup()
+        if counts:
+            return build_dashboard(counts)
+        logger.info("Analytics rollup is empty; rebuilding from source tables")
+        return build_dashboard(rebuild_rollup())
+    return build_dashboard(compute_counts())
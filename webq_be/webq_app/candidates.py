@@ -0,0 +1,146 @@
+"""Candidate retrieval: which resources an LLM prompt gets to see.
+
+Resources are ranked for the student with the rule-based scores from
+scoring.py (difficulty, type, priority), plus a bonus for resources on the
+student's pending courses, a small penalty for completed ones, and the
+content similarity (similarity.py) between each resource's title and
+description and the pending course names. Resources already recommended to
+the student are dropped. The best rows are then added
+to the prompt until LLM_PROMPT_CANDIDATES rows or LLM_PROMPT_TOKEN_BUDGET
+tokens are reached, whichever comes first.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from . import scoring, timing
+from .catalog import CatalogSnapshot, title_words
+
+PENDING_COURSE_BONUS = 3.0  # as strong as a difficulty match
+COMPLETED_COURSE_PENALTY = 1.0  # below equally good resources on new topics
+SIMILARITY_WEIGHT = 3.0  # a resource identical in content to the pending courses scores like a course match
+
+# Course-name words that say nothing about the topic
+GENERIC_WORDS = frozenset({
+    'a', 'an', 'and', 'the', 'of', 'to', 'for', 'in', 'on', 'with', 'introduction', 'intro',
+    'basics', 'fundamentals', 'beginner', 'intermediate', 'advanced', 'projects', 'project',
+    'capstone', 'course', 'i', 'ii', 'iii',
+})
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and JSON)"""
+    return len(text) // 4 + 1
+
+
+def course_positions(catalog: CatalogSnapshot, course_name: str) -> set:
+    """Positions of the resources that belong to a course, by id or by topic.
+
+    Enrollments name courses ("Machine Learning") while resources carry
+    codes (ML301), so besides an exact ``course_id`` match, a resource
+    matches when its title contains every topic word of the course name.
+    """
+    positions = set(catalog.by_course_id.get(course_name, ()))
+    words = title_words(course_name) - GENERIC_WORDS
+    if words:
+        postings = [catalog.by_title_word.get(word, ()) for word in words]
+        matched = set(min(postings, key=len))
+        for posting in postings:
+            matched.intersection_update(posting)
+        positions |= matched
+    return positions
+
+
+def topic_words(course_names: Iterable[str]) -> List[str]:
+    """The words of the course names that say what they are about"""
+    return [word for name in course_names for word in title_words(name) - GENERIC_WORDS]
+
+
+def pending_similarities(catalog: CatalogSnapshot, performance_data: Dict):
+    """Cosine similarity of every resource to the pending course names, or None"""
+    words = topic_words(performance_data.get('pending_courses') or [])
+    index = catalog.ready_similarity_index() if words else None
+    if index is None:
+        return None
+    return index.similarities(words)
+
+
+def course_bonus(catalog: CatalogSnapshot, performance_data: Dict, similarities=None):
+    """Per-resource score adjustment for the student's courses, or None"""
+    completed = performance_data.get('completed_courses') or []
+    pending = performance_data.get('pending_courses') or []
+    if not completed and not pending:
+        return None
+    bonus = scoring.np.zeros(len(catalog))
+    for name in completed:
+        bonus[list(course_positions(catalog, name))] = -COMPLETED_COURSE_PENALTY
+    # Applied last: a pending course wins where the two overlap
+    for name in pending:
+        bonus[list(course_positions(catalog, name))] = PENDING_COURSE_BONUS
+    if similarities is not None:
+        bonus += SIMILARITY_WEIGHT * similarities
+    return bonus
+
+
+def rank(catalog: CatalogSnapshot, performance_data: Dict, exclude_pks: Iterable[int],
+         limit: int, similarities=None) -> Tuple[List[int], List[float]]:
+    """Positions and scores of the best resources for the student, best first.
+
+    ``similarities`` can pass in a pending_similarities() result already at
+    hand. Without NumPy there is no similarity index, and only the rule
+    scores and course adjustments apply.
+    """
+    performance_score = performance_data['performance_score']
+    if scoring.np is not None:
+        if similarities is None:
+            similarities = pending_similarities(catalog, performance_data)
+        positions, scores = scoring.top_k(
+            catalog.scoring_arrays, performance_score, limit, exclude_pks,
+            bonus=course_bonus(catalog, performance_data, similarities),
+        )
+        return positions.tolist(), scores.tolist()
+
+    # Same ranking without NumPy, one resource at a time
+    target_difficulty, target_types = scoring.fallback_targets(performance_score)
+    adjustments = {}
+    for name in performance_data.get('completed_courses') or []:
+        adjustments.update(dict.fromkeys(course_positions(catalog, name), -COMPLETED_COURSE_PENALTY))
+    for name in performance_data.get('pending_courses') or []:
+        adjustments.update(dict.fromkeys(course_positions(catalog, name), PENDING_COURSE_BONUS))
+    exclude_pks = set(exclude_pks)
+    scored = [
+        (scoring.score_resource(resource, performance_score, target_difficulty, target_types)[0]
+         + adjustments.get(position, 0), position)
+        for position, resource in enumerate(catalog.resources)
+        if resource.pk not in exclude_pks
+    ]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [position for _, position in scored[:limit]], [score for score, _ in scored[:limit]]
+
+
+def shortlist(catalog: CatalogSnapshot, performance_data: Dict,
+              exclude_pks: Optional[Iterable[int]] = None, limit: Optional[int] = None,
+              token_budget: Optional[int] = None) -> List[int]:
+    """Catalog positions to show the LLM, best first, within the token budget"""
+    if limit is None:
+        limit = getattr(settings, 'LLM_PROMPT_CANDIDATES', 20)
+    if token_budget is None:
+        token_budget = getattr(settings, 'LLM_PROMPT_TOKEN_BUDGET', 1200)
+
+    selected = []
+    used = 0
+    positions, _ = rank(catalog, performance_data, exclude_pks or (), limit)
+    for position in positions:
+        tokens = approx_tokens(catalog.prompt_row_json[position])
+        if token_budget and used + tokens > token_budget:
+            break
+        selected.append(position)
+        used += tokens
+    return selected
+
+
+@timing.timed('retrieval')
+def prompt_block(catalog: CatalogSnapshot, performance_data: Dict,
+                 exclude_pks: Optional[Iterable[int]] = None, **options) -> str:
+    """The shortlisted resources as a JSON array, one compact row per line"""
+    rows = [catalog.prompt_row_json[position]
+            for position in shortlist(catalog, performance_data, exclude_pks, **options)]
+    return "[\n" + ",\n".join(rows) + "\n]"
@@ -0,0 +1,218 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Count, Max
+from .models import LearningResource
+
+logger = logging.getLogger(__name__)
+
+
+_WORD = re.compile(r'[a-z0-9+#]+')
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def title_words(text: str) -> set:
+    return set(tokenize(text))
+
+
+class CatalogSnapshot:
+    """Immutable, indexed view of every LearningResource at a given version"""
+
+    def __init__(self, resources: List[LearningResource], version: int, stamp: Tuple = None):
+        self.version = version
+        self.stamp = stamp  # table row count and newest updated_at when loaded
+        self.loaded_at = time.monotonic()
+        self._index_build_started = False
+        self.resources: Tuple[LearningResource, ...] = tuple(resources)
+        self.by_resource_id: Dict[str, LearningResource] = {}
+        self.by_pk: Dict[int, LearningResource] = {}
+
+        by_difficulty = defaultdict(list)
+        by_type = defaultdict(list)
+        by_course = defaultdict(list)
+        for position, resource in enumerate(self.resources):
+            self.by_resource_id[resource.resource_id] = resource
+            self.by_pk[resource.pk] = resource
+            by_difficulty[resource.difficulty_level].append(position)
+            by_type[resource.type].append(position)
+            by_course[resource.course_id].append(position)
+
+        # Positions into self.resources, kept in catalog (Meta.ordering) order
+        self.by_difficulty = {k: tuple(v) for k, v in by_difficulty.items()}
+        self.by_type = {k: tuple(v) for k, v in by_type.items()}
+        self.by_course_id = {k: tuple(v) for k, v in by_course.items()}
+
+        # Compact rows shared by every prompt builder
+        self.prompt_rows = [
+            {
+                "id": r.resource_id,
+                "title": r.title,
+                "type": r.type,
+                "difficulty": r.difficulty_level,
+                "priority": r.recommendation_priority,
+                "course_id": r.course_id,
+            }
+            for r in self.resources
+        ]
+
+    @cached_property
+    def scoring_arrays(self):
+        """Integer-encoded columns for the vectorized scorer, built on first use"""
+        from .scoring import ScoringArrays
+        return ScoringArrays.from_resources(self.resources)
+
+    @cached_property
+    def similarity_index(self):
+        """TF-IDF vectors of titles and descriptions, or None without NumPy"""
+        from .scoring import np
+        if np is None:
+            return None
+        from .similarity import build_index
+        return build_index(self.resources)
+
+    def ready_similarity_index(self):
+        """The similarity index if it is built; otherwise None, and it starts building.
+
+        Request paths use this so no request waits on tokenizing the catalog:
+        they rank without similarity until the build thread is done. With
+        SIMILARITY_BUILD_IN_BACKGROUND off, the index is built inline.
+        """
+        if 'similarity_index' in vars(self) or not getattr(settings, 'SIMILARITY_BUILD_IN_BACKGROUND', True):
+            return self.similarity_index
+        with _build_lock:
+            if not self._index_build_started:
+                self._index_build_started = True
+                threading.Thread(target=self._build_similarity_index, name='similarity-index',
+                                 daemon=True).start()
+        return None
+
+    def _build_similarity_index(self):
+        try:
+            self.similarity_index
+        except Exception as e:
+            logger.error(f"Failed to build the similarity index: {e}")
+
+    @cached_property
+    def prompt_row_json(self) -> Tuple[str, ...]:
+        """``prompt_rows`` as compact JSON, serialized once per snapshot"""
+        return tuple(json.dumps(row, separators=(',', ':')) for row in self.prompt_rows)
+
+    @cached_property
+    def by_title_word(self) -> Dict[str, Tuple[int, ...]]:
+        """Positions of the resources whose title contains each lowercased word"""
+        index = defaultdict(set)
+        for position, resource in enumerate(self.resources):
+            for word in title_words(resource.title):
+                index[word].add(position)
+        return {word: tuple(sorted(positions)) for word, positions in index.items()}
+
+    def __len__(self):
+        return len(self.resources)
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def filter(self, difficulty_level: Optional[str] = None, type: Optional[str] = None,
+               course_id: Optional[str] = None) -> List[LearningResource]:
+        """Resources matching every given attribute, in catalog order"""
+        indexes = [
+            index.get(value, ())
+            for index, value in (
+                (self.by_difficulty, difficulty_level),
+                (self.by_type, type),
+                (self.by_course_id, course_id),
+            )
+            if value is not None
+        ]
+        if not indexes:
+            return list(self.resources)
+
+        positions = set(min(indexes, key=len))
+        for index in indexes:
+            positions.intersection_update(index)
+        return [self.resources[p] for p in sorted(positions)]
+
+
+_load_lock = threading.Lock()
+_build_lock = threading.Lock()
+_version_lock = threading.Lock()
+_version = 0
+_snapshot: Optional[CatalogSnapshot] = None
+_checked_at = 0.0  # monotonic time the snapshot was last compared with the table
+
+
+def get_version() -> int:
+    return _version
+
+
+def invalidate() -> None:
+    """Bump the catalog version so the next get_catalog() call reloads"""
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+def _table_stamp() -> Tuple[int, object]:
+    """Row count and newest updated_at: changes when any process writes the table"""
+    stamp = LearningResource.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return stamp['count'], stamp['latest']
+
+
+def _probe_due(now: float) -> bool:
+    interval = getattr(settings, 'CATALOG_CHECK_INTERVAL', 5.0)
+    return bool(interval) and now - _checked_at >= interval
+
+
+def _expired(snapshot: CatalogSnapshot, now: float) -> bool:
+    max_age = getattr(settings, 'CATALOG_MAX_AGE', 300.0)
+    return bool(max_age) and now - snapshot.loaded_at >= max_age
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Return the current catalog snapshot, loading it if the version moved.
+
+    Signals bump the version for writes made in this process. Writes made by
+    other processes are noticed by comparing the table's row count and newest
+    ``updated_at`` with the snapshot's, at most every CATALOG_CHECK_INTERVAL
+    seconds. After CATALOG_MAX_AGE seconds the snapshot is reloaded anyway,
+    for writes that don't touch ``updated_at``.
+    """
+    global _snapshot, _version, _checked_at
+    snapshot = _snapshot
+    now = time.monotonic()
+    if (snapshot is not None and snapshot.version == _version
+            and not _probe_due(now) and not _expired(snapshot, now)):
+        return snapshot
+
+    with _load_lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version == _version:
+            if not _expired(snapshot, now):
+                if not _probe_due(now):
+                    return snapshot
+                _checked_at = now
+                if _table_stamp() == snapshot.stamp:
+                    return snapshot
+                logger.info("Catalog changed in another process; reloading")
+            # Stale without a local write: move the version on ourselves
+            with _version_lock:
+                _version += 1
+
+        # Tag with the version and table stamp read before querying: a write
+        # that lands while we load moves one of them and forces another reload.
+        version = _version
+        stamp = _table_stamp()
+        resources = list(LearningResource.objects.all())
+        _snapshot = CatalogSnapshot(resources, version, stamp)
+        _checked_at = _snapshot.loaded_at
+        logger.info(f"Loaded catalog snapshot v{version} with {len(resources)} resources")
+        return _snapshot
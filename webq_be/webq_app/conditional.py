@@ -0,0 +1,75 @@
+import hashlib
+from functools import wraps
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.views.decorators.http import condition
+from .models import Enrollment, LearningResource, Recommendation, Student
+
+
+def resources_state(request, *args, **kwargs):
+    """Row count and newest change across the resource catalog"""
+    state = LearningResource.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return (state['count'],), [state['latest']]
+
+
+def student_recommendations_state(request, student_id, *args, **kwargs):
+    """Count and newest change of a student's recommendations and their resources"""
+    state = Recommendation.objects.filter(student__student_id=student_id).aggregate(
+        count=Count('id'), latest=Max('updated_at'), resource_latest=Max('resource__updated_at')
+    )
+    return (state['count'],), [state['latest'], state['resource_latest']]
+
+
+def _per_student(model, **aggregates):
+    """Correlated subqueries aggregating the outer student's ``model`` rows"""
+    rows = model.objects.filter(student=OuterRef('pk')).order_by().values('student')
+    return {name: Subquery(rows.annotate(value=aggregate).values('value'))
+            for name, aggregate in aggregates.items()}
+
+
+def student_performance_state(request, student_id, *args, **kwargs):
+    """Student row, enrollments and recommendations that feed the performance view"""
+    state = Student.objects.filter(student_id=student_id).annotate(
+        **_per_student(Recommendation, rec_count=Count('id'), rec_latest=Max('updated_at'),
+                       resource_latest=Max('resource__updated_at')),
+        **_per_student(Enrollment, enrollment_count=Count('id'), enrollment_latest=Max('updated_at')),
+    ).values(
+        'updated_at', 'rec_count', 'rec_latest', 'resource_latest', 'enrollment_count', 'enrollment_latest'
+    ).first()
+    if state is None:
+        return None
+    return (
+        (state['rec_count'], state['enrollment_count']),
+        [state['updated_at'], state['rec_latest'], state['resource_latest'], state['enrollment_latest']],
+    )
+
+
+def conditional_get(state_func):
+    """``condition`` for GET/HEAD with an ETag derived from one cheap state query.
+
+    ``state_func(request, *args, **kwargs)`` returns ``(counts, timestamps)``
+    or None when there is nothing to validate (the view then runs as usual).
+    Counts catch deletions, which never move a timestamp, and the full
+    timestamps catch changes within the same second. That is why there is
+    no Last-Modified: a second-resolution Max(updated_at) misses both. A
+    matching If-None-Match answers 304 before the view loads or serializes
+    anything.
+    """
+    def decorator(view):
+        def etag_func(request, *args, **kwargs):
+            current = state_func(request, *args, **kwargs)
+            if current is None:
+                return None
+            counts, timestamps = current
+            # The negotiated representation (JSON vs browsable API) is part of the entity
+            key = repr((counts, timestamps, request.META.get('HTTP_ACCEPT', '')))
+            return hashlib.md5(key.encode()).hexdigest()
+
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                return conditional_view(request, *args, **kwargs)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,135 @@
+import asyncio
+import atexit
+import logging
+import threading
+import weakref
+import httpx
+from django.conf import settings
+from .ai_engine import AIRecommendationEngine
+from .llm_transport import get_transport, transport_available
+
+logger = logging.getLogger(__name__)
+
+# Settings that require rebuilding the shared clients when they change, plus
+# the transport's own setting_names
+CLIENT_SETTINGS = (
+    'LLM_TRANSPORT',
+    'GROQ_API_KEY',
+    'GROQ_BASE_URL',
+    'GROQ_HTTP_MAX_CONNECTIONS',
+    'GROQ_HTTP_MAX_KEEPALIVE',
+    'GROQ_HTTP_KEEPALIVE_EXPIRY',
+    'GROQ_HTTP_TIMEOUT',
+    'GROQ_HTTP_CONNECT_TIMEOUT',
+    'GROQ_HTTP2',
+)
+
+
+class EngineRegistry:
+    """Process-wide AIRecommendationEngine sharing pooled keep-alive HTTP clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self._fingerprint = None
+        self._http_client = None
+        # One async client per event loop: httpx pools cannot cross loops
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _settings_fingerprint(self):
+        names = CLIENT_SETTINGS + tuple(getattr(get_transport(), 'setting_names', ()))
+        return tuple(getattr(settings, name, None) for name in names)
+
+    def _http_options(self):
+        options = {
+            'limits': httpx.Limits(
+                max_connections=getattr(settings, 'GROQ_HTTP_MAX_CONNECTIONS', 20),
+                max_keepalive_connections=getattr(settings, 'GROQ_HTTP_MAX_KEEPALIVE', 10),
+                keepalive_expiry=getattr(settings, 'GROQ_HTTP_KEEPALIVE_EXPIRY', 30.0),
+            ),
+            'timeout': httpx.Timeout(
+                getattr(settings, 'GROQ_HTTP_TIMEOUT', 30.0),
+                connect=getattr(settings, 'GROQ_HTTP_CONNECT_TIMEOUT', 5.0),
+            ),
+        }
+        if getattr(settings, 'GROQ_HTTP2', False):
+            try:
+                import h2  # noqa: F401
+                options['http2'] = True
+            except ImportError:
+                logger.warning("GROQ_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+        return options
+
+    def _client_kwargs(self):
+        return {
+            'api_key': getattr(settings, 'GROQ_API_KEY', None) or None,
+            'base_url': getattr(settings, 'GROQ_BASE_URL', None) or None,
+            'max_retries': 0,  # resilience.LLMCallPolicy retries within the latency budget
+        }
+
+    def get_engine(self) -> AIRecommendationEngine:
+        engine = self._engine
+        if engine is not None and self._fingerprint == self._settings_fingerprint():
+            return engine
+
+        with self._lock:
+            fingerprint = self._settings_fingerprint()
+            if self._engine is not None and self._fingerprint == fingerprint:
+                return self._engine
+
+            self._close_clients()
+            transport = get_transport()
+            if transport_available(transport):
+                self._http_client = httpx.Client(**self._http_options())
+                client = transport.client_class(http_client=self._http_client, **self._client_kwargs())
+                self._engine = AIRecommendationEngine(
+                    client=client, async_client_provider=self.get_async_client
+                )
+                logger.info(f"Shared {transport.__name__} clients initialized")
+            else:
+                self._engine = AIRecommendationEngine()
+            self._fingerprint = fingerprint
+            return self._engine
+
+    def get_async_client(self):
+        """AsyncGroq client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            http_client = httpx.AsyncClient(**self._http_options())
+            client = get_transport().async_client_class(http_client=http_client, **self._client_kwargs())
+            self._async_clients[loop] = client
+        return client
+
+    def _close_clients(self):
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+        for loop, client in list(self._async_clients.items()):
+            if loop.is_closed():
+                continue  # its sockets went with it
+            try:
+                if loop.is_running():
+                    # Owned by another thread (or this one, mid-request): close it on its own loop
+                    asyncio.run_coroutine_threadsafe(client.close(), loop)
+                else:
+                    loop.run_until_complete(client.close())
+            except Exception as e:
+                logger.warning(f"Failed to close async Groq client: {e}")
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def reset(self):
+        """Close the shared clients; the next get_engine() call rebuilds them"""
+        with self._lock:
+            self._close_clients()
+            self._engine = None
+            self._fingerprint = None
+
+
+registry = EngineRegistry()
+get_engine = registry.get_engine
+reset_engine = registry.reset
+
+# Release pooled connections cleanly when the process exits. gunicorn workers
+# end with os._exit, so gunicorn.conf.py also does this in worker_exit
+atexit.register(reset_engine)
@@ -0,0 +1,159 @@
+import csv
+import datetime
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Recommendation, Student
+
+# Rows fetched per database round trip (server-side cursor on PostgreSQL)
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+# Rows serialized into each chunk written to the client
+ROWS_PER_WRITE = 500
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# (column name, ORM lookup) in export order
+RECOMMENDATION_COLUMNS = (
+    ('id', 'id'),
+    ('student_id', 'student__student_id'),
+    ('student_name', 'student__name'),
+    ('resource_id', 'resource__resource_id'),
+    ('resource_title', 'resource__title'),
+    ('resource_type', 'resource__type'),
+    ('difficulty_level', 'resource__difficulty_level'),
+    ('course_id', 'resource__course_id'),
+    ('status', 'status'),
+    ('confidence_score', 'confidence_score'),
+    ('reason', 'reason'),
+    ('recommendation_date', 'recommendation_date'),
+    ('updated_at', 'updated_at'),
+)
+
+STUDENT_COLUMNS = (
+    ('student_id', 'student_id'),
+    ('name', 'name'),
+    ('email', 'email'),
+    ('performance_score', 'performance_score'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+
+def _parse_day(value: str) -> Optional[datetime.date]:
+    try:
+        return parse_date(value)
+    except ValueError:  # well formed but impossible, e.g. 2024-02-30
+        raise ValueError(f"Invalid date '{value}'")
+
+
+def parse_bound(value: Optional[str], end: bool = False) -> Optional[datetime.datetime]:
+    """ISO date or datetime query value -> aware datetime; a bare date covers the whole day"""
+    if not value:
+        return None
+    # Dates first: parse_datetime() also accepts a bare date on Python 3.11+
+    day = _parse_day(value)
+    if day is not None:
+        moment = datetime.datetime.combine(day, datetime.time.min)
+        if end:
+            moment += datetime.timedelta(days=1)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD or an ISO 8601 datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _date_filter(field: str, params: Dict) -> Dict:
+    filters = {}
+    since = parse_bound(params.get('since'))
+    until = parse_bound(params.get('until'), end=True)
+    if since:
+        filters[f'{field}__gte'] = since
+    if until:
+        # A bare 'until' date includes that whole day
+        exclusive = _parse_day(params['until']) is not None
+        filters[f'{field}__lt' if exclusive else f'{field}__lte'] = until
+    return filters
+
+
+def recommendation_rows(params: Dict) -> Tuple[Tuple[str, ...], Iterator[tuple]]:
+    """Column names and a lazily fetched row iterator for the recommendation export.
+
+    Filters: ``status`` (comma-separated), ``student_id``, ``since``/``until``
+    on recommendation_date.
+    """
+    queryset = Recommendation.objects.filter(**_date_filter('recommendation_date', params))
+    if params.get('status'):
+        statuses = [s for s in params['status'].split(',') if s]
+        valid = {choice for choice, _ in Recommendation.STATUS_CHOICES}
+        unknown = set(statuses) - valid
+        if unknown:
+            raise ValueError(f"Invalid status {sorted(unknown)}. Must be one of: {sorted(valid)}")
+        queryset = queryset.filter(status__in=statuses)
+    if params.get('student_id'):
+        queryset = queryset.filter(student__student_id=params['student_id'])
+    return _rows(queryset, RECOMMENDATION_COLUMNS)
+
+
+def student_rows(params: Dict) -> Tuple[Tuple[str, ...], Iterator[tuple]]:
+    """Column names and row iterator for the student export (``since``/``until`` on created_at)"""
+    return _rows(Student.objects.filter(**_date_filter('created_at', params)), STUDENT_COLUMNS)
+
+
+def _rows(queryset, columns) -> Tuple[Tuple[str, ...], Iterator[tuple]]:
+    names = tuple(name for name, _ in columns)
+    rows = queryset.order_by('id').values_list(*(lookup for _, lookup in columns))
+    # values_list + iterator(): no model instances and no result cache
+    return names, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like sink so csv.writer hands back each formatted line"""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    buffer: List[str] = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def stream_ndjson(names: Tuple[str, ...], rows: Iterator[tuple]) -> Iterator[bytes]:
+    return _chunked(
+        json.dumps(dict(zip(names, map(_encode, row))), ensure_ascii=False) + '\n' for row in rows
+    )
+
+
+def stream_csv(names: Tuple[str, ...], rows: Iterator[tuple]) -> Iterator[bytes]:
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([_encode(value) for value in row])
+
+    return _chunked(lines())
+
+
+def stream(fmt: str, names: Tuple[str, ...], rows: Iterator[tuple]) -> Iterator[bytes]:
+    return stream_csv(names, rows) if fmt == 'csv' else stream_ndjson(names, rows)
@@ -0,0 +1,363 @@
+"""In-process and HTTP stand-ins for the Groq chat completions API.
+
+Used with ``LLM_TRANSPORT='fake'`` (in-process clients) or ``manage.py
+run_fake_groq`` (a local server for ``GROQ_BASE_URL``) to exercise the LLM
+path offline. Responses are deterministic for a given prompt and only cite
+resource ids that appear in it, so they survive validation against the
+catalog. Latency, 429 rate limiting and malformed output are injected from a
+seeded RNG.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+import httpx
+from django.conf import settings
+from groq import APITimeoutError, RateLimitError
+from groq.types.chat import ChatCompletion, ChatCompletionChunk
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = 'rate_limited'
+MALFORMED = 'malformed'
+
+STRENGTHS = ['Consistency', 'Problem solving', 'Curiosity', 'Time management', 'Attention to detail']
+WEAKNESSES = ['Fundamental concepts', 'Exam technique', 'Study habits', 'Advanced topics']
+LEARNING_STYLES = ['visual', 'auditory', 'kinesthetic', 'reading']
+FOCUS_AREAS = ['Practice problems', 'Core concepts', 'Projects', 'Revision', 'Specialized skills']
+
+# FakeGroqBehavior argument -> setting
+BEHAVIOR_SETTINGS = {
+    'latency_ms': 'FAKE_GROQ_LATENCY_MS',
+    'latency_sigma': 'FAKE_GROQ_LATENCY_SIGMA',
+    'rate_limit_rate': 'FAKE_GROQ_RATE_LIMIT_RATE',
+    'retry_after': 'FAKE_GROQ_RETRY_AFTER',
+    'malformed_rate': 'FAKE_GROQ_MALFORMED_RATE',
+    'seed': 'FAKE_GROQ_SEED',
+}
+
+_RESOURCE_ID = re.compile(r'"id":\s*"([^"]+)"')
+_COUNT = re.compile(r'(\d+)\s+(?:recommendations|resources)')
+
+
+def _digest(*parts: str) -> int:
+    return int(hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()[:12], 16)
+
+
+def _pick(options: List[str], prompt: str, salt: str, count: int) -> List[str]:
+    return sorted(options, key=lambda option: _digest(prompt, salt, option))[:count]
+
+
+def fake_content(prompt: str) -> str:
+    """Deterministic JSON answer for one of the engine's prompts"""
+    analysis = {
+        'strengths': _pick(STRENGTHS, prompt, 'strengths', 2),
+        'weaknesses': _pick(WEAKNESSES, prompt, 'weaknesses', 1),
+        'learning_style': _pick(LEARNING_STYLES, prompt, 'style', 1)[0],
+        'recommended_focus_areas': _pick(FOCUS_AREAS, prompt, 'focus', 2),
+    }
+    if '"recommendations"' not in prompt:
+        return json.dumps(analysis, indent=2)
+
+    match = _COUNT.search(prompt)
+    count = int(match.group(1)) if match else 5
+    resource_ids = list(dict.fromkeys(_RESOURCE_ID.findall(prompt)))
+    recommendations = [
+        {
+            'resource_id': resource_id,
+            'confidence_score': round(0.55 + _digest(prompt, resource_id) % 40 / 100, 2),
+            'reason': f'Matches focus on {analysis["recommended_focus_areas"][0].lower()}',
+        }
+        for resource_id in _pick(resource_ids, prompt, 'resources', count)
+    ]
+    body = {'recommendations': recommendations}
+    if '"analysis"' in prompt:
+        body = {'analysis': analysis, **body}
+    return json.dumps(body, indent=2)
+
+
+def _malformed(content: str) -> str:
+    # Cut mid-object, the way a truncated or rambling completion breaks
+    return 'Sure! Here are the results:\n' + content[:len(content) // 2]
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeGroqBehavior:
+    """Latency distribution and fault rates shared by the fake clients and server"""
+
+    def __init__(self, latency_ms: float = 0.0, latency_sigma: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 malformed_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, RATE_LIMITED: 0, MALFORMED: 0}
+
+    @classmethod
+    def from_settings(cls, **overrides) -> 'FakeGroqBehavior':
+        options = {
+            option: getattr(settings, name) for option, name in BEHAVIOR_SETTINGS.items()
+            if hasattr(settings, name)
+        }
+        options.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**options)
+
+    def next_call(self):
+        """(latency in seconds, fault or None) for the next request"""
+        with self._lock:
+            self.stats['calls'] += 1
+            latency = self.latency_ms / 1000
+            if latency and self.latency_sigma:
+                # Lognormal around the median: a long right tail like real APIs
+                latency *= math.exp(self._rng.gauss(0, self.latency_sigma))
+            roll = self._rng.random()
+            fault = None
+            if roll < self.rate_limit_rate:
+                fault = RATE_LIMITED
+            elif roll < self.rate_limit_rate + self.malformed_rate:
+                fault = MALFORMED
+            if fault:
+                self.stats[fault] += 1
+        return latency, fault
+
+
+_shared_behaviors = {}
+_shared_lock = threading.Lock()
+
+
+def shared_behavior() -> FakeGroqBehavior:
+    """Process-wide behavior for the current settings, so every fake client
+    draws from one RNG and counts into one ``stats``"""
+    key = tuple(getattr(settings, name, None) for name in BEHAVIOR_SETTINGS.values())
+    with _shared_lock:
+        if key not in _shared_behaviors:
+            _shared_behaviors[key] = FakeGroqBehavior.from_settings()
+        return _shared_behaviors[key]
+
+
+def completion_payload(prompt: str, model: str, malformed: bool = False) -> Dict:
+    content = fake_content(prompt)
+    if malformed:
+        content = _malformed(content)
+    prompt_tokens, completion_tokens = _approx_tokens(prompt), _approx_tokens(content)
+    return {
+        'id': f'chatcmpl-fake-{_digest(prompt):x}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+            'logprobs': None,
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def chunk_payloads(completion: Dict, chunk_chars: int = 24) -> Iterator[Dict]:
+    content = completion['choices'][0]['message']['content']
+    base = {k: completion[k] for k in ('id', 'created', 'model')}
+    for start in range(0, len(content), chunk_chars):
+        yield {**base, 'object': 'chat.completion.chunk', 'choices': [
+            {'index': 0, 'delta': {'content': content[start:start + chunk_chars]}, 'finish_reason': None}
+        ]}
+    yield {**base, 'object': 'chat.completion.chunk', 'choices': [
+        {'index': 0, 'delta': {}, 'finish_reason': 'stop'}
+    ]}
+
+
+def rate_limit_body(retry_after: float) -> Dict:
+    return {'error': {
+        'message': f'Rate limit reached. Please try again in {retry_after}s.',
+        'type': 'tokens', 'code': 'rate_limit_exceeded',
+    }}
+
+
+def _rate_limit_error(retry_after: float) -> RateLimitError:
+    body = rate_limit_body(retry_after)
+    response = httpx.Response(
+        429, headers={'retry-after': str(retry_after)}, json=body,
+        request=httpx.Request('POST', 'http://fake-groq/openai/v1/chat/completions'),
+    )
+    return RateLimitError(body['error']['message'], response=response, body=body)
+
+
+def _timeout_error() -> APITimeoutError:
+    return APITimeoutError(request=httpx.Request('POST', 'http://fake-groq/openai/v1/chat/completions'))
+
+
+class _Completions:
+    def __init__(self, behavior: FakeGroqBehavior):
+        self.behavior = behavior
+
+    def _prepare(self, messages):
+        latency, fault = self.behavior.next_call()
+        if fault == RATE_LIMITED:
+            raise _rate_limit_error(self.behavior.retry_after)
+        return latency, fault == MALFORMED, messages[-1]['content']
+
+    @staticmethod
+    def _times_out(latency, stream, timeout):
+        # Like httpx, the timeout bounds the wait for the first byte
+        return timeout is not None and (latency * 0.4 if stream else latency) > timeout
+
+    def create(self, messages, model: str = 'fake', stream: bool = False, timeout: float = None, **kwargs):
+        latency, malformed, prompt = self._prepare(messages)
+        if self._times_out(latency, stream, timeout):
+            time.sleep(timeout)
+            raise _timeout_error()
+        completion = completion_payload(prompt, model, malformed)
+        if stream:
+            return self._stream(completion, latency)
+        time.sleep(latency)
+        return ChatCompletion.model_validate(completion)
+
+    @staticmethod
+    def _stream(completion, latency):
+        chunks = list(chunk_payloads(completion))
+        # Most of the wait is time to first token, the rest spread over chunks
+        time.sleep(latency * 0.4)
+        for chunk in chunks:
+            time.sleep(latency * 0.6 / len(chunks))
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, messages, model: str = 'fake', stream: bool = False, timeout: float = None,
+                     **kwargs):
+        latency, malformed, prompt = self._prepare(messages)
+        if self._times_out(latency, stream, timeout):
+            await asyncio.sleep(timeout)
+            raise _timeout_error()
+        completion = completion_payload(prompt, model, malformed)
+        if stream:
+            return self._astream(completion, latency)
+        await asyncio.sleep(latency)
+        return ChatCompletion.model_validate(completion)
+
+    @staticmethod
+    async def _astream(completion, latency):
+        chunks = list(chunk_payloads(completion))
+        await asyncio.sleep(latency * 0.4)
+        for chunk in chunks:
+            await asyncio.sleep(latency * 0.6 / len(chunks))
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+class _Chat:
+    def __init__(self, completions):
+        self.completions = completions
+
+
+class FakeGroq:
+    """Drop-in for ``groq.Groq``: accepts its constructor arguments and ignores them"""
+    completions_class = _Completions
+
+    def __init__(self, behavior: Optional[FakeGroqBehavior] = None, **client_kwargs):
+        self.behavior = behavior or shared_behavior()
+        self.chat = _Chat(self.completions_class(self.behavior))
+
+    def close(self):
+        pass
+
+
+class AsyncFakeGroq(FakeGroq):
+    """Drop-in for ``groq.AsyncGroq``"""
+    completions_class = _AsyncCompletions
+
+    async def close(self):
+        pass
+
+
+class FakeTransport:
+    """LLM_TRANSPORT='fake': in-process clients configured by the FAKE_GROQ_* settings"""
+    client_class = FakeGroq
+    async_client_class = AsyncFakeGroq
+    requires_api_key = False
+    setting_names = tuple(BEHAVIOR_SETTINGS.values())
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Serves POST .../chat/completions like the Groq API, JSON or SSE"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so client pools behave as in production
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+    behavior: FakeGroqBehavior = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.rstrip('/').endswith('chat/completions'):
+            return self._json(404, {'error': {'message': f'Unknown path {self.path}'}})
+        try:
+            request = json.loads(body)
+            prompt = request['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            return self._json(400, {'error': {'message': 'Invalid request body'}})
+
+        latency, fault = self.behavior.next_call()
+        if fault == RATE_LIMITED:
+            return self._json(429, rate_limit_body(self.behavior.retry_after),
+                              {'Retry-After': str(self.behavior.retry_after)})
+        completion = completion_payload(prompt, request.get('model', 'fake'), fault == MALFORMED)
+        if not request.get('stream'):
+            time.sleep(latency)
+            return self._json(200, completion)
+
+        chunks = list(chunk_payloads(completion))
+        time.sleep(latency * 0.4)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in chunks:
+            time.sleep(latency * 0.6 / len(chunks))
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n')
+        self._write_chunk('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _json(self, code, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        logger.debug(f'fake groq: {format % args}')
+
+
+def make_server(host: str = '127.0.0.1', port: int = 0,
+                behavior: Optional[FakeGroqBehavior] = None) -> ThreadingHTTPServer:
+    """HTTP server for the fake API; point GROQ_BASE_URL at http://host:port"""
+    handler = type('Handler', (FakeGroqHandler,), {'behavior': behavior or FakeGroqBehavior.from_settings()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import reset_queries, transaction
+from .models import LearningResource
+from . import analytics, catalog
+
+logger = logging.getLogger(__name__)
+
+# Rows per validation chunk and upsert statement
+IMPORT_BATCH_SIZE = getattr(settings, 'RESOURCE_IMPORT_BATCH_SIZE', 1000)
+# Row errors kept in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ('csv', 'jsonl')
+REQUIRED_FIELDS = ('resource_id', 'title', 'type', 'difficulty_level', 'course_id')
+OPTIONAL_FIELDS = ('recommendation_priority', 'description', 'url', 'estimated_duration')
+IMPORT_FIELDS = REQUIRED_FIELDS + OPTIONAL_FIELDS
+_FIELDS = [(name, LearningResource._meta.get_field(name)) for name in IMPORT_FIELDS]
+
+
+def detect_format(filename: str) -> Optional[str]:
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream: io.TextIOBase, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, row) one line at a time; unparsable lines yield an exception"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+
+
+def clean_row(row: Dict) -> Tuple[Dict, Dict]:
+    """Validate one row with the model fields' own rules; returns (values, errors)"""
+    values, errors = {}, {}
+    for name, field in _FIELDS:
+        raw = row.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, '') and name in OPTIONAL_FIELDS:
+            if name in row:
+                # An explicit empty value clears blank-able fields
+                values[name] = field.get_default()
+            continue
+        try:
+            values[name] = field.clean('' if raw is None else raw, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    return values, errors
+
+
+def _upsert(batch: Dict[str, Dict], dry_run: bool) -> None:
+    if dry_run or not batch:
+        return
+    # One statement per set of columns, so an existing row only has the
+    # columns its own line carries overwritten
+    groups = defaultdict(list)
+    for values in batch.values():
+        groups[frozenset(values)].append(values)
+    with transaction.atomic():
+        for columns, rows in groups.items():
+            LearningResource.objects.bulk_create(
+                [LearningResource(**values) for values in rows],
+                update_conflicts=True,
+                unique_fields=['resource_id'],
+                update_fields=sorted(columns - {'resource_id'}) + ['updated_at'],
+            )
+
+
+def import_resources(stream: io.TextIOBase, fmt: str, batch_size: int = None,
+                     dry_run: bool = False,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Stream rows from ``stream`` and upsert them by resource_id in fixed-size batches.
+
+    Only one batch is held in memory at a time, so file size doesn't matter.
+    Invalid rows are skipped and reported with their line numbers. ``progress``
+    is called with the running report after every batch.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    report = {'rows': 0, 'imported': 0, 'invalid': 0, 'errors': [], 'dry_run': dry_run}
+    started = time.perf_counter()
+    batch = {}
+
+    def flush():
+        _upsert(batch, dry_run)
+        report['imported'] += len(batch)
+        batch.clear()
+        # With DEBUG on, the connection logs every statement; keep memory flat
+        reset_queries()
+        if progress:
+            progress(_with_timing(report, started))
+
+    for line_no, row in iter_rows(stream, fmt):
+        report['rows'] += 1
+        if isinstance(row, Exception):
+            errors = {'row': [f'Invalid JSON: {row}']}
+        elif not isinstance(row, dict):
+            errors = {'row': ['Expected an object']}
+        else:
+            values, errors = clean_row(row)
+        if errors:
+            report['invalid'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'line': line_no, 'errors': errors})
+            continue
+
+        # The last occurrence of a resource_id within a batch wins
+        batch.pop(values['resource_id'], None)
+        batch[values['resource_id']] = values
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    if report['imported'] and not dry_run:
+        # bulk_create skips model signals
+        catalog.invalidate()
+        transaction.on_commit(catalog.invalidate)
+        if analytics.rollup_enabled():
+            analytics.rebuild_rollup(sections=['resources'])
+
+    return _with_timing(report, started)
+
+
+def _with_timing(report: Dict, started: float) -> Dict:
+    seconds = time.perf_counter() - started
+    report['seconds'] = round(seconds, 3)
+    report['rows_per_second'] = round(report['rows'] / seconds) if seconds > 0 else 0
+    return report
+
+
+def open_text(binary: io.BufferedIOBase) -> io.TextIOWrapper:
+    """Decode an uploaded or opened binary file lazily (UTF-8, BOM tolerated)"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def summarize(report: Dict) -> List[str]:
+    lines = [
+        f"{report['rows']} rows read, {report['imported']} "
+        f"{'valid' if report['dry_run'] else 'upserted'}, {report['invalid']} invalid",
+        f"{report['seconds']}s ({report['rows_per_second']} rows/s)",
+    ]
+    for error in report['errors'][:10]:
+        lines.append(f"  line {error['line']}: {error['errors']}")
+    return lines
@@ -0,0 +1,104 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import List
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from .models import Enrollment, Student, RecommendationJob
+from .services import generate_student_recommendations
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_recommendation_job(student: Student, max_recommendations: int = 5,
+                               force_regenerate: bool = False, mode: str = '') -> RecommendationJob:
+    """Queue recommendation generation for a worker to pick up"""
+    return RecommendationJob.objects.create(
+        student=student,
+        max_recommendations=max_recommendations,
+        force_regenerate=force_regenerate,
+        mode=mode or '',
+    )
+
+
+def enqueue_recommendation_jobs(students: List[Student], max_recommendations: int = 5,
+                                force_regenerate: bool = False, mode: str = '') -> List[RecommendationJob]:
+    """Queue one job per student, in a single insert"""
+    return RecommendationJob.objects.bulk_create([
+        RecommendationJob(
+            student=student,
+            max_recommendations=max_recommendations,
+            force_regenerate=force_regenerate,
+            mode=mode or '',
+        )
+        for student in students
+    ])
+
+
+def claim_jobs(limit: int, worker_name: str) -> List[RecommendationJob]:
+    """Atomically move up to ``limit`` of the oldest queued jobs to running.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the backend supports it so
+    concurrent workers never block on or double-claim the same rows. Other
+    backends (SQLite) rely on the conditional UPDATE below, which only flips
+    rows that are still queued.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        queued = RecommendationJob.objects.filter(status='queued').order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        job_ids = list(queued.values_list('id', flat=True)[:limit])
+
+        RecommendationJob.objects.filter(id__in=job_ids, status='queued').update(
+            status='running',
+            worker=worker_name,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(
+        RecommendationJob.objects.filter(
+            id__in=job_ids, status='running', worker=worker_name, started_at=now
+        ).select_related('student').prefetch_related(
+            Prefetch('student__enrollments', queryset=Enrollment.objects.select_related('course'))
+        )
+    )
+
+
+def process_job(job: RecommendationJob) -> RecommendationJob:
+    """Run a claimed job and record its outcome"""
+    try:
+        result = generate_student_recommendations(
+            job.student, job.max_recommendations, job.force_regenerate, mode=job.mode or None
+        )
+        job.set_result(result)
+        job.status = 'succeeded'
+    except Exception as e:
+        logger.error(f"Recommendation job {job.job_id} failed: {e}")
+        job.error = str(e)
+        job.status = 'failed'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'error', 'status', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(timeout_seconds: int = None) -> int:
+    """Put back jobs whose worker died while running them"""
+    if timeout_seconds is None:
+        timeout_seconds = getattr(settings, 'RECOMMENDATION_JOB_TIMEOUT', 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    return RecommendationJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='queued', worker='', started_at=None
+    )
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from . import metrics
+from .models import LLMResponseCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, temperature: float, prompt: str) -> str:
+    """Stable hash of everything that determines the LLM response"""
+    payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BaseResponseCache:
+    """Interface for LLM response caches, with hit/miss counters"""
+
+    def __init__(self, default_ttl: int = 3600):
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        self._record(value is not None)
+        return value
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.CACHE_REQUESTS.labels(type(self).__name__, 'hit' if hit else 'miss').inc()
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None, model: str = '') -> None:
+        self._set(key, value, self.default_ttl if ttl is None else ttl, model)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str, ttl: int, model: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class NullResponseCache(BaseResponseCache):
+    """Cache that never stores anything"""
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value, ttl, model):
+        pass
+
+    def clear(self):
+        pass
+
+
+class InMemoryLRUCache(BaseResponseCache):
+    """Per-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, value)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl, model):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseResponseCache(BaseResponseCache):
+    """Cache stored in LLMResponseCacheEntry, shared by every process"""
+
+    def _lookup(self, key):
+        # Expired rows are ignored here and removed by purge_expired()
+        return LLMResponseCacheEntry.objects.filter(
+            key=key, expires_at__gt=timezone.now()
+        ).values_list('response', 'expires_at').first()
+
+    def _get(self, key):
+        entry = self._lookup(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str):
+        """Like get(), but returns a (response, expires_at) tuple"""
+        entry = self._lookup(key)
+        self._record(entry is not None)
+        return entry
+
+    def _set(self, key, value, ttl, model):
+        LLMResponseCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'model': model,
+                'response': value,
+                'expires_at': timezone.now() + timedelta(seconds=ttl),
+            },
+        )
+
+    def purge_expired(self) -> int:
+        deleted, _ = LLMResponseCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def clear(self):
+        LLMResponseCacheEntry.objects.all().delete()
+
+
+class TieredResponseCache(BaseResponseCache):
+    """In-memory LRU in front of the database tier"""
+
+    def __init__(self, max_entries: int = 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.memory = InMemoryLRUCache(max_entries=max_entries, **kwargs)
+        self.database = DatabaseResponseCache(**kwargs)
+
+    def _get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        try:
+            entry = self.database.get_entry(key)
+        except Exception as e:
+            # A miss costs one LLM call; an error here would fail the request
+            logger.error(f"Failed to read LLM response cache entry: {e}")
+            return None
+        if entry is None:
+            return None
+        # Promote to memory for the rest of the entry's lifetime
+        response, expires_at = entry
+        remaining = (expires_at - timezone.now()).total_seconds()
+        if remaining > 0:
+            self.memory.set(key, response, ttl=remaining)
+        return response
+
+    def _set(self, key, value, ttl, model):
+        self.memory.set(key, value, ttl=ttl, model=model)
+        try:
+            self.database.set(key, value, ttl=ttl, model=model)
+        except Exception as e:
+            # The memory tier still serves this process
+            logger.error(f"Failed to persist LLM response cache entry: {e}")
+
+    def stats(self):
+        stats = super().stats()
+        stats['memory'] = self.memory.stats()
+        stats['database'] = self.database.stats()
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        self.database.clear()
+
+
+CACHE_BACKENDS = {
+    'none': NullResponseCache,
+    'memory': InMemoryLRUCache,
+    'database': DatabaseResponseCache,
+    'tiered': TieredResponseCache,
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def build_response_cache() -> BaseResponseCache:
+    """Build the cache configured by LLM_CACHE_BACKEND (short name or dotted path)"""
+    backend = getattr(settings, 'LLM_CACHE_BACKEND', 'tiered')
+    cache_class = CACHE_BACKENDS.get(backend) or import_string(backend)
+    kwargs = {'default_ttl': getattr(settings, 'LLM_CACHE_TTL', 3600)}
+    if cache_class in (InMemoryLRUCache, TieredResponseCache):
+        kwargs['max_entries'] = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 1024)
+    return cache_class(**kwargs)
+
+
+def get_response_cache() -> BaseResponseCache:
+    """Process-wide response cache shared by every engine instance"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = build_response_cache()
+    return _cache
+
+
+def reset_response_cache() -> None:
+    """Drop the process-wide cache so the next call rebuilds it from settings"""
+    global _cache
+    with _cache_lock:
+        _cache = None
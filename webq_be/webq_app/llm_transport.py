@@ -0,0 +1,35 @@
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+from groq import AsyncGroq, Groq
+
+
+class GroqTransport:
+    """The real Groq API (needs GROQ_API_KEY)"""
+    client_class = Groq
+    async_client_class = AsyncGroq
+    requires_api_key = True
+    setting_names = ()  # settings that configure the clients, beyond the GROQ_* ones
+
+
+# Short names for LLM_TRANSPORT, as dotted paths so that a transport (the
+# fake pulls in http.server) is only imported when it is selected
+TRANSPORTS = {
+    'groq': 'webq_app.llm_transport.GroqTransport',
+    'fake': 'webq_app.fake_groq.FakeTransport',
+}
+
+
+@lru_cache(maxsize=None)
+def _load(path: str):
+    return import_string(path)
+
+
+def get_transport():
+    """Transport configured by LLM_TRANSPORT (short name or dotted path)"""
+    name = getattr(settings, 'LLM_TRANSPORT', 'groq')
+    return _load(TRANSPORTS.get(name, name))
+
+
+def transport_available(transport) -> bool:
+    return bool(getattr(settings, 'GROQ_API_KEY', None)) or not transport.requires_api_key
@@ -0,0 +1,42 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from webq_app.candidates import topic_words
+from webq_app.catalog import get_catalog
+from webq_app.scoring import np
+from webq_app.similarity import build_index
+
+
+class Command(BaseCommand):
+    help = 'Bring the resource similarity index up to date, and optionally query it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Index file (default: SIMILARITY_INDEX_PATH)')
+        parser.add_argument('--query', help='Course names or topic words to look up afterwards')
+        parser.add_argument('--top', type=int, default=10, help='Matches to show for --query')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SIMILARITY_INDEX_PATH
+        if not path:
+            self.stderr.write(self.style.WARNING('No SIMILARITY_INDEX_PATH or --path: the index is not saved'))
+
+        if np is None:
+            raise CommandError('The similarity index needs NumPy')
+
+        catalog = get_catalog()
+        start = time.perf_counter()
+        index = build_index(catalog.resources, path=path)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index)} resources in {elapsed * 1000:.0f} ms '
+            f'({len(index) - index.reused} tokenized, {index.reused} reused)'
+        ))
+
+        if options['query']:
+            positions, scores = index.top_k(topic_words([options['query']]), options['top'])
+            for position, score in zip(positions.tolist(), scores.tolist()):
+                if score <= 0:
+                    break
+                resource = catalog.resources[position]
+                self.stdout.write(f'{score:.3f}  {resource.resource_id:<12} {resource.title}')
@@ -0,0 +1,109 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from webq_app.pagination import KeysetPagination
+from webq_app.views import LearningResourceListCreateView
+from webq_app.models import (
+    Enrollment, LearningResource, LLMResponseCacheEntry, Recommendation, RecommendationJob, Student
+)
+
+# Plan fragments that mean a table is read or sorted in full
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN\b|USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'\bSeq Scan\b|\bSort\b'),
+    'mysql': re.compile(r'\btype\W+ALL\b|Using filesort'),
+}
+
+REC_ORDERING = ('-recommendation_date', '-id')
+RESOURCE_ORDERING = LearningResourceListCreateView.keyset_ordering
+PAGE = 51  # default page size plus the look-ahead row
+
+
+def _seek(ordering, position):
+    return KeysetPagination(ordering)._seek(position, reverse=False)
+
+
+def hot_queries(student, resource):
+    """(name, queryset, expect_full_scan) for every query on a request hot path"""
+    return [
+        ('student recommendations by status',
+         student.recommendation_set.filter(status='viewed').order_by(*REC_ORDERING), False),
+        ('student recommendations page',
+         student.recommendation_set.filter(_seek(REC_ORDERING, [timezone.now(), 0]))
+         .order_by(*REC_ORDERING)[:PAGE], False),
+        ('active recommendation count',
+         student.recommendation_set.filter(status='recommended').values('id'), False),
+        ('bulk active recommendation counts',
+         Recommendation.objects.filter(student__in=[student.pk], status='recommended')
+         .values_list('student__student_id').annotate(total=Count('id')), False),
+        ('existing (student, resource) pairs',
+         Recommendation.objects.filter(student_id__in=[student.pk]).values_list('student_id', 'resource_id'),
+         False),
+        ('candidate resources by difficulty and type',
+         LearningResource.objects.filter(
+             difficulty_level=resource.difficulty_level, type__in=[resource.type]
+         ).order_by('-recommendation_priority'), False),
+        ('catalog snapshot load', LearningResource.objects.all(), True),
+        ('resource list page',
+         LearningResource.objects.filter(_seek(RESOURCE_ORDERING, [5, 'M', 0]))
+         .order_by(*RESOURCE_ORDERING)[:PAGE], False),
+        ('student list page', Student.objects.filter(id__gt=0).order_by('id')[:PAGE], False),
+        ('students by course and enrollment status',
+         Enrollment.objects.filter(course__name='Python Basics', status=Enrollment.PENDING)
+         .values_list('student_id', flat=True), False),
+        ('queued job claim',
+         RecommendationJob.objects.filter(status='queued').order_by('created_at').values('id')[:10], False),
+        ('LLM response cache lookup',
+         LLMResponseCacheEntry.objects.filter(key='0' * 64, expires_at__gt=timezone.now()), False),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print database query plans for the recommendation hot paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student-id', help='Student to plan queries for (default: any)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Execute the queries and report actual timings (PostgreSQL)')
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if an unexpected full scan or sort is planned')
+
+    def handle(self, *args, **options):
+        if options['student_id']:
+            student = Student.objects.filter(student_id=options['student_id']).first()
+            if student is None:
+                raise CommandError(f"Student {options['student_id']} not found")
+        else:
+            # Unsaved placeholders still produce representative plans on an empty database
+            student = Student.objects.first() or Student(pk=1)
+        resource = LearningResource.objects.first() or LearningResource(
+            difficulty_level='beginner', type='tutorial'
+        )
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        self.stdout.write(f'Query plans on {connection.vendor}\n')
+        unexpected = []
+        for name, queryset, expect_full_scan in hot_queries(student, resource):
+            plan = queryset.explain(**explain_options)
+            full_scan = bool(pattern and pattern.search(plan))
+            if full_scan and not expect_full_scan:
+                unexpected.append(name)
+                label = self.style.ERROR(f'{name} [FULL SCAN]')
+            else:
+                label = self.style.SUCCESS(name)
+            self.stdout.write(label)
+            self.stdout.write(f'{plan}\n')
+
+        if unexpected:
+            message = f"Unexpected full scans: {', '.join(unexpected)}"
+            if options['check']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
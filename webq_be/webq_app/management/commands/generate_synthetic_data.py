@@ -0,0 +1,182 @@
+import copy
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.db.models import AutoField
+from django.utils import timezone
+from webq_app import analytics, catalog
+from webq_app.models import Course, Enrollment, LearningResource, Recommendation, Student
+
+SUBJECTS = [
+    'Python', 'JavaScript', 'Data Structures', 'Algorithms', 'Databases', 'Machine Learning',
+    'Web Development', 'Statistics', 'Linear Algebra', 'Cloud Computing', 'DevOps', 'Networking',
+    'Operating Systems', 'Security', 'React', 'Deep Learning', 'Data Science', 'Discrete Math',
+]
+LEVELS = ['Basics', 'Fundamentals', 'Intermediate', 'Advanced', 'Projects', 'Capstone']
+TOPICS = ['Introduction to', 'Hands-on', 'Deep Dive:', 'Practical', 'Mastering', 'Crash Course:']
+
+# Relative frequencies, loosely shaped after a real catalog and engagement funnel
+TYPE_WEIGHTS = {'tutorial': 30, 'article': 25, 'video': 25, 'quiz': 12, 'assignment': 8}
+DIFFICULTY_WEIGHTS = {'beginner': 45, 'intermediate': 35, 'advanced': 20}
+STATUS_WEIGHTS = {'recommended': 50, 'viewed': 25, 'completed': 15, 'dismissed': 10}
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, reproducible synthetic dataset for load tests and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--resources', type=int, default=200)
+        parser.add_argument('--recs-per-student', type=int, default=5)
+        parser.add_argument('--courses', type=int, default=60,
+                            help='Distinct courses to enroll students in')
+        parser.add_argument('--days', type=int, default=180,
+                            help='Spread recommendation dates over this many past days')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Students generated (and rows written) per transaction')
+        parser.add_argument('--prefix', default='SYN',
+                            help='Prefix for generated student and resource ids')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        prefix = options['prefix']
+        if options['recs_per_student'] > options['resources']:
+            raise CommandError('--recs-per-student cannot exceed --resources')
+        if (Student.objects.filter(student_id__startswith=prefix).exists()
+                or LearningResource.objects.filter(resource_id__startswith=prefix).exists()):
+            raise CommandError(f"Rows with prefix '{prefix}' already exist; pass a different --prefix")
+
+        started = time.perf_counter()
+        self.written = 0
+        course_pks = self._courses(options['courses'])
+        resource_pks = self._resources(prefix, options['resources'], options['batch_size'])
+
+        batch_size = options['batch_size']
+        for offset in range(0, options['students'], batch_size):
+            count = min(batch_size, options['students'] - offset)
+            with transaction.atomic():
+                students = self._students(prefix, offset, count)
+                self._enrollments(students, course_pks)
+                self._recommendations(students, resource_pks, options['recs_per_student'],
+                                      options['days'])
+            reset_queries()
+            elapsed = time.perf_counter() - started
+            self.stderr.write(
+                f'  {offset + count}/{options["students"]} students, '
+                f'{self.written} rows ({self.written / elapsed:,.0f} rows/s)',
+                ending='\r'
+            )
+
+        # bulk_create skips model signals
+        catalog.invalidate()
+        if analytics.rollup_enabled():
+            analytics.rebuild_rollup()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {self.written:,} rows in {elapsed:.1f}s ({self.written / elapsed:,.0f} rows/s)'
+        ))
+
+    def _write(self, model, objs, **kwargs):
+        created = model.objects.bulk_create(objs, batch_size=kwargs.pop('batch_size', None), **kwargs)
+        self.written += len(objs)
+        return created
+
+    def _courses(self, count):
+        names = [f'{subject} {level}' for level in LEVELS for subject in SUBJECTS][:count]
+        Course.objects.bulk_create([Course(name=name) for name in names], ignore_conflicts=True)
+        return list(Course.objects.filter(name__in=names).values_list('pk', flat=True))
+
+    def _resources(self, prefix, count, batch_size):
+        rng = self.rng
+        types, type_weights = zip(*TYPE_WEIGHTS.items())
+        levels, level_weights = zip(*DIFFICULTY_WEIGHTS.items())
+        resources = []
+        for i in range(count):
+            subject = rng.choice(SUBJECTS)
+            resources.append(LearningResource(
+                resource_id=f'{prefix}R{i:07d}',
+                title=f'{rng.choice(TOPICS)} {subject} #{i}',
+                type=rng.choices(types, type_weights)[0],
+                difficulty_level=rng.choices(levels, level_weights)[0],
+                course_id=f'{subject[:3].upper()}{rng.randint(1, 4)}01',
+                # Most resources sit in the middle of the priority range
+                recommendation_priority=round(rng.triangular(1, 10, 6)),
+                description=f'Synthetic {subject.lower()} resource',
+                url=f'https://example.com/resources/{i}',
+                estimated_duration=max(5, min(240, round(rng.lognormvariate(3.4, 0.5)))),
+            ))
+        with transaction.atomic():
+            created = self._write(LearningResource, resources, batch_size=batch_size)
+        return [resource.pk for resource in created]
+
+    def _students(self, prefix, offset, count):
+        rng = self.rng
+        students = [
+            Student(
+                student_id=f'{prefix}{i:08d}',
+                name=f'Student {i}',
+                email=f'{prefix.lower()}{i}@example.com',
+                # Roughly normal scores, clipped to the valid range
+                performance_score=round(min(100.0, max(0.0, rng.gauss(68, 15))), 1),
+            )
+            for i in range(offset, offset + count)
+        ]
+        return self._write(Student, students)
+
+    def _enrollments(self, students, course_pks):
+        rng = self.rng
+        enrollments = []
+        for student in students:
+            # Long-tailed: most students have a few courses, some have many
+            completed = min(int(rng.expovariate(1 / 3)), len(course_pks))
+            pending = min(rng.randint(0, 4), len(course_pks) - completed)
+            courses = rng.sample(course_pks, completed + pending)
+            enrollments.extend(
+                Enrollment(student_id=student.pk, course_id=course_pk,
+                           status=Enrollment.COMPLETED if n < completed else Enrollment.PENDING)
+                for n, course_pk in enumerate(courses)
+            )
+        self._write(Enrollment, enrollments)
+
+    def _recommendations(self, students, resource_pks, per_student, days):
+        rng = self.rng
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        horizon = days * 86400
+        recommendations = []
+        for student in students:
+            # Stronger students get more confident recommendations
+            base = 0.45 + student.performance_score / 400
+            for resource_pk in rng.sample(resource_pks, per_student):
+                recommendations.append(Recommendation(
+                    student_id=student.pk,
+                    resource_id=resource_pk,
+                    status=rng.choices(statuses, status_weights)[0],
+                    confidence_score=round(min(0.99, max(0.05, rng.gauss(base, 0.12))), 2),
+                    reason='Synthetic recommendation',
+                    recommendation_date=self.now - timedelta(seconds=rng.randrange(horizon)),
+                ))
+        self._write_backdated(Recommendation, recommendations)
+
+    def _write_backdated(self, model, objs):
+        """bulk_create that keeps the dates set on ``objs`` instead of auto_now_add's 'now'.
+
+        Inserts through copies of the auto_now_add fields with it switched
+        off, so the model's own fields are never touched. The objects don't
+        get their pks back.
+        """
+        fields = []
+        for field in model._meta.concrete_fields:
+            if isinstance(field, AutoField):
+                continue
+            if getattr(field, 'auto_now_add', False):
+                field = copy.copy(field)
+                field.auto_now_add = False
+            fields.append(field)
+        model.objects.all()._batched_insert(objs, fields, batch_size=None)
+        self.written += len(objs)
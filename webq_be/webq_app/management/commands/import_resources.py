@@ -0,0 +1,43 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from webq_app.importer import FORMATS, detect_format, import_resources, open_text, summarize
+
+
+class Command(BaseCommand):
+    help = 'Stream learning resources from a CSV or JSONL file and upsert them by resource_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows validated and upserted per batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate only, without writing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+
+        try:
+            binary = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        with open_text(binary) as stream:
+            report = import_resources(
+                stream, fmt, batch_size=options['batch_size'],
+                dry_run=options['dry_run'], progress=self._progress
+            )
+
+        for line in summarize(report):
+            self.stdout.write(line)
+        style = self.style.WARNING if report['invalid'] else self.style.SUCCESS
+        self.stdout.write(style('Import finished'))
+
+    def _progress(self, report):
+        self.stderr.write(
+            f"  {report['rows']} rows ({report['rows_per_second']} rows/s)", ending='\r'
+        )
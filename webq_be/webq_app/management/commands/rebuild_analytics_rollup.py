@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from webq_app.analytics import SECTIONS, rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = 'Recount the analytics rollup table from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--section', action='append', choices=SECTIONS, dest='sections',
+                            help='Only rebuild this section (repeatable)')
+
+    def handle(self, *args, **options):
+        counts = rebuild_rollup(options['sections'] or SECTIONS)
+        for metric, value in sorted(counts.items()):
+            self.stdout.write(f'{metric}: {value}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counts)} analytics counters'))
@@ -0,0 +1,388 @@
+import json
+import logging
+import math
+import platform
+import subprocess
+import time
+from io import StringIO
+from pathlib import Path
+from django import get_version
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from webq_app import urls
+from webq_app.ai_engine import AIRecommendationEngine, RecommendationStreamParser
+from webq_app.catalog import get_catalog
+from webq_app.models import LearningResource, Recommendation, RecommendationJob, Student
+from webq_app.similarity import SimilarityIndex
+
+BENCHMARK_DIR = Path(settings.BASE_DIR) / 'benchmarks'
+DEFAULT_BASELINE = BENCHMARK_DIR / 'baseline.json'
+RESULTS_DIR = BENCHMARK_DIR / 'results'
+DATASET_PREFIX = 'BENCH{size}_'  # ids of the generated students and resources
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, math.ceil(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+def summarize(durations, queries, errors=0):
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        'iterations': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        # Sequential, single client: an upper bound on per-request service time
+        'throughput_per_s': round(len(ordered) / total, 1) if total else 0.0,
+        'queries': max(queries) if queries else 0,
+        'errors': errors,
+    }
+
+
+def compare(baseline, current, threshold=0.25, min_delta_ms=0.5):
+    """Regressions of ``current`` against ``baseline`` results.
+
+    A benchmark regresses when its p50 or p95 grows by more than
+    ``threshold`` (a fraction) and by more than ``min_delta_ms``, or when it
+    runs more queries. Benchmarks missing from either side are skipped.
+    """
+    previous = {(r['size'], r['kind'], r['name']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['size'], result['kind'], result['name']))
+        if before is None:
+            continue
+        reasons = []
+        for metric in ('p50_ms', 'p95_ms'):
+            delta = result[metric] - before[metric]
+            if delta > min_delta_ms and delta > before[metric] * threshold:
+                reasons.append(f'{metric} {before[metric]:.2f} -> {result[metric]:.2f}')
+        if result['queries'] > before['queries']:
+            reasons.append(f"queries {before['queries']} -> {result['queries']}")
+        if reasons:
+            regressions.append({
+                'size': result['size'], 'kind': result['kind'], 'name': result['name'],
+                'reasons': reasons,
+            })
+    return regressions
+
+
+class QueryCounter:
+    """Counts executed statements; unlike CaptureQueriesContext it survives reset_queries()"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _consume(response):
+    # Streaming views run their queries while the body is iterated
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every API endpoint and the recommendation engine across dataset sizes, '
+            'save the results as JSON and flag regressions against a baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Dataset sizes, in students')
+        parser.add_argument('--iterations', type=int, default=30,
+                            help='Timed requests per endpoint')
+        parser.add_argument('--engine-iterations', type=int, default=200,
+                            help='Timed calls per engine method')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Results to compare against, if the file exists')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Also write these results to the baseline file')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Relative p50/p95 growth that counts as a regression')
+        parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                            help='Ignore latency changes smaller than this')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a regression is found')
+        parser.add_argument('--llm', choices=['off', 'fake'], default='off',
+                            help="'off' times the rule-based path; 'fake' runs the AI path "
+                                 "against the in-process Groq stand-in")
+        parser.add_argument('--llm-latency-ms', type=float, default=0.0,
+                            help='Median fake Groq latency with --llm fake')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Generate data in the configured database instead of a '
+                                 'throwaway test database; the rows are deleted afterwards')
+
+    def handle(self, *args, **options):
+        self.options = options
+        sizes = sorted(set(options['sizes']))
+        report = {'meta': self._meta(sizes), 'results': []}
+
+        old_name = None
+        if not options['use_current_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        # Never the network: either the rule-based path, or the AI path
+        # against the fake Groq, so the numbers measure this service
+        llm = {'LLM_TRANSPORT': 'groq', 'GROQ_API_KEY': ''}
+        if options['llm'] == 'fake':
+            llm = {
+                'LLM_TRANSPORT': 'fake', 'FAKE_GROQ_LATENCY_MS': options['llm_latency_ms'],
+                'FAKE_GROQ_RATE_LIMIT_RATE': 0.0, 'FAKE_GROQ_MALFORMED_RATE': 0.0,
+            }
+        overrides = override_settings(ALLOWED_HOSTS=['*'], **llm)
+        logging.disable(logging.WARNING)
+        try:
+            with overrides:
+                for size in sizes:
+                    self.stdout.write(f'Dataset: {size} students')
+                    try:
+                        fixture = self._dataset(size, flush=old_name is not None)
+                        report['results'] += self._bench_api(size, fixture)
+                        report['results'] += self._bench_engine(size, fixture)
+                    finally:
+                        if old_name is None:
+                            self._remove_dataset(size)
+        finally:
+            logging.disable(logging.NOTSET)
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self._print(report)
+        output = Path(options['output']) if options['output'] else (
+            RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        self._save(output, report)
+
+        baseline_path = Path(options['baseline'])
+        regressions = []
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text())
+            if baseline['meta'].get('llm', 'off') != options['llm']:
+                self.stderr.write(self.style.WARNING(
+                    f"Baseline was recorded with --llm {baseline['meta'].get('llm', 'off')}; "
+                    f"latencies are not comparable"
+                ))
+            regressions = compare(baseline, report, options['threshold'], options['min_delta_ms'])
+            self._print_regressions(baseline_path, regressions)
+        elif options['save_baseline']:
+            self._save(baseline_path, report)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark regression(s)')
+
+    def _meta(self, sizes):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'django': get_version(),
+            'database': connection.vendor,
+            'sizes': sizes,
+            'iterations': self.options['iterations'],
+            'engine_iterations': self.options['engine_iterations'],
+            'warmup': self.options['warmup'],
+            'llm': self.options['llm'],
+            'llm_latency_ms': self.options['llm_latency_ms'] if self.options['llm'] == 'fake' else None,
+        }
+
+    def _save(self, path, report):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f'Results written to {path}')
+
+    def _dataset(self, size, flush):
+        if flush:
+            call_command('flush', interactive=False, verbosity=0)
+        prefix = DATASET_PREFIX.format(size=size)
+        call_command(
+            'generate_synthetic_data', students=size, resources=min(5000, max(20, size // 10)),
+            recs_per_student=5, prefix=prefix, stdout=StringIO(), stderr=StringIO(),
+        )
+        student = Student.objects.with_courses().filter(student_id__startswith=prefix).first()
+        recommendation = Recommendation.objects.filter(student=student).select_related('resource').first()
+        job = RecommendationJob.objects.create(student=student, max_recommendations=5)
+        return {
+            'prefix': prefix,
+            'student': student,
+            'recommendation': recommendation,
+            'resource_id': recommendation.resource.resource_id,
+            'job_id': job.job_id,
+        }
+
+    def _remove_dataset(self, size):
+        # In the configured database the next run would find the prefix taken
+        prefix = DATASET_PREFIX.format(size=size)
+        Student.objects.filter(student_id__startswith=prefix).delete()
+        LearningResource.objects.filter(resource_id__startswith=prefix).delete()
+
+    def _time(self, func, iterations):
+        for _ in range(self.options['warmup']):
+            func(0)
+        durations, queries, errors = [], [], 0
+        for i in range(iterations):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                result = func(i)
+                durations.append(time.perf_counter() - start)
+            queries.append(counter.count)
+            if getattr(result, 'status_code', 200) >= 400:
+                errors += 1
+        return summarize(durations, queries, errors)
+
+    def _api_scenarios(self, fixture):
+        """One request per URL pattern, keyed by URL name"""
+        client = Client()
+        student_id = fixture['student'].student_id
+        generate = {'student_id': student_id, 'max_recommendations': 5, 'force_regenerate': True}
+        import_csv = 'resource_id,title,type,difficulty_level,course_id\n' + ''.join(
+            f'{fixture["prefix"]}IMP{i:03d},Imported {i},article,beginner,BEN101\n' for i in range(50)
+        )
+        statuses = ['viewed', 'completed']
+
+        def post_json(name, data, **kwargs):
+            return lambda i: client.post(reverse(name, kwargs=kwargs), data, content_type='application/json')
+
+        def get(name, params=None, **kwargs):
+            return lambda i: _consume(client.get(reverse(name, kwargs=kwargs), params))
+
+        return {
+            'student-list-create': get('student-list-create'),
+            'student-detail': get('student-detail', student_id=student_id),
+            'student-performance': get('student-performance', student_id=student_id),
+            'resource-list-create': get('resource-list-create'),
+            'import-resources': lambda i: client.post(reverse('import-resources'), {
+                'file': SimpleUploadedFile('resources.csv', import_csv.encode()),
+            }),
+            'resource-detail': get('resource-detail', resource_id=fixture['resource_id']),
+            'generate-recommendations': post_json('generate-recommendations', generate),
+            'generate-recommendations-async': post_json('generate-recommendations-async', generate),
+            'stream-recommendations': lambda i: _consume(client.post(
+                reverse('stream-recommendations'), generate, content_type='application/json'
+            )),
+            'generate-recommendations-batch': post_json('generate-recommendations-batch', {
+                'student_ids': list(Student.objects.filter(student_id__startswith=fixture['prefix'])
+                                    .order_by('id').values_list('student_id', flat=True)[:10]),
+                'max_recommendations': 5, 'force_regenerate': True,
+            }),
+            'student-recommendations': get('student-recommendations', student_id=student_id),
+            'recommendation-job-detail': get('recommendation-job-detail', job_id=fixture['job_id']),
+            'update-recommendation-status': lambda i: client.patch(
+                reverse('update-recommendation-status',
+                        kwargs={'recommendation_id': self._recommendation_id(fixture)}),
+                {'status': statuses[i % 2]}, content_type='application/json'
+            ),
+            'export-recommendations': get('export-recommendations', {'student_id': student_id}),
+            'export-students': get('export-students'),
+            'debug-recommendations': get('debug-recommendations', student_id=student_id),
+            'analytics-dashboard': get('analytics-dashboard'),
+        }
+
+    @staticmethod
+    def _recommendation_id(fixture):
+        # Regenerating recommendations replaces the fixture's row
+        recommendation = Recommendation.objects.filter(pk=fixture['recommendation'].pk).first()
+        if recommendation is None:
+            recommendation = Recommendation.objects.filter(student=fixture['student']).first()
+            fixture['recommendation'] = recommendation
+        return recommendation.pk
+
+    def _bench_api(self, size, fixture):
+        scenarios = self._api_scenarios(fixture)
+        missing = {p.name for p in urls.urlpatterns} - set(scenarios)
+        if missing:
+            self.stderr.write(f"No benchmark for: {', '.join(sorted(missing))}")
+
+        results = []
+        for name, func in scenarios.items():
+            result = self._time(func, self.options['iterations'])
+            results.append({'size': size, 'kind': 'api', 'name': name, **result})
+        return results
+
+    def _bench_engine(self, size, fixture):
+        engine = AIRecommendationEngine()
+        catalog = get_catalog()
+        student = fixture['student']
+        performance = engine._performance_data(student)
+        analysis = engine._fallback_analysis(performance, engine._base_analysis(student.performance_score))
+        picks = [
+            {'resource_id': resource.resource_id, 'confidence_score': 0.8, 'reason': 'Good fit'}
+            for resource in catalog.resources[:5]
+        ]
+        recommendations_text = f"```json\n{json.dumps({'recommendations': picks}, indent=2)}\n```"
+        analysis_text = json.dumps(analysis, indent=2)
+        combined_text = json.dumps({'analysis': analysis, 'recommendations': picks}, indent=2)
+        shortlist = engine._candidates(performance, catalog, set())
+
+        def stream_parse(i):
+            parser = RecommendationStreamParser()
+            for start in range(0, len(recommendations_text), 16):
+                parser.feed(recommendations_text[start:start + 16])
+
+        methods = {
+            'fallback_ranking': lambda i: engine._fallback_recommendations(
+                student, analysis, catalog, 5, existing_resource_ids=set()
+            ),
+            'candidate_shortlist': lambda i: engine._candidates(performance, catalog, set()),
+            'similarity_ranking': lambda i: engine._similarity_recommendations(
+                student, catalog, 5, set(), performance
+            ),
+            'similarity_index_build': lambda i: SimilarityIndex.build(
+                catalog.resources, settings.SIMILARITY_DIMENSIONS
+            ),
+            'analysis_prompt': lambda i: engine._create_analysis_prompt(performance),
+            'recommendation_prompt': lambda i: engine._create_recommendation_prompt(analysis, shortlist, 5),
+            'combined_prompt': lambda i: engine._create_combined_prompt(performance, shortlist, 5),
+            'parse_analysis': lambda i: engine._parse_ai_analysis(analysis_text),
+            'parse_recommendations': lambda i: engine._validate_recommendations(
+                engine._parse_ai_recommendations(recommendations_text), catalog
+            ),
+            'parse_combined': lambda i: engine._parse_ai_combined(combined_text),
+            'stream_parse': stream_parse,
+        }
+        results = []
+        for name, func in methods.items():
+            result = self._time(func, self.options['engine_iterations'])
+            results.append({'size': size, 'kind': 'engine', 'name': name, **result})
+        return results
+
+    def _print(self, report):
+        header = f"{'size':>7} {'kind':<7} {'name':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'queries':>8}"
+        self.stdout.write(header)
+        for r in report['results']:
+            line = (f"{r['size']:>7} {r['kind']:<7} {r['name']:<32} {r['p50_ms']:>9.2f} "
+                    f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_per_s']:>9.1f} {r['queries']:>8}")
+            self.stdout.write(self.style.ERROR(line) if r['errors'] else line)
+
+    def _print_regressions(self, baseline_path, regressions):
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+            return
+        self.stdout.write(self.style.WARNING(f'{len(regressions)} regression(s) against {baseline_path}:'))
+        for r in regressions:
+            self.stdout.write(f"  [{r['size']}] {r['kind']} {r['name']}: {'; '.join(r['reasons'])}")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from webq_app.fake_groq import FakeGroqBehavior, make_server
+
+
+class Command(BaseCommand):
+    help = ('Serve a local stand-in for the Groq chat completions API. Point GROQ_BASE_URL '
+            'at it (any GROQ_API_KEY works) to load-test the real HTTP client path offline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        # Unset options fall back to the FAKE_GROQ_* settings
+        parser.add_argument('--latency-ms', type=float, help='Median response latency')
+        parser.add_argument('--latency-sigma', type=float, help='Lognormal spread; 0 for a fixed latency')
+        parser.add_argument('--rate-limit-rate', type=float, help='Share of requests answered with 429')
+        parser.add_argument('--retry-after', type=float, help='Retry-After seconds sent with 429s')
+        parser.add_argument('--malformed-rate', type=float, help='Share of responses with broken JSON')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        behavior = FakeGroqBehavior.from_settings(
+            latency_ms=options['latency_ms'],
+            latency_sigma=options['latency_sigma'],
+            rate_limit_rate=options['rate_limit_rate'],
+            retry_after=options['retry_after'],
+            malformed_rate=options['malformed_rate'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], behavior)
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake Groq listening on http://{host}:{port} (GROQ_BASE_URL=http://{host}:{port}); '
+            f'median {behavior.latency_ms}ms, {behavior.rate_limit_rate:.0%} 429s, '
+            f'{behavior.malformed_rate:.0%} malformed'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {behavior.stats['calls']} requests: {behavior.stats}")
@@ -0,0 +1,105 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from webq_app.jobs import claim_jobs, default_worker_name, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued recommendation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=getattr(settings, 'RECOMMENDATION_WORKER_CONCURRENCY', 4),
+            help='Jobs processed in parallel (1 runs them inline)'
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling')
+        parser.add_argument('--worker-name', default=None)
+        parser.add_argument(
+            '--requeue-interval', type=float,
+            default=getattr(settings, 'RECOMMENDATION_REQUEUE_INTERVAL', 60),
+            help='Seconds between sweeps for jobs whose worker died'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_name = options['worker_name'] or default_worker_name()
+        self.stopping = threading.Event()
+
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous_handlers[signum] = signal.signal(signum, self._stop)
+
+        self.requeue_interval = options['requeue_interval']
+        self.next_requeue = 0.0
+
+        self.stdout.write(f'Worker {worker_name} started with concurrency {concurrency}')
+        processed = 0
+
+        if concurrency == 1:
+            while not self.stopping.is_set():
+                self._requeue_stale_jobs()
+                jobs = claim_jobs(1, worker_name)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                self._report(process_job(jobs[0]))
+                processed += 1
+        else:
+            in_flight = set()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                while not self.stopping.is_set():
+                    done = {f for f in in_flight if f.done()}
+                    processed += len(done)
+                    in_flight -= done
+                    self._requeue_stale_jobs()
+                    jobs = claim_jobs(concurrency - len(in_flight), worker_name)
+                    for job in jobs:
+                        in_flight.add(executor.submit(self._run_in_thread, job))
+
+                    if not jobs:
+                        if options['once'] and not in_flight:
+                            break
+                        time.sleep(options['poll_interval'])
+                # Leaving the executor waits for in-flight jobs to finish
+            processed += len(in_flight)
+
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_name} stopped after {processed} jobs'))
+
+    def _requeue_stale_jobs(self):
+        # Another worker may have died at any time, not just before this one started
+        now = time.monotonic()
+        if now < self.next_requeue:
+            return
+        self.next_requeue = now + self.requeue_interval
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+    def _run_in_thread(self, job):
+        close_old_connections()
+        try:
+            self._report(process_job(job))
+        finally:
+            # Worker threads each hold their own connection
+            connection.close()
+
+    def _report(self, job):
+        style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+        self.stdout.write(style(f'Job {job.job_id} for {job.student.student_id}: {job.status}'))
+
+    def _stop(self, signum, frame):
+        self.stdout.write('Shutting down after in-flight jobs finish...')
+        self.stopping.set()
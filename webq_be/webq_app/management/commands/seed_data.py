@@ -15,49 +15,53 @@ class Command(BaseCommand):
                 'name': 'Alice Johnson',
                 'email': 'alice.johnson@example.com',
                 'performance_score': 85.5,
-                'completed_courses': '["Python Basics", "Data Structures"]',
-                'pending_courses': '["Machine Learning", "Web Development"]'
+                'completed_courses': ["Python Basics", "Data Structures"],
+                'pending_courses': ["Machine Learning", "Web Development"]
             },
             {
                 'student_id': 'STU002',
                 'name': 'Bob Smith',
                 'email': 'bob.smith@example.com',
                 'performance_score': 62.3,
-                'completed_courses': '["HTML/CSS", "JavaScript Basics"]',
-                'pending_courses': '["React", "Node.js", "Database Design"]'
+                'completed_courses': ["HTML/CSS", "JavaScript Basics"],
+                'pending_courses': ["React", "Node.js", "Database Design"]
             },
             {
                 'student_id': 'STU003',
                 'name': 'Carol Davis',
                 'email': 'carol.davis@example.com',
                 'performance_score': 45.7,
-                'completed_courses': '["Programming Fundamentals"]',
-                'pending_courses': '["Python Basics", "Problem Solving", "Algorithms"]'
+                'completed_courses': ["Programming Fundamentals"],
+                'pending_courses': ["Python Basics", "Problem Solving", "Algorithms"]
             },
             {
                 'student_id': 'STU004',
                 'name': 'David Wilson',
                 'email': 'david.wilson@example.com',
                 'performance_score': 92.1,
-                'completed_courses': '["Python Advanced", "Machine Learning", "Data Science"]',
-                'pending_courses': '["Deep Learning", "AI Ethics"]'
+                'completed_courses': ["Python Advanced", "Machine Learning", "Data Science"],
+                'pending_courses': ["Deep Learning", "AI Ethics"]
             },
             {
                 'student_id': 'STU005',
                 'name': 'Eva Martinez',
                 'email': 'eva.martinez@example.com',
                 'performance_score': 78.9,
-                'completed_courses': '["Web Development", "React", "Node.js"]',
-                'pending_courses': '["DevOps", "Cloud Computing"]'
+                'completed_courses': ["Web Development", "React", "Node.js"],
+                'pending_courses': ["DevOps", "Cloud Computing"]
             }
         ]
 
         for student_data in students_data:
+            completed_courses = student_data.pop('completed_courses')
+            pending_courses = student_data.pop('pending_courses')
             student, created = Student.objects.get_or_create(
                 student_id=student_data['student_id'],
                 defaults=student_data
             )
             if created:
+                student.set_completed_courses(completed_courses)
+                student.set_pending_courses(pending_courses)
                 self.stdout.write(f'Created student: {student.name}')
 
         # Create sample learning resources
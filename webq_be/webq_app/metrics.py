@@ -0,0 +1,166 @@
+"""Prometheus metrics for the API and the recommendation engine, served at /metrics.
+
+Under gunicorn or any other pre-fork server, set PROMETHEUS_MULTIPROC_DIR to
+an empty, writable directory before the workers start (gunicorn.conf.py does
+this). Each worker then writes its samples to memory-mapped files there,
+and /metrics sums them across workers. Without the variable, the
+process-local registry is served.
+"""
+import os
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+from groq import APIStatusError, APITimeoutError, RateLimitError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from . import timing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    'webq_http_request_duration_seconds', 'API request latency (to the first byte when streaming)',
+    ['url_name', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('webq_http_requests', 'API responses by status class', ['url_name', 'method', 'status'])
+REQUEST_QUERIES = Histogram(
+    'webq_http_request_db_queries', 'Database queries per request', ['url_name'], buckets=QUERY_BUCKETS,
+)
+DB_QUERIES = Counter('webq_db_queries', 'Database queries executed while serving requests', ['url_name'])
+
+LLM_LATENCY = Histogram(
+    'webq_llm_request_duration_seconds', 'Groq chat completion latency', ['call'], buckets=LATENCY_BUCKETS,
+)
+LLM_ERRORS = Counter('webq_llm_errors', 'Failed Groq calls; reason="rate_limited" counts 429s', ['reason'])
+LLM_RETRIES = Counter('webq_llm_retries', 'Groq calls retried, by the error that caused the retry', ['reason'])
+LLM_SKIPPED = Counter(
+    'webq_llm_skipped', 'Groq calls not made: circuit breaker open or latency budget spent', ['reason'],
+)
+LLM_HEDGES = Counter('webq_llm_hedges', 'Hedged Groq requests launched, and those that answered first', ['outcome'])
+RECOMMENDATION_PATHS = Counter(
+    'webq_recommendation_path', 'Recommendation sets produced by the AI, the similarity ranking or the rule-based fallback',
+    ['path', 'mode'],
+)
+PARSE_FAILURES = Counter('webq_llm_parse_failures', 'Non-empty LLM responses that could not be parsed', ['parser'])
+CACHE_REQUESTS = Counter('webq_llm_cache_requests', 'LLM response cache lookups', ['backend', 'result'])
+
+# labels() costs a few microseconds per call, so hot paths reuse the children
+LLM_CALLS = {call: LLM_LATENCY.labels(call) for call in ('chat', 'achat', 'stream')}
+_request_children = {}  # (url_name, method, status class) -> label children
+
+
+def enabled() -> bool:
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def llm_error_reason(error: Exception) -> str:
+    if isinstance(error, RateLimitError):
+        return 'rate_limited'
+    if isinstance(error, APITimeoutError):
+        return 'timeout'
+    if isinstance(error, APIStatusError):
+        return f'http_{error.status_code}'
+    return type(error).__name__
+
+
+def record_llm_error(error: Exception) -> None:
+    LLM_ERRORS.labels(llm_error_reason(error)).inc()
+
+
+def record_path(path: str, mode: str) -> None:
+    RECOMMENDATION_PATHS.labels(path, mode).inc()
+
+
+def render() -> bytes:
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition of every metric above"""
+    if not enabled():
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Request latency, status and query-count metrics per URL name.
+
+    Query counts come from the timing collector. This middleware opens one
+    when ServerTimingMiddleware hasn't, so counts don't depend on
+    SERVER_TIMING_ENABLED.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+        timings, token = self._collector()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                timing._current.reset(token)
+        self._observe(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+        timings, token = self._collector()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                timing._current.reset(token)
+        self._observe(request, response, timings, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _collector():
+        timings = timing.current()
+        if timings is not None:
+            return timings, None
+        timings = timing.RequestTimings()
+        return timings, timing._current.set(timings)
+
+    @staticmethod
+    def _observe(request, response, timings, elapsed):
+        match = request.resolver_match
+        # Unresolved paths share one label so scanners can't blow up cardinality
+        url_name = (match.url_name or match.view_name) if match else 'unmatched'
+        key = (url_name, request.method, response.status_code // 100)
+        children = _request_children.get(key)
+        if children is None:
+            children = _request_children[key] = (
+                REQUEST_LATENCY.labels(url_name, request.method),
+                REQUESTS.labels(url_name, request.method, f'{key[2]}xx'),
+                REQUEST_QUERIES.labels(url_name),
+                DB_QUERIES.labels(url_name),
+            )
+        latency, responses, query_counts, queries_total = children
+        # Queries made so far; a streamed body's queries run after this point
+        queries = timings.phases.get('db', (0,))[0]
+        latency.observe(elapsed)
+        responses.inc()
+        query_counts.observe(queries)
+        if queries:
+            queries_total.inc(queries)
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webq_app', '0002_llmresponsecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('max_recommendations', models.IntegerField(default=5)),
+                ('force_regenerate', models.BooleanField(default=False)),
+                ('mode', models.CharField(blank=True, max_length=20)),
+                ('result', models.TextField(default='{}')),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='webq_app.student')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='recjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _load(value):
+    try:
+        courses = json.loads(value or '[]')
+    except ValueError:
+        return []
+    return [str(name) for name in courses if name] if isinstance(courses, list) else []
+
+
+def copy_course_lists(apps, schema_editor):
+    Student = apps.get_model('webq_app', 'Student')
+    Course = apps.get_model('webq_app', 'Course')
+    Enrollment = apps.get_model('webq_app', 'Enrollment')
+
+    course_pks = {}
+    enrollments = []
+    students = Student.objects.values_list('pk', 'completed_courses', 'pending_courses')
+    for student_pk, completed, pending in students.iterator(chunk_size=BATCH_SIZE):
+        statuses = {}
+        # A course listed as both completed and pending counts as completed
+        for name in _load(pending):
+            statuses[name] = 'pending'
+        for name in _load(completed):
+            statuses[name] = 'completed'
+        for name, status in statuses.items():
+            if name not in course_pks:
+                course_pks[name] = Course.objects.get_or_create(name=name)[0].pk
+            enrollments.append(
+                Enrollment(student_id=student_pk, course_id=course_pks[name], status=status)
+            )
+        if len(enrollments) >= BATCH_SIZE:
+            Enrollment.objects.bulk_create(enrollments, ignore_conflicts=True)
+            enrollments = []
+    Enrollment.objects.bulk_create(enrollments, ignore_conflicts=True)
+
+
+def restore_course_lists(apps, schema_editor):
+    Student = apps.get_model('webq_app', 'Student')
+    Enrollment = apps.get_model('webq_app', 'Enrollment')
+
+    lists = {}
+    for student_pk, name, status in Enrollment.objects.order_by('id').values_list(
+        'student_id', 'course__name', 'status'
+    ).iterator(chunk_size=BATCH_SIZE):
+        lists.setdefault(student_pk, {'completed': [], 'pending': []})[status].append(name)
+
+    for student_pk, courses in lists.items():
+        Student.objects.filter(pk=student_pk).update(
+            completed_courses=json.dumps(courses['completed']),
+            pending_courses=json.dumps(courses['pending']),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webq_app', '0005_course_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_course_lists, restore_course_lists),
+    ]
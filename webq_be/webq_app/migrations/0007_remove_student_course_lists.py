@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webq_app', '0006_copy_course_lists'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='student',
+            name='completed_courses',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='pending_courses',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webq_app', '0007_remove_student_course_lists'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learningresource',
+            index=models.Index(fields=['-recommendation_priority', 'title', 'id'], name='resource_priority_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learningresource',
+            index=models.Index(fields=['difficulty_level', 'type', '-recommendation_priority'], name='resource_diff_type_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['student', '-recommendation_date', '-id'], name='rec_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['student', 'status', '-recommendation_date', '-id'], name='rec_student_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webq_app', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningresource',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='recommendation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,6 +1,27 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
+import uuid
+
+class StudentQuerySet(models.QuerySet):
+    def with_courses(self):
+        """Prefetch enrollments so the course helpers don't query per student"""
+        return self.prefetch_related(
+            models.Prefetch('enrollments', queryset=Enrollment.objects.select_related('course'))
+        )
+
+    def with_performance(self, recent=5):
+        """Annotate recommendation totals and prefetch the ``recent`` newest with their resources"""
+        return self.annotate(
+            recommendation_count=models.Count('recommendation')
+        ).prefetch_related(
+            models.Prefetch(
+                'recommendation_set',
+                queryset=Recommendation.objects.select_related('resource')
+                .order_by('-recommendation_date', '-id')[:recent],
+                to_attr='recent_recommendations',
+            )
+        )
 
 class Student(models.Model):
     student_id = models.CharField(max_length=20, unique=True)
@@ -10,25 +31,91 @@ class Student(models.Model):
         validators=[MinValueValidator(0.0), MaxValueValidator(100.0)],
         default=0.0
     )
-    completed_courses = models.TextField(default='[]')  # JSON string
-    pending_courses = models.TextField(default='[]')   # JSON string
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StudentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.student_id})"
 
+    def get_courses(self):
+        """Course names by enrollment status, from the prefetch cache when available"""
+        courses = {status: [] for status, _ in Enrollment.STATUS_CHOICES}
+        if self.pk is None:
+            return courses
+        if 'enrollments' in getattr(self, '_prefetched_objects_cache', {}):
+            enrollments = self.enrollments.all()
+        else:
+            enrollments = self.enrollments.select_related('course')
+        for enrollment in enrollments:
+            courses[enrollment.status].append(enrollment.course.name)
+        return courses
+
     def get_completed_courses(self):
-        return json.loads(self.completed_courses)
+        return self.get_courses()[Enrollment.COMPLETED]
 
     def set_completed_courses(self, courses_list):
-        self.completed_courses = json.dumps(courses_list)
+        self._set_courses(Enrollment.COMPLETED, courses_list)
 
     def get_pending_courses(self):
-        return json.loads(self.pending_courses)
+        return self.get_courses()[Enrollment.PENDING]
 
     def set_pending_courses(self, courses_list):
-        self.pending_courses = json.dumps(courses_list)
+        self._set_courses(Enrollment.PENDING, courses_list)
+
+    def _set_courses(self, status, course_names):
+        """Replace the student's enrollments in ``status``; the student must be saved"""
+        course_names = list(dict.fromkeys(course_names))
+        with transaction.atomic():
+            Course.objects.bulk_create(
+                [Course(name=name) for name in course_names], ignore_conflicts=True
+            )
+            courses = Course.objects.in_bulk(course_names, field_name='name')
+            self.enrollments.filter(status=status).exclude(course__name__in=course_names).delete()
+            # A course moves between statuses instead of being enrolled twice
+            Enrollment.objects.bulk_create(
+                [Enrollment(student=self, course=courses[name], status=status) for name in course_names],
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                update_fields=['status', 'updated_at'],
+            )
+        getattr(self, '_prefetched_objects_cache', {}).pop('enrollments', None)
+
+class Course(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+class Enrollment(models.Model):
+    PENDING = 'pending'
+    COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (COMPLETED, 'Completed'),
+        (PENDING, 'Pending'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.course.name} ({self.status})"
+
+    class Meta:
+        unique_together = ['student', 'course']
+        ordering = ['id']  # enrollment order, as the course lists were stored
+        indexes = [
+            # "students with course X pending/completed"
+            models.Index(fields=['course', 'status'], name='enrollment_course_status_idx'),
+        ]
 
 class LearningResource(models.Model):
     RESOURCE_TYPES = [
@@ -58,12 +145,21 @@ class LearningResource(models.Model):
     url = models.URLField(blank=True)
     estimated_duration = models.IntegerField(default=30)  # minutes
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.title} ({self.type})"
 
     class Meta:
         ordering = ['-recommendation_priority', 'title']
+        indexes = [
+            # Catalog load and keyset pages in default ordering
+            models.Index(fields=['-recommendation_priority', 'title', 'id'],
+                         name='resource_priority_title_idx'),
+            # Candidate filters by difficulty and type, best first
+            models.Index(fields=['difficulty_level', 'type', '-recommendation_priority'],
+                         name='resource_diff_type_prio_idx'),
+        ]
 
 class Recommendation(models.Model):
     STATUS_CHOICES = [
@@ -83,6 +179,7 @@ class Recommendation(models.Model):
     )
     reason = models.TextField(blank=True)
     ai_metadata = models.TextField(default='{}')  # JSON string for AI analysis data
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Recommendation for {self.student.name}: {self.resource.title}"
@@ -90,9 +187,76 @@ class Recommendation(models.Model):
     class Meta:
         unique_together = ['student', 'resource']
         ordering = ['-recommendation_date']
+        indexes = [
+            # A student's recommendations, newest first (id keeps keyset pages unique)
+            models.Index(fields=['student', '-recommendation_date', '-id'], name='rec_student_date_idx'),
+            # ... filtered by status, and the active ('recommended') counts
+            models.Index(fields=['student', 'status', '-recommendation_date', '-id'],
+                         name='rec_student_status_date_idx'),
+        ]
 
     def get_ai_metadata(self):
         return json.loads(self.ai_metadata)
 
     def set_ai_metadata(self, metadata_dict):
-        self.ai_metadata = json.dumps(metadata_dict)
\ No newline at end of file
+        self.ai_metadata = json.dumps(metadata_dict)
+
+class LLMResponseCacheEntry(models.Model):
+    """Persistent tier of the LLM response cache"""
+    key = models.CharField(max_length=64, unique=True)  # sha256 of model, temperature and prompt
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model} response {self.key[:12]}"
+
+class RecommendationJob(models.Model):
+    """Queued recommendation generation, processed by run_recommendation_worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    max_recommendations = models.IntegerField(default=5)
+    force_regenerate = models.BooleanField(default=False)
+    mode = models.CharField(max_length=20, blank=True)
+    result = models.TextField(default='{}')  # JSON string with the generate response body
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.job_id} for {self.student.student_id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Workers claim the oldest queued jobs first
+            models.Index(fields=['status', 'created_at'], name='recjob_status_created_idx'),
+        ]
+
+    def get_result(self):
+        return json.loads(self.result)
+
+    def set_result(self, result_dict):
+        self.result = json.dumps(result_dict)
+
+class AnalyticsRollup(models.Model):
+    """Incrementally maintained counter behind the analytics dashboard"""
+    metric = models.CharField(max_length=100, unique=True)  # e.g. 'recommendations.status.viewed'
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.metric} = {self.value}"
+
@@ -0,0 +1,173 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # Full-precision isoformat: a truncated timestamp would skip or repeat rows
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks on the full ordering instead of using OFFSET.
+
+    ``ordering`` must end with a unique field (usually ``id``) so every row has
+    a distinct position. The cursor encodes the ordering values of the last
+    row on the page, and the next page is fetched with a ``WHERE (a, b, id) >
+    (...)`` condition. An index on the ordering then makes every page cost
+    the same no matter how deep the client has paged. Views choose the order
+    with a ``keyset_ordering`` attribute.
+    """
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    include_total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        self.include_total_default = getattr(settings, 'API_PAGINATION_INCLUDE_TOTAL', False)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return min(self.page_size, self.max_page_size)
+
+    def include_total(self, request):
+        value = request.query_params.get(self.include_total_query_param)
+        if value is None:
+            return self.include_total_default
+        return value.lower() in ('1', 'true', 'yes')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.include_total(request) else None
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = cursor is not None and cursor['reverse']
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(cursor['position'], reverse))
+
+        ordering = self._reversed(self.ordering) if reverse else self.ordering
+        # One extra row tells us whether another page exists
+        page = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            if has_more or reverse:
+                self.next_position = self._position(page[-1])
+            if cursor is not None and (has_more or not reverse):
+                self.previous_position = self._position(page[0])
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data, 'results'))
+
+    def get_paginated_data(self, data, results_key='results'):
+        body = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            body['count'] = self.count
+        body[results_key] = data
+        return body
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, default=_encode_value)
+        token = urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model=None):
+        """The cursor's position and direction; values are converted with ``model``'s fields"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            try:
+                position = [
+                    model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, position)
+                ]
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+            if None in position:
+                raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': reverse}
+
+    def _position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    def _seek(self, position, reverse):
+        """Rows strictly after ``position`` in ordering (before it when reversed)"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value})
+            equal[name] = value
+
+        # Redundant range on the leading column lets the planner seek the
+        # index instead of walking it from the start and filtering
+        first = self.ordering[0]
+        descending = first.startswith('-') != reverse
+        bound = Q(**{f'{first.lstrip("-")}__{"lte" if descending else "gte"}': position[0]})
+        return bound & condition
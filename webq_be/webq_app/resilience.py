@@ -0,0 +1,456 @@
+"""Latency budget, retries, circuit breaker and hedging around LLM calls.
+
+``LLMCallPolicy.call`` wraps one logical LLM request:
+
+- Each attempt gets at most LLM_ATTEMPT_TIMEOUT seconds, cut down to what is
+  left of the request's latency budget (``budget()``, LLM_LATENCY_BUDGET).
+  Once the budget is spent, calls raise ``BudgetExhausted`` without touching
+  the network, and the engine answers from the rule-based ranking.
+- Timeouts, connection errors, 429s and 5xx responses are retried up to
+  LLM_MAX_RETRIES times. The wait is Retry-After when the provider sends one,
+  and full-jitter exponential backoff otherwise. A retry that would wait past
+  the budget is not made.
+- The same failures count towards a circuit breaker. It opens after
+  LLM_BREAKER_FAILURE_THRESHOLD consecutive failures, and while it is open,
+  calls raise ``CircuitOpen`` at once. After LLM_BREAKER_RESET_TIMEOUT it lets
+  one trial call through: success closes it, failure opens it again.
+- With LLM_HEDGE_AFTER set, an attempt still running after that many seconds
+  races a second identical request, and the first good answer wins.
+
+Breaker state is per process, so each gunicorn worker trips on its own.
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from groq import APIConnectionError, APIStatusError
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Settings that require rebuilding the shared policy when they change
+POLICY_SETTINGS = (
+    'LLM_ATTEMPT_TIMEOUT',
+    'LLM_MAX_RETRIES',
+    'LLM_RETRY_BACKOFF_BASE',
+    'LLM_RETRY_BACKOFF_CAP',
+    'LLM_BREAKER_FAILURE_THRESHOLD',
+    'LLM_BREAKER_RESET_TIMEOUT',
+    'LLM_HEDGE_AFTER',
+)
+
+
+class CallSkipped(Exception):
+    """The LLM was not called at all; the caller should fall back"""
+    reason = 'skipped'
+
+
+class CircuitOpen(CallSkipped):
+    reason = 'circuit_open'
+
+
+class BudgetExhausted(CallSkipped):
+    reason = 'budget_exhausted'
+
+
+_deadline: ContextVar[Optional['Deadline']] = ContextVar('webq_llm_deadline', default=None)
+
+
+class Deadline:
+    """Point after which no further LLM attempt is started"""
+    __slots__ = ('expires',)
+
+    def __init__(self, seconds: Optional[float] = None):
+        if seconds is None:
+            seconds = getattr(settings, 'LLM_LATENCY_BUDGET', 0.0)
+        self.expires = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when there is no budget"""
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+
+class budget:
+    """Run the enclosed block against a latency budget.
+
+    Nested blocks keep the outer deadline, so the whole request is bounded
+    rather than each call. Pass a ``Deadline`` to share one between blocks,
+    e.g. across the yields of a generator.
+    """
+    __slots__ = ('deadline', 'token')
+
+    def __init__(self, deadline: Optional[Deadline] = None):
+        self.deadline = deadline
+
+    def __enter__(self) -> Deadline:
+        deadline = self.deadline or _deadline.get() or Deadline()
+        self.token = _deadline.set(deadline)
+        return deadline
+
+    def __exit__(self, *exc_info):
+        _deadline.reset(self.token)
+        return False
+
+
+def budgeted(func):
+    """Decorator form of ``budget()`` for functions and coroutines"""
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with budget():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with budget():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open -> closed"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold  # 0 disables the breaker
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        elif (self._state == self.HALF_OPEN and self._trial_in_flight
+              and self._clock() - self._trial_started >= self.reset_timeout):
+            # A trial that never reported back; let another one through
+            self._trial_in_flight = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; half-open admits one trial at a time"""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started = self._clock()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("LLM circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Forget an admitted call that ended without an outcome (cancelled or abandoned)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or (state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+                self.times_opened += 1
+                logger.warning(
+                    f"LLM circuit breaker opened after {self._failures} consecutive failures; "
+                    f"retrying in {self.reset_timeout}s"
+                )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = self.reset_timeout - (self._clock() - self._opened_at) if state == self.OPEN else 0.0
+            return {
+                'state': state if self.failure_threshold > 0 else 'disabled',
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'retry_in': round(max(retry_in, 0.0), 3),
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected,
+            }
+
+
+def is_retryable(error: Exception) -> bool:
+    """Failures that say the provider is unhealthy, not that our request is bad"""
+    if isinstance(error, APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After-Ms or Retry-After)"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=2 * getattr(settings, 'GROQ_HTTP_MAX_CONNECTIONS', 20),
+                    thread_name_prefix='llm-hedge',
+                )
+    return _executor
+
+
+class LLMCallPolicy:
+    """Budget, retries, breaker and hedging for one kind of LLM call"""
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, max_retries: int = 2,
+                 attempt_timeout: Optional[float] = None, backoff_base: float = 0.25,
+                 backoff_cap: float = 2.0, hedge_after: float = 0.0,
+                 sleep: Callable[[float], None] = time.sleep, rng: Optional[random.Random] = None):
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout or None
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_after = hedge_after
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_settings(cls) -> 'LLMCallPolicy':
+        return cls(
+            breaker=CircuitBreaker(
+                failure_threshold=getattr(settings, 'LLM_BREAKER_FAILURE_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'LLM_BREAKER_RESET_TIMEOUT', 30.0),
+            ),
+            max_retries=getattr(settings, 'LLM_MAX_RETRIES', 2),
+            attempt_timeout=getattr(settings, 'LLM_ATTEMPT_TIMEOUT', None),
+            backoff_base=getattr(settings, 'LLM_RETRY_BACKOFF_BASE', 0.25),
+            backoff_cap=getattr(settings, 'LLM_RETRY_BACKOFF_CAP', 2.0),
+            hedge_after=getattr(settings, 'LLM_HEDGE_AFTER', 0.0),
+        )
+
+    def admit(self, deadline: Optional[Deadline] = None) -> Optional[float]:
+        """Timeout for the next attempt, or CallSkipped if it must not be made"""
+        deadline = deadline or _deadline.get()
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            raise BudgetExhausted("LLM latency budget exhausted")
+        if not self.breaker.allow():
+            raise CircuitOpen("LLM circuit breaker is open")
+        if remaining is None:
+            return self.attempt_timeout
+        return min(remaining, self.attempt_timeout) if self.attempt_timeout else remaining
+
+    def settle(self, error: Optional[Exception] = None) -> None:
+        """Report an admitted attempt's outcome to the breaker"""
+        if error is not None and is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # Any answer, even a 400, shows the provider is reachable
+            self.breaker.record_success()
+
+    def abandon(self) -> None:
+        """Report an admitted attempt that was cancelled before it had an outcome"""
+        self.breaker.release()
+
+    def _retry_delay(self, error: Exception, retry: int) -> Optional[float]:
+        """Seconds to wait before retry number ``retry``, or None to give up"""
+        if retry > self.max_retries or not is_retryable(error):
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            delay = self._rng.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (retry - 1)))
+        deadline = _deadline.get()
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def call(self, attempt: Callable[[Optional[float]], T]) -> T:
+        """Run ``attempt(timeout)`` under this policy and return its result"""
+        retry = 0
+        while True:
+            timeout = self.admit()
+            try:
+                result = self._hedged(attempt, timeout)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    self.abandon()
+                    raise
+                self.settle(e)
+                retry += 1
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+                metrics.LLM_RETRIES.labels(metrics.llm_error_reason(e)).inc()
+                logger.warning(f"Retrying LLM call in {delay:.2f}s after: {e}")
+                self._sleep(delay)
+                continue
+            self.settle()
+            return result
+
+    async def acall(self, attempt: Callable[[Optional[float]], Awaitable[T]]) -> T:
+        """Async counterpart of ``call``"""
+        retry = 0
+        while True:
+            timeout = self.admit()
+            try:
+                result = await self._ahedged(attempt, timeout)
+            except BaseException as e:
+                # CancelledError and friends: the caller gave up, no outcome
+                if not isinstance(e, Exception):
+                    self.abandon()
+                    raise
+                self.settle(e)
+                retry += 1
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+                metrics.LLM_RETRIES.labels(metrics.llm_error_reason(e)).inc()
+                logger.warning(f"Retrying LLM call in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.settle()
+            return result
+
+    def _should_hedge(self, timeout: Optional[float]) -> bool:
+        return bool(self.hedge_after) and (timeout is None or timeout > self.hedge_after)
+
+    def _hedge_timeout(self, timeout: Optional[float]) -> Optional[float]:
+        return None if timeout is None else timeout - self.hedge_after
+
+    def _hedged(self, attempt, timeout):
+        if not self._should_hedge(timeout):
+            return attempt(timeout)
+        # Sync clients can't be cancelled; a losing request runs out in its
+        # thread, bounded by its timeout
+        executor = _hedge_executor()
+        primary = executor.submit(copy_context().run, attempt, timeout)
+        if wait((primary,), timeout=self.hedge_after).done:
+            return primary.result()
+        metrics.LLM_HEDGES.labels('launched').inc()
+        hedge = executor.submit(copy_context().run, attempt, self._hedge_timeout(timeout))
+        for future in as_completed((primary, hedge)):
+            if future.exception() is None:
+                if future is hedge:
+                    metrics.LLM_HEDGES.labels('won').inc()
+                return future.result()
+        return primary.result()  # both failed: raise the original error
+
+    async def _ahedged(self, attempt, timeout):
+        if not self._should_hedge(timeout):
+            return await attempt(timeout)
+        primary = asyncio.ensure_future(attempt(timeout))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        metrics.LLM_HEDGES.labels('launched').inc()
+        hedge = asyncio.ensure_future(attempt(self._hedge_timeout(timeout)))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.LLM_HEDGES.labels('won').inc()
+                        return task.result()
+            return primary.result()  # both failed: raise the original error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'circuit_breaker': self.breaker.stats(),
+            'latency_budget': getattr(settings, 'LLM_LATENCY_BUDGET', 0.0),
+            'attempt_timeout': self.attempt_timeout,
+            'max_retries': self.max_retries,
+            'hedge_after': self.hedge_after,
+        }
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> LLMCallPolicy:
+    """Process-wide policy, so every engine instance shares one breaker"""
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = LLMCallPolicy.from_settings()
+    return _policy
+
+
+def reset_policy() -> None:
+    """Drop the process-wide policy so the next call rebuilds it from settings"""
+    global _policy
+    with _policy_lock:
+        _policy = None
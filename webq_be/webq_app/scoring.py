@@ -0,0 +1,142 @@
+"""Rule-based resource scoring shared by the fallback recommendation paths.
+
+``score_resource`` is the reference implementation of the scoring rules and
+is applied one resource at a time. ``top_k`` applies the same rules to a
+whole catalog in one NumPy pass over integer-encoded arrays.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+from .models import LearningResource
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    np = None
+
+DIFFICULTY_CODES = {level: code for code, (level, _) in enumerate(LearningResource.DIFFICULTY_LEVELS)}
+TYPE_CODES = {res_type: code for code, (res_type, _) in enumerate(LearningResource.RESOURCE_TYPES)}
+UNKNOWN_CODE = -1
+
+
+def fallback_targets(performance_score: float) -> Tuple[str, List[str]]:
+    """Target difficulty and preferred resource types for a performance score"""
+    if performance_score < 50:
+        return 'beginner', ['tutorial', 'article']
+    elif performance_score < 75:
+        return 'intermediate', ['tutorial', 'video', 'quiz']
+    return 'advanced', ['video', 'quiz', 'assignment']
+
+
+def score_resource(resource, performance_score: float, target_difficulty: str,
+                   target_types: Sequence[str]) -> Tuple[float, str]:
+    """Score a single resource and explain the score"""
+    score = 0
+    reason_parts = []
+
+    # Difficulty match
+    if resource.difficulty_level == target_difficulty:
+        score += 3
+        reason_parts.append(f"Matches {target_difficulty} level")
+
+    # Type preference
+    if resource.type in target_types:
+        score += 2
+        reason_parts.append(f"Recommended {resource.type} format")
+
+    # Priority weight
+    score += resource.recommendation_priority / 10
+
+    # Performance-based adjustments
+    if performance_score < 50 and resource.type == 'tutorial':
+        score += 2
+        reason_parts.append("Tutorial for concept reinforcement")
+    elif performance_score >= 75 and resource.type == 'assignment':
+        score += 2
+        reason_parts.append("Challenge assignment for skill development")
+
+    reason = "; ".join(reason_parts) or "Selected based on performance analysis"
+    return score, reason
+
+
+class ScoringArrays:
+    """Column-oriented, integer-encoded copy of the fields the rules read"""
+
+    __slots__ = ('difficulty', 'type', 'priority', 'pk')
+
+    def __init__(self, difficulty, type, priority, pk):
+        self.difficulty = difficulty
+        self.type = type
+        self.priority = priority
+        self.pk = pk
+
+    def __len__(self):
+        return len(self.pk)
+
+    @classmethod
+    def from_resources(cls, resources: Iterable) -> 'ScoringArrays':
+        resources = list(resources)
+        return cls(
+            difficulty=np.fromiter(
+                (DIFFICULTY_CODES.get(r.difficulty_level, UNKNOWN_CODE) for r in resources),
+                dtype=np.int8, count=len(resources)
+            ),
+            type=np.fromiter(
+                (TYPE_CODES.get(r.type, UNKNOWN_CODE) for r in resources),
+                dtype=np.int8, count=len(resources)
+            ),
+            priority=np.fromiter(
+                (r.recommendation_priority for r in resources),
+                dtype=np.int64, count=len(resources)
+            ),
+            pk=np.fromiter((r.pk for r in resources), dtype=np.int64, count=len(resources)),
+        )
+
+
+def score_all(arrays: ScoringArrays, performance_score: float):
+    """Scores for every resource, identical to calling score_resource on each"""
+    target_difficulty, target_types = fallback_targets(performance_score)
+    type_codes = [TYPE_CODES[t] for t in target_types]
+
+    # Integer part first, then the priority weight, then the bonus: the same
+    # order of float additions as score_resource, so results match bit for bit
+    base = (arrays.difficulty == DIFFICULTY_CODES[target_difficulty]) * 3
+    base = base + np.isin(arrays.type, type_codes) * 2
+    scores = base + arrays.priority / 10
+
+    if performance_score < 50:
+        scores = scores + (arrays.type == TYPE_CODES['tutorial']) * 2
+    elif performance_score >= 75:
+        scores = scores + (arrays.type == TYPE_CODES['assignment']) * 2
+    return scores
+
+
+def top_k(arrays: ScoringArrays, performance_score: float, k: int,
+          exclude_pks: Optional[Iterable[int]] = None, bonus=None):
+    """Positions and scores of the k best resources, best first.
+
+    Ties keep catalog order, matching a stable sort of the scored list.
+    ``bonus`` is an optional per-resource array added to the rule scores.
+    """
+    scores = score_all(arrays, performance_score)
+    if bonus is not None:
+        scores = scores + bonus
+    valid = np.ones(len(arrays), dtype=bool)
+    if exclude_pks:
+        valid &= ~np.isin(arrays.pk, np.fromiter(exclude_pks, dtype=np.int64))
+    scores = np.where(valid, scores, -np.inf)
+
+    k = min(k, int(valid.sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+
+    if k < len(scores):
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        # flatnonzero is ascending, so the earliest tied positions win
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.flatnonzero(valid)
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    positions = candidates[order]
+    return positions, scores[positions]
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Student, LearningResource, Recommendation
+from .models import Student, LearningResource, Recommendation, RecommendationJob
+from .ai_engine import AIRecommendationEngine
 
 class StudentSerializer(serializers.ModelSerializer):
     completed_courses = serializers.SerializerMethodField()
@@ -36,10 +38,17 @@ class StudentPerformanceSerializer(serializers.ModelSerializer):
         return obj.get_pending_courses()
 
     def get_total_recommendations(self, obj):
+        # Annotated by Student.objects.with_performance()
+        if hasattr(obj, 'recommendation_count'):
+            return obj.recommendation_count
         return obj.recommendation_set.count()
 
     def get_recent_activity(self, obj):
-        recent_recs = obj.recommendation_set.order_by('-recommendation_date')[:5]
+        recent_recs = getattr(obj, 'recent_recommendations', None)
+        if recent_recs is None:
+            recent_recs = obj.recommendation_set.select_related('resource').order_by(
+                '-recommendation_date', '-id'
+            )[:5]
         return [
             {
                 'resource_title': rec.resource.title,
@@ -71,3 +80,41 @@ class GenerateRecommendationSerializer(serializers.Serializer):
     student_id = serializers.CharField()
     force_regenerate = serializers.BooleanField(default=False)
     max_recommendations = serializers.IntegerField(default=5, min_value=1, max_value=20)
+    mode = serializers.ChoiceField(choices=AIRecommendationEngine.MODES, required=False)
+    background = serializers.BooleanField(default=False)
+
+class BulkGenerateRecommendationSerializer(serializers.Serializer):
+    student_ids = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    force_regenerate = serializers.BooleanField(default=False)
+    max_recommendations = serializers.IntegerField(default=5, min_value=1, max_value=20)
+    mode = serializers.ChoiceField(choices=AIRecommendationEngine.MODES, required=False)
+    background = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        # Generating inline holds the request open for every student's LLM calls
+        if data['background']:
+            limit = settings.BULK_GENERATE_MAX_QUEUED
+            hint = ''
+        else:
+            limit = settings.BULK_GENERATE_MAX_STUDENTS
+            hint = '; pass "background": true to queue a job per student instead'
+        if len(data['student_ids']) > limit:
+            raise serializers.ValidationError({
+                'student_ids': f'At most {limit} students per request{hint}'
+            })
+        return data
+
+class RecommendationJobSerializer(serializers.ModelSerializer):
+    student_id = serializers.CharField(source='student.student_id', read_only=True)
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecommendationJob
+        fields = [
+            'job_id', 'student_id', 'status', 'max_recommendations', 'force_regenerate',
+            'mode', 'result', 'error', 'attempts', 'created_at', 'started_at', 'finished_at'
+        ]
+
+    def get_result(self, obj):
+        return obj.get_result()
+
@@ -0,0 +1,288 @@
+import logging
+from asgiref.sync import sync_to_async
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from .models import Student, Recommendation
+from .engine_registry import get_engine
+from .catalog import get_catalog
+from . import analytics, timing
+from .serializers import RecommendationSerializer
+
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT statement when persisting recommendations
+BULK_BATCH_SIZE = getattr(settings, 'RECOMMENDATION_BULK_BATCH_SIZE', 1000)
+
+
+def use_llm_cache(force_regenerate: bool) -> bool:
+    """Whether LLM responses may come from the cache for this request"""
+    return not (force_regenerate and getattr(settings, 'LLM_CACHE_BYPASS_ON_FORCE_REGENERATE', True))
+
+
+def store_student_recommendations(student: Student, recommendations_data: List[Dict],
+                                  force_regenerate: bool) -> List[Recommendation]:
+    """Create (or, when forced, refresh) one student's recommendation records"""
+    created_recommendations = []
+    for rec_data in recommendations_data:
+        recommendation, created = Recommendation.objects.get_or_create(
+            student=student,
+            resource=rec_data['resource'],
+            defaults={
+                'confidence_score': rec_data['confidence_score'],
+                'reason': rec_data['reason'],
+                'status': 'recommended'
+            }
+        )
+
+        if created or force_regenerate:
+            # Reuse the loaded objects so serializing doesn't fetch them again
+            recommendation.student = student
+            recommendation.resource = rec_data['resource']
+            if force_regenerate and not created:
+                # Update existing recommendation
+                recommendation.confidence_score = rec_data['confidence_score']
+                recommendation.reason = rec_data['reason']
+                recommendation.recommendation_date = timezone.now()
+                recommendation.status = 'recommended'
+                recommendation.save()
+
+            created_recommendations.append(recommendation)
+
+    return created_recommendations
+
+
+def _existing_body(student: Student, existing_count: int) -> Dict:
+    return {
+        'message': f'Student already has {existing_count} active recommendations',
+        'student_id': student.student_id,
+        'existing_recommendations': existing_count
+    }
+
+
+def _generated(student: Student, created_recommendations: List[Recommendation]) -> Dict:
+    # Serialize response
+    with timing.phase('serialize'):
+        data = RecommendationSerializer(created_recommendations, many=True).data
+
+    return {
+        'message': f'Generated {len(created_recommendations)} recommendations',
+        'student_id': student.student_id,
+        'recommendations': data
+    }
+
+
+def existing_recommendations(student: Student, max_recommendations: int,
+                             force_regenerate: bool) -> Optional[Dict]:
+    """The generate response when the student already has enough active recommendations, else None"""
+    if force_regenerate:
+        return None
+    existing_count = student.recommendation_set.filter(status='recommended').count()
+    if existing_count < max_recommendations:
+        return None
+    return _existing_body(student, existing_count)
+
+
+def generate_student_recommendations(student: Student, max_recommendations: int = 5,
+                                     force_regenerate: bool = False, mode: str = None) -> Dict:
+    """Generate and store recommendations for one student.
+
+    Returns the response body of the generate endpoint, so the HTTP view and
+    the background worker report results the same way.
+    """
+    # Check if we should generate new recommendations
+    existing = existing_recommendations(student, max_recommendations, force_regenerate)
+    if existing is not None:
+        return existing
+
+    # Shared engine with pooled Groq connections
+    ai_engine = get_engine()
+
+    # Generate recommendations
+    recommendations_data = ai_engine.generate_recommendations(
+        student, max_recommendations, use_cache=use_llm_cache(force_regenerate), mode=mode
+    )
+
+    # Create recommendation records
+    created_recommendations = store_student_recommendations(
+        student, recommendations_data, force_regenerate
+    )
+
+    return _generated(student, created_recommendations)
+
+
+async def agenerate_student_recommendations(student: Student, max_recommendations: int = 5,
+                                            force_regenerate: bool = False, mode: str = None) -> Dict:
+    """Async counterpart of generate_student_recommendations.
+
+    Waits on Groq on the event loop; the ORM writes and serializing run in
+    a worker thread.
+    """
+    if not force_regenerate:
+        existing_count = await student.recommendation_set.filter(
+            status='recommended'
+        ).acount()
+
+        if existing_count >= max_recommendations:
+            return _existing_body(student, existing_count)
+
+    recommendations_data = await get_engine().agenerate_recommendations(
+        student, max_recommendations, use_cache=use_llm_cache(force_regenerate), mode=mode
+    )
+
+    def store():
+        return _generated(student, store_student_recommendations(
+            student, recommendations_data, force_regenerate
+        ))
+    return await sync_to_async(store)()
+
+
+def _existing_pairs(student_pks: Iterable[int]) -> Dict[int, set]:
+    """Map student pk -> set of resource pks already recommended, in one query"""
+    existing = {pk: set() for pk in student_pks}
+    pairs = Recommendation.objects.filter(student_id__in=list(existing)).values_list(
+        'student_id', 'resource_id'
+    )
+    for student_pk, resource_pk in pairs.iterator(chunk_size=BULK_BATCH_SIZE):
+        existing[student_pk].add(resource_pk)
+    return existing
+
+
+def save_recommendations(rows: List[Recommendation], force_regenerate: bool) -> None:
+    """Persist recommendation rows with bulk upserts on (student, resource)"""
+    if not rows:
+        return
+
+    # Stored statuses of the pairs about to be written, for the rollup deltas
+    previous = {}
+    if analytics.rollup_enabled():
+        pairs = {(row.student_id, row.resource_id) for row in rows}
+        stored = Recommendation.objects.filter(
+            student_id__in={student for student, _ in pairs},
+            resource_id__in={resource for _, resource in pairs},
+        ).values_list('student_id', 'resource_id', 'status')
+        previous = {(student, resource): status for student, resource, status in stored
+                    if (student, resource) in pairs}
+
+    if force_regenerate:
+        # Refresh rows that already exist instead of skipping them
+        Recommendation.objects.bulk_create(
+            rows,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['student', 'resource'],
+            update_fields=['confidence_score', 'reason', 'status', 'recommendation_date', 'updated_at'],
+        )
+    else:
+        # A concurrent writer may have inserted the same pair meanwhile
+        Recommendation.objects.bulk_create(
+            rows, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+        )
+
+    # bulk_create skips model signals, so adjust the counters from the rows
+    if analytics.rollup_enabled():
+        analytics.adjust_rollup(_rollup_deltas(rows, previous, force_regenerate))
+
+
+def _rollup_deltas(rows: List[Recommendation], previous: Dict, force_regenerate: bool) -> Dict[str, int]:
+    """Counter changes for a save_recommendations() write, given the prior statuses"""
+    deltas = defaultdict(int)
+    for row in rows:
+        old_status = previous.get((row.student_id, row.resource_id))
+        if old_status is None:
+            deltas['recommendations.total'] += 1
+            deltas[f'recommendations.status.{row.status}'] += 1
+        elif force_regenerate and old_status != row.status:
+            deltas[f'recommendations.status.{old_status}'] -= 1
+            deltas[f'recommendations.status.{row.status}'] += 1
+    return deltas
+
+
+def generate_recommendations_bulk(student_ids: List[str], max_recommendations: int = 5,
+                                  force_regenerate: bool = False, mode: str = None) -> List[Dict]:
+    """Generate and store recommendations for many students at once.
+
+    Students and their existing recommendations are loaded once, the shared
+    catalog snapshot is reused, every student is ranked with a single engine instance and
+    the results are written with a handful of bulk upserts. Returns one
+    status entry per requested student id, in request order.
+    """
+    # Preserve request order while dropping duplicates
+    student_ids = list(dict.fromkeys(student_ids))
+    students = {s.student_id: s for s in Student.objects.with_courses().filter(student_id__in=student_ids)}
+
+    active_counts = {}
+    if not force_regenerate:
+        active_counts = dict(
+            Recommendation.objects.filter(
+                student__in=students.values(), status='recommended'
+            ).values_list('student__student_id').annotate(total=Count('id'))
+        )
+
+    existing = _existing_pairs(s.pk for s in students.values())
+    catalog = get_catalog()
+    ai_engine = get_engine()
+
+    results = []
+    rows = []
+
+    for student_id in student_ids:
+        student = students.get(student_id)
+        if student is None:
+            results.append({'student_id': student_id, 'status': 'not_found'})
+            continue
+
+        existing_count = active_counts.get(student_id, 0)
+        if not force_regenerate and existing_count >= max_recommendations:
+            results.append({
+                'student_id': student_id,
+                'status': 'skipped',
+                'existing_recommendations': existing_count,
+            })
+            continue
+
+        try:
+            recommendations_data = ai_engine.generate_recommendations(
+                student, max_recommendations,
+                catalog=catalog,
+                existing_resource_ids=existing[student.pk],
+                use_cache=use_llm_cache(force_regenerate),
+                mode=mode,
+            )
+        except Exception as e:
+            logger.error(f"Bulk generation failed for student {student_id}: {e}")
+            results.append({'student_id': student_id, 'status': 'failed', 'detail': str(e)})
+            continue
+
+        resource_ids = []
+        seen = set()
+        for rec_data in recommendations_data:
+            resource = rec_data['resource']
+            # One row per (student, resource) so a single upsert never hits a pair twice
+            if resource.pk in seen:
+                continue
+            if resource.pk in existing[student.pk] and not force_regenerate:
+                continue
+            seen.add(resource.pk)
+            rows.append(Recommendation(
+                student=student,
+                resource=resource,
+                confidence_score=rec_data['confidence_score'],
+                reason=rec_data['reason'],
+                status='recommended',
+            ))
+            resource_ids.append(resource.resource_id)
+
+        results.append({
+            'student_id': student_id,
+            'status': 'generated',
+            'generated': len(resource_ids),
+            'resource_ids': resource_ids,
+        })
+
+    save_recommendations(rows, force_regenerate)
+    logger.info(f"Bulk generation stored {len(rows)} recommendations for {len(students)} students")
+
+    return results
@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from .models import LearningResource, Recommendation, Student
+from . import analytics, catalog, engine_registry, llm_cache, resilience, similarity, timing
+
+
+@receiver(post_save, sender=LearningResource)
+@receiver(post_delete, sender=LearningResource)
+def invalidate_catalog(sender, **kwargs):
+    # Bump now for this connection and again once the write is visible to others
+    catalog.invalidate()
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Per-request query timings for Server-Timing; a no-op outside timed requests
+    timing.install_query_timer(connection)
+
+
+@receiver(setting_changed)
+def reset_llm_cache(setting, **kwargs):
+    if setting.startswith('LLM_CACHE_'):
+        llm_cache.reset_response_cache()
+        # The shared engine holds a reference to the old cache
+        engine_registry.reset_engine()
+
+
+@receiver(setting_changed)
+def reset_llm_policy(setting, **kwargs):
+    if setting in resilience.POLICY_SETTINGS:
+        resilience.reset_policy()
+
+
+@receiver(setting_changed)
+def reset_similarity_index(setting, **kwargs):
+    if setting in similarity.SETTINGS:
+        similarity.reset_index()
+        # Snapshots keep the index they built
+        catalog.invalidate()
+
+
+# Analytics rollup: each tracked model contributes a total plus one bucket
+ROLLUP_BUCKETS = {
+    Student: ('students', 'performance_score', lambda score: f'performance.{analytics.performance_band(score)}'),
+    Recommendation: ('recommendations', 'status', lambda value: f'status.{value}'),
+    LearningResource: ('resources', 'type', lambda value: f'type.{value}'),
+}
+
+
+@receiver(pre_save, sender=Student)
+@receiver(pre_save, sender=Recommendation)
+@receiver(pre_save, sender=LearningResource)
+def capture_rollup_bucket(sender, instance, update_fields=None, **kwargs):
+    instance._rollup_previous = None
+    if not analytics.rollup_enabled() or instance.pk is None:
+        return
+    _, field, _ = ROLLUP_BUCKETS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    # Remember the stored value so a changed bucket can be moved
+    instance._rollup_previous = sender._default_manager.filter(pk=instance.pk).values_list(
+        field, flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Recommendation)
+@receiver(post_save, sender=LearningResource)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    if not analytics.rollup_enabled():
+        return
+    prefix, field, bucket = ROLLUP_BUCKETS[sender]
+    current = f'{prefix}.{bucket(getattr(instance, field))}'
+    if created:
+        analytics.adjust_rollup({f'{prefix}.total': 1, current: 1})
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        previous = f'{prefix}.{bucket(previous)}'
+        if previous != current:
+            analytics.adjust_rollup({previous: -1, current: 1})
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Recommendation)
+@receiver(post_delete, sender=LearningResource)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    if not analytics.rollup_enabled():
+        return
+    prefix, field, bucket = ROLLUP_BUCKETS[sender]
+    analytics.adjust_rollup({
+        f'{prefix}.total': -1,
+        f'{prefix}.{bucket(getattr(instance, field))}': -1,
+    })
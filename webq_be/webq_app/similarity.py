@@ -0,0 +1,250 @@
+"""Local content-similarity index over resource titles and descriptions.
+
+Each resource gets a hashed TF-IDF vector: words from the title (counted
+twice), the description and the course id are hashed into
+SIMILARITY_DIMENSIONS buckets, term counts are dampened with 1 + log(count)
+and weighted by inverse document frequency. Rows are L2-normalized, so a
+sparse matrix-vector product gives the cosine similarity of every resource
+to a query.
+
+A resource only uses a few dozen of the buckets, so rows are stored sparse,
+CSR-style: a 50k resource catalog takes a few MB instead of hundreds.
+
+Raw counts are kept per resource and keyed by a fingerprint of the text they
+came from. When the catalog changes, only resources whose text changed are
+tokenized again. With SIMILARITY_INDEX_PATH set, the counts are saved there,
+so a restarted process only tokenizes what changed while it was down.
+"""
+import hashlib
+import logging
+import os
+import threading
+import zlib
+from array import array
+from typing import Iterable, Optional, Sequence
+from django.conf import settings
+from .catalog import tokenize
+from .scoring import np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 2  # bump when tokenization, hashing or the file layout changes
+TITLE_WEIGHT = 2
+
+
+def text_of(resource) -> str:
+    return f"{resource.title}\n{resource.description}\n{resource.course_id}"
+
+
+def fingerprint(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+
+def buckets(words: Iterable[str], dimensions: int):
+    # crc32 rather than hash(): str hashes are salted per process
+    return [zlib.crc32(word.encode()) % dimensions for word in words]
+
+
+def resource_buckets(resource, dimensions: int):
+    title = tokenize(resource.title)
+    words = title * TITLE_WEIGHT + tokenize(resource.description) + tokenize(resource.course_id)
+    return buckets(words, dimensions)
+
+
+def _sublinear(counts):
+    """1 + log(count) for counts above zero, as float32, through a lookup table"""
+    table = np.zeros(int(counts.max(initial=0)) + 1, dtype=np.float32)
+    table[1:] = 1 + np.log(np.arange(1, len(table), dtype=np.float32))
+    return table[counts]
+
+
+def _ranges(starts, lengths):
+    """Indices of the slices ``starts[i]:starts[i] + lengths[i]``, back to back"""
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+class SimilarityIndex:
+    """Hashed TF-IDF vectors, one sparse row per catalog position.
+
+    Row i holds entries ``indptr[i]:indptr[i + 1]`` of ``indices`` (the
+    buckets, ascending) and ``counts`` (raw term counts). Their normalized
+    TF-IDF weights are kept bucket-major as well, so a query only touches
+    the entries of the buckets it uses.
+    """
+
+    def __init__(self, indptr, indices, counts, fingerprints, pks, dimensions: int, reused: int = 0):
+        self.indptr = indptr  # (resources + 1,) int64 row offsets
+        self.indices = indices  # (entries,) int32 buckets
+        self.counts = counts  # (entries,) uint32 raw term counts
+        self.fingerprints = fingerprints
+        self.pks = pks
+        self.dimensions = dimensions
+        self.reused = reused  # rows copied from a previous index rather than tokenized
+
+        rows = np.repeat(np.arange(len(pks), dtype=np.int32), np.diff(indptr))
+        # Buckets are distinct within a row, so counting entries counts documents
+        document_frequency = np.bincount(indices, minlength=dimensions)
+        self.idf = (np.log((1 + len(pks)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights = _sublinear(counts) * self.idf[indices]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(pks)))
+        norms[norms == 0] = 1
+        weights /= norms[rows].astype(np.float32)
+
+        order = np.argsort(indices, kind='stable')
+        self.column_ptr = np.zeros(dimensions + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.column_ptr[1:])
+        self.column_rows = rows[order]
+        self.column_weights = weights[order]
+
+    def __len__(self):
+        return len(self.pks)
+
+    def _copy_rows(self, sources, targets):
+        """Entry keys (row * dimensions + bucket) and counts of rows ``sources``, as rows ``targets``"""
+        sources = np.asarray(sources, dtype=np.int64)
+        starts = self.indptr[sources]
+        lengths = self.indptr[sources + 1] - starts
+        offsets = _ranges(starts, lengths)
+        rows = np.repeat(np.asarray(targets, dtype=np.int64), lengths)
+        return rows * self.dimensions + self.indices[offsets], self.counts[offsets]
+
+    @classmethod
+    def build(cls, resources: Sequence, dimensions: int,
+              previous: Optional['SimilarityIndex'] = None) -> 'SimilarityIndex':
+        """Index ``resources`` in order, reusing rows of ``previous`` whose text is unchanged"""
+        fingerprints = np.fromiter(
+            (fingerprint(text_of(r)) for r in resources), dtype=np.uint64, count=len(resources)
+        )
+
+        reusable = {}
+        if previous is not None and previous.dimensions == dimensions:
+            reusable = {value: row for row, value in enumerate(previous.fingerprints.tolist())}
+
+        targets, sources = [], []
+        keys = array('q')  # row * dimensions + bucket, one per tokenized word
+        for position, (resource, value) in enumerate(zip(resources, fingerprints.tolist())):
+            row = reusable.get(value)
+            if row is not None:
+                targets.append(position)
+                sources.append(row)
+                continue
+            offset = position * dimensions
+            keys.extend(offset + bucket for bucket in resource_buckets(resource, dimensions))
+
+        # One entry per distinct bucket of a row; counting in int64 never wraps
+        keys, counts = np.unique(np.frombuffer(keys, dtype=np.int64), return_counts=True)
+        counts = np.minimum(counts, np.iinfo(np.uint32).max).astype(np.uint32)
+        if targets:
+            copied_keys, copied_counts = previous._copy_rows(sources, targets)
+            keys = np.concatenate((keys, copied_keys))
+            counts = np.concatenate((counts, copied_counts))
+            order = np.argsort(keys, kind='stable')
+            keys, counts = keys[order], counts[order]
+
+        rows, indices = np.divmod(keys, dimensions)
+        indptr = np.zeros(len(resources) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(resources)), out=indptr[1:])
+
+        pks = np.fromiter((r.pk for r in resources), dtype=np.int64, count=len(resources))
+        return cls(indptr, indices.astype(np.int32), counts, fingerprints, pks, dimensions, len(targets))
+
+    def query_vector(self, words: Iterable[str]):
+        """Normalized TF-IDF vector for a bag of words, or None if none are known"""
+        counts = np.bincount(buckets(words, self.dimensions), minlength=self.dimensions)
+        vector = _sublinear(counts) * self.idf
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def similarities(self, words: Iterable[str]):
+        """Cosine similarity of every resource to ``words``, or None for an empty query"""
+        vector = self.query_vector(words)
+        if vector is None:
+            return None
+        used = np.flatnonzero(vector)
+        starts = self.column_ptr[used]
+        lengths = self.column_ptr[used + 1] - starts
+        entries = _ranges(starts, lengths)
+        weights = self.column_weights[entries] * np.repeat(vector[used], lengths)
+        return np.bincount(self.column_rows[entries], weights=weights, minlength=len(self)).astype(np.float32)
+
+    def top_k(self, words: Iterable[str], k: int, exclude_pks: Optional[Iterable[int]] = None):
+        """Positions and cosine similarities of the k closest resources, best first"""
+        scores = self.similarities(words)
+        if scores is None:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        if exclude_pks:
+            scores = np.where(np.isin(self.pks, np.fromiter(exclude_pks, dtype=np.int64)), -np.inf, scores)
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        positions = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return positions, scores[positions]
+
+    def save(self, path: str) -> None:
+        # Write beside the target and rename, so readers never see half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f, format=INDEX_FORMAT, dimensions=self.dimensions,
+                indptr=self.indptr, indices=self.indices, counts=self.counts,
+                fingerprints=self.fingerprints, pks=self.pks,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['SimilarityIndex']:
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data['format']) != INDEX_FORMAT:
+                    return None
+                return cls(data['indptr'], data['indices'], data['counts'],
+                           data['fingerprints'], data['pks'], int(data['dimensions']))
+        except Exception as e:
+            logger.error(f"Failed to load similarity index from {path}: {e}")
+            return None
+
+
+SETTINGS = ('SIMILARITY_DIMENSIONS', 'SIMILARITY_INDEX_PATH')
+
+_lock = threading.Lock()
+_latest: Optional[SimilarityIndex] = None
+
+
+def build_index(resources: Sequence, path: Optional[str] = None) -> SimilarityIndex:
+    """Index the given catalog order, incrementally from the last index built.
+
+    The first build in a process starts from the saved index at ``path``
+    (default: SIMILARITY_INDEX_PATH), when there is one. A build that had to
+    tokenize anything, or dropped rows, is saved there.
+    """
+    global _latest
+    dimensions = getattr(settings, 'SIMILARITY_DIMENSIONS', 1024)
+    if path is None:
+        path = getattr(settings, 'SIMILARITY_INDEX_PATH', '')
+    with _lock:
+        previous = _latest
+        if previous is None and path:
+            previous = SimilarityIndex.load(path)
+        index = SimilarityIndex.build(resources, dimensions, previous)
+        _latest = index
+
+        changed = previous is None or index.reused != len(index) or len(previous) != len(index)
+        if path and (changed or not os.path.exists(path)):
+            try:
+                index.save(path)
+            except Exception as e:
+                logger.error(f"Failed to save similarity index to {path}: {e}")
+    logger.info(f"Built similarity index: {len(index)} resources, {index.reused} reused")
+    return index
+
+
+def reset_index() -> None:
+    """Forget the last index so the next build starts from disk or from scratch"""
+    global _latest
+    with _lock:
+        _latest = None
@@ -1,9 +1,45 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from groq import Groq, RateLimitError
+from prometheus_client import REGISTRY
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
-from .models import Student, LearningResource, Recommendation
-from .ai_engine import AIRecommendationEngine
+from .models import (
+    Student, LearningResource, Recommendation, LLMResponseCacheEntry, RecommendationJob,
+    AnalyticsRollup, Enrollment
+)
+from .analytics import compute_counts, read_rollup
+from .ai_engine import AIRecommendationEngine, RecommendationStreamParser
+from . import candidates, scoring, similarity
+from .catalog import get_catalog, invalidate as invalidate_catalog
+from .llm_cache import InMemoryLRUCache, TieredResponseCache
+from .importer import import_resources
+from .services import save_recommendations
+from .jobs import claim_jobs
+from .resilience import BudgetExhausted, CircuitBreaker, Deadline, LLMCallPolicy, budget, get_policy
+from .engine_registry import get_engine, registry, reset_engine
+from .fake_groq import AsyncFakeGroq, FakeGroq, FakeGroqBehavior, _rate_limit_error, make_server
+from .management.commands.run_benchmarks import compare, percentile
+from .urls import urlpatterns
 
 
 class ModelTests(TestCase):
@@ -12,10 +48,10 @@ class ModelTests(TestCase):
             student_id='TEST001',
             name='Test Student',
             email='test@example.com',
-            performance_score=75.5,
-            completed_courses='["Course1", "Course2"]',
-            pending_courses='["Course3"]'
+            performance_score=75.5
         )
+        self.student.set_completed_courses(["Course1", "Course2"])
+        self.student.set_pending_courses(["Course3"])
         
         self.resource = LearningResource.objects.create(
             resource_id='TESTRES001',
@@ -31,6 +67,23 @@ class ModelTests(TestCase):
         self.assertEqual(self.student.get_completed_courses(), ["Course1", "Course2"])
         self.assertEqual(self.student.get_pending_courses(), ["Course3"])
 
+    def test_course_moves_between_statuses(self):
+        self.student.set_completed_courses(["Course1", "Course2", "Course3"])
+        self.assertEqual(self.student.get_pending_courses(), [])
+        self.assertEqual(Enrollment.objects.filter(student=self.student).count(), 3)
+        self.assertEqual(
+            list(Student.objects.filter(enrollments__course__name="Course3",
+                                        enrollments__status=Enrollment.COMPLETED)),
+            [self.student]
+        )
+
+    def test_prefetched_courses_need_no_queries(self):
+        student = Student.objects.with_courses().get(pk=self.student.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(student.get_courses(), {
+                'completed': ["Course1", "Course2"], 'pending': ["Course3"]
+            })
+
     def test_learning_resource_model(self):
         self.assertEqual(self.resource.resource_id, 'TESTRES001')
         self.assertEqual(self.resource.type, 'tutorial')
@@ -89,6 +142,74 @@ class APITests(APITestCase):
             self.assertIn('reason', first)
             self.assertIn('confidence_score', first)
 
+    def test_generate_recommendations_async(self):
+        url = reverse('generate-recommendations-async')
+        data = {
+            'student_id': 'API001',
+            'max_recommendations': 3
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body['student_id'], 'API001')
+        self.assertEqual(len(body['recommendations']), 1)
+        self.assertEqual(body['recommendations'][0]['resource']['resource_id'], 'APIRES001')
+
+        missing = self.client.post(url, {'student_id': 'NOPE'}, format='json')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_generate_recommendations_async_goes_through_drf(self):
+        url = reverse('generate-recommendations-async')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        # Same parsers as the sync view: form posts work too
+        response = self.client.post(url, {'student_id': 'API001', 'max_recommendations': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['student_id'], 'API001')
+
+        # And the same CSRF check for session-authenticated users
+        User = get_user_model()
+        csrf_client = APIClient(enforce_csrf_checks=True)
+        csrf_client.force_login(User.objects.create_user('csrf', password='x'))
+        for name in ('generate-recommendations', 'generate-recommendations-async'):
+            response = csrf_client.post(reverse(name), {'student_id': 'API001'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, name)
+
+    def test_stream_recommendations(self):
+        url = reverse('stream-recommendations')
+        response = self.client.get(
+            url, {'student_id': 'API001', 'max_recommendations': 2},
+            HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        body = b''.join(response.streaming_content).decode()
+        events = [line.split(': ', 1)[1] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['analysis', 'recommendation', 'done'])
+        self.assertEqual(Recommendation.objects.filter(student=self.student).count(), 1)
+
+    def test_stream_recommendations_honours_mode_and_existing_recommendations(self):
+        url = reverse('stream-recommendations')
+
+        def stream(**params):
+            response = self.client.get(url, {'student_id': 'API001', **params}, HTTP_ACCEPT='text/event-stream')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            events = [line.split(': ', 1)[1] for line in lines if line.startswith('event: ')]
+            data = [json.loads(line.split(': ', 1)[1]) for line in lines if line.startswith('data: ')]
+            return events, data
+
+        with mock.patch.object(AIRecommendationEngine, 'generate_recommendations',
+                               autospec=True, return_value=[]) as generate:
+            events, _ = stream(max_recommendations=2, mode='similarity')
+        self.assertEqual(generate.call_args.args[-1], 'similarity')
+        self.assertEqual(events, ['analysis', 'done'])
+
+        Recommendation.objects.create(student=self.student, resource=self.resource, reason='r')
+        events, data = stream(max_recommendations=1)
+        self.assertEqual(events, ['done'])
+        self.assertEqual(data[0]['existing_recommendations'], 1)
+
     def test_get_student_recommendations(self):
         # First create a recommendation
         Recommendation.objects.create(
@@ -102,6 +223,67 @@ class APITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['recommendations']), 1)
 
+    def test_generate_recommendations_batch(self):
+        Student.objects.create(
+            student_id='API002',
+            name='Second Student',
+            email='apitest2@example.com',
+            performance_score=90.0
+        )
+        LearningResource.objects.create(
+            resource_id='APIRES002',
+            title='Advanced Assignment',
+            type='assignment',
+            difficulty_level='advanced',
+            course_id='API201',
+            recommendation_priority=9
+        )
+
+        url = reverse('generate-recommendations-batch')
+        data = {
+            'student_ids': ['API001', 'API002', 'MISSING'],
+            'max_recommendations': 2
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = {r['student_id']: r for r in response.data['results']}
+        self.assertEqual(results['API001']['status'], 'generated')
+        self.assertEqual(results['API002']['status'], 'generated')
+        self.assertEqual(results['MISSING']['status'], 'not_found')
+        self.assertEqual(
+            Recommendation.objects.filter(student__student_id='API002').count(),
+            results['API002']['generated']
+        )
+
+        # Students that already have enough active recommendations are skipped
+        response = self.client.post(url, data, format='json')
+        results = {r['student_id']: r for r in response.data['results']}
+        self.assertEqual(results['API001']['status'], 'skipped')
+
+        # force_regenerate refreshes existing rows instead of duplicating them
+        data['force_regenerate'] = True
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Recommendation.objects.filter(student__student_id='API001').count(), 2)
+
+    @override_settings(BULK_GENERATE_MAX_STUDENTS=2)
+    def test_large_batches_must_be_queued(self):
+        url = reverse('generate-recommendations-batch')
+        data = {'student_ids': ['API001', 'MISSING', 'API001'], 'max_recommendations': 2}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('background', response.data['student_ids'][0])
+        self.assertFalse(Recommendation.objects.exists())
+
+        response = self.client.post(url, {**data, 'background': True, 'mode': 'single_call'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], ['queued', 'not_found'])
+        job = RecommendationJob.objects.get()
+        self.assertEqual((str(job.job_id), job.student, job.mode), (results[0]['job_id'], self.student, 'single_call'))
+        self.assertEqual(self.client.get(results[0]['status_url']).data['status'], 'queued')
+
 
 class AIEngineTests(TestCase):
     def setUp(self):
@@ -136,3 +318,1492 @@ class AIEngineTests(TestCase):
         if recommendations:
             self.assertIn('resource', recommendations[0])
             self.assertIn('confidence_score', recommendations[0])
+
+    def test_async_generate_recommendations_matches_sync(self):
+        sync_recs = self.ai_engine.generate_recommendations(self.student, max_recommendations=2)
+        async_recs = async_to_sync(self.ai_engine.agenerate_recommendations)(
+            self.student, max_recommendations=2
+        )
+        self.assertEqual(
+            [(r['resource'].pk, r['confidence_score']) for r in async_recs],
+            [(r['resource'].pk, r['confidence_score']) for r in sync_recs]
+        )
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        self.resource = LearningResource.objects.create(
+            resource_id='CAT001',
+            title='Catalog Tutorial',
+            type='tutorial',
+            difficulty_level='beginner',
+            course_id='CAT101',
+            recommendation_priority=4
+        )
+
+    def test_snapshot_is_reused_until_catalog_changes(self):
+        catalog = get_catalog()
+        self.assertIn('CAT001', catalog.by_resource_id)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), catalog)
+
+        LearningResource.objects.create(
+            resource_id='CAT002',
+            title='Catalog Quiz',
+            type='quiz',
+            difficulty_level='advanced',
+            course_id='CAT101',
+            recommendation_priority=9
+        )
+        refreshed = get_catalog()
+        self.assertGreater(refreshed.version, catalog.version)
+        self.assertEqual(len(refreshed), 2)
+
+        self.resource.delete()
+        self.assertNotIn('CAT001', get_catalog().by_resource_id)
+
+    def test_writes_from_other_processes_show_up_within_the_check_interval(self):
+        catalog = get_catalog()
+        # bulk_create skips signals, like a write made by another worker
+        LearningResource.objects.bulk_create([LearningResource(
+            resource_id='CAT004', title='Elsewhere', type='quiz', difficulty_level='advanced', course_id='CAT101'
+        )])
+        self.assertIs(get_catalog(), catalog)
+
+        now = time.monotonic()
+        with mock.patch('webq_app.catalog.time.monotonic', return_value=now + 6):
+            refreshed = get_catalog()
+            self.assertIn('CAT004', refreshed.by_resource_id)
+            self.assertGreater(refreshed.version, catalog.version)
+            with self.assertNumQueries(0):
+                self.assertIs(get_catalog(), refreshed)
+        # Unchanged table: one probe query, same snapshot
+        with mock.patch('webq_app.catalog.time.monotonic', return_value=now + 12), self.assertNumQueries(1):
+            self.assertIs(get_catalog(), refreshed)
+        with mock.patch('webq_app.catalog.time.monotonic', return_value=now + 400):
+            self.assertIsNot(get_catalog(), refreshed)
+
+    def test_snapshot_indexes(self):
+        LearningResource.objects.create(
+            resource_id='CAT003',
+            title='Catalog Video',
+            type='video',
+            difficulty_level='beginner',
+            course_id='CAT202',
+            recommendation_priority=6
+        )
+        catalog = get_catalog()
+        self.assertEqual(
+            [r.resource_id for r in catalog.filter(difficulty_level='beginner')],
+            ['CAT003', 'CAT001']
+        )
+        self.assertEqual(
+            [r.resource_id for r in catalog.filter(difficulty_level='beginner', course_id='CAT101')],
+            ['CAT001']
+        )
+        self.assertEqual(catalog.filter(type='assignment'), [])
+
+
+class VectorizedScoringTests(TestCase):
+    def setUp(self):
+        types = [t for t, _ in LearningResource.RESOURCE_TYPES]
+        levels = [d for d, _ in LearningResource.DIFFICULTY_LEVELS]
+        for i in range(60):
+            LearningResource.objects.create(
+                resource_id=f'VEC{i:03d}',
+                title=f'Resource {i % 7}',
+                type=types[i % len(types)],
+                difficulty_level=levels[(i // 5) % len(levels)],
+                course_id='VEC101',
+                recommendation_priority=(i * 7) % 10 + 1
+            )
+        self.engine = AIRecommendationEngine()
+
+    def test_matches_python_loop(self):
+        catalog = get_catalog()
+        excluded = {r.pk for r in catalog.resources[::4]}
+
+        for score in (20.0, 49.9, 50.0, 74.9, 75.0, 99.0):
+            student = Student(student_id='VEC', performance_score=score)
+            for k in (1, 5, 20, 100):
+                vectorized = self.engine._fallback_recommendations(
+                    student, {}, catalog, k, excluded
+                )
+                loop = self.engine._fallback_recommendations(
+                    student, {}, list(catalog), k, excluded
+                )
+                self.assertEqual(
+                    [(r['resource'].pk, r['score'], r['confidence_score'], r['reason']) for r in vectorized],
+                    [(r['resource'].pk, r['score'], r['confidence_score'], r['reason']) for r in loop]
+                )
+
+
+class StubCompletions:
+    """Minimal stand-in for the Groq chat completions resource"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+        self.prompts = []
+
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        self.prompts.append(kwargs['messages'][-1]['content'])
+        if stream:
+            return (
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.content[i:i + 5]))])
+                for i in range(0, len(self.content), 5)
+            )
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class LLMResponseCacheTests(TestCase):
+    def test_lru_eviction_and_ttl(self):
+        cache = InMemoryLRUCache(max_entries=2, default_ttl=60)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')  # evicts 'b', the least recently used
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        cache.set('d', 'D', ttl=0)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_tiered_cache_survives_memory_loss(self):
+        cache = TieredResponseCache(max_entries=8, default_ttl=60)
+        cache.set('key', 'response', model='test-model')
+        self.assertTrue(LLMResponseCacheEntry.objects.filter(key='key').exists())
+
+        cache.memory.clear()
+        self.assertEqual(cache.get('key'), 'response')
+        self.assertEqual(cache.memory.get('key'), 'response')
+
+    def test_database_errors_are_cache_misses(self):
+        cache = TieredResponseCache(max_entries=8, default_ttl=60)
+        cache.memory.set('warm', 'from memory')
+        with mock.patch.object(cache.database, 'get_entry', side_effect=DatabaseError('locked')):
+            self.assertEqual(cache.get('warm'), 'from memory')
+            self.assertIsNone(cache.get('cold'))
+
+        # A backend that raises outright still lets the call through, in both APIs
+        engine = AIRecommendationEngine()
+        engine.cache = mock.Mock(get=mock.Mock(side_effect=DatabaseError('locked')),
+                                 set=mock.Mock(side_effect=DatabaseError('locked')))
+        engine.model = 'test-model'
+        engine.client = FakeGroq()
+        engine.async_client = AsyncFakeGroq(behavior=engine.client.behavior)
+        answer = engine._chat('prompt')
+        self.assertTrue(answer)
+        self.assertEqual(''.join(engine._chat_stream('prompt')).strip(), answer)
+        self.assertEqual(async_to_sync(engine._achat)('prompt'), answer)
+
+    def test_chat_reuses_identical_prompts(self):
+        engine = AIRecommendationEngine()
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        engine.model = 'test-model'
+        completions = StubCompletions('{"strengths": []}')
+        engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        self.assertEqual(engine._chat('same prompt'), '{"strengths": []}')
+        self.assertEqual(engine._chat('same prompt'), '{"strengths": []}')
+        self.assertEqual(completions.calls, 1)
+
+        # Bypassing the cache always reaches the client
+        engine._chat('same prompt', use_cache=False)
+        self.assertEqual(completions.calls, 2)
+
+
+class SingleCallModeTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='MODE001',
+            name='Mode Student',
+            email='mode@example.com',
+            performance_score=80.0
+        )
+        self.resource = LearningResource.objects.create(
+            resource_id='MODERES001',
+            title='Mode Assignment',
+            type='assignment',
+            difficulty_level='advanced',
+            course_id='MODE101',
+            recommendation_priority=7
+        )
+        self.engine = AIRecommendationEngine()
+        self.engine.cache = InMemoryLRUCache(default_ttl=60)
+        self.engine.model = 'test-model'
+
+    def use_response(self, content):
+        completions = StubCompletions(content)
+        self.engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+
+    def test_single_call_makes_one_request(self):
+        completions = self.use_response(
+            '{"analysis": {"strengths": ["Focus"]}, "recommendations": '
+            '[{"resource_id": "MODERES001", "confidence_score": 0.9, "reason": "Fits"}, '
+            '{"resource_id": "UNKNOWN", "confidence_score": 0.5}]}'
+        )
+        recommendations = self.engine.generate_recommendations(
+            self.student, max_recommendations=2, mode='single_call'
+        )
+        self.assertEqual(completions.calls, 1)
+        self.assertEqual(len(recommendations), 1)
+        self.assertEqual(recommendations[0]['resource'], self.resource)
+        self.assertEqual(recommendations[0]['confidence_score'], 0.9)
+
+    def test_unusable_ai_answers_fall_back_in_every_path(self):
+        # Valid JSON without a single usable recommendation: no exception is raised
+        content = '{"analysis": {}, "recommendations": [{"resource_id": "UNKNOWN"}]}'
+        self.use_response(content)
+        message = SimpleNamespace(content=content)
+        create = mock.AsyncMock(return_value=SimpleNamespace(choices=[SimpleNamespace(message=message)]))
+        self.engine.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+        for mode in ('two_call', 'single_call'):
+            sync = self.engine.generate_recommendations(self.student, 2, mode=mode, use_cache=False)
+            async_ = async_to_sync(self.engine.agenerate_recommendations)(
+                self.student, 2, mode=mode, use_cache=False
+            )
+            for recommendations in (sync, async_):
+                self.assertEqual([r['resource'] for r in recommendations], [self.resource], mode)
+
+    def test_single_call_parse_error_matches_two_call(self):
+        self.use_response('not json at all')
+        single = self.engine.generate_recommendations(self.student, 2, mode='single_call', use_cache=False)
+        two = self.engine.generate_recommendations(self.student, 2, mode='two_call', use_cache=False)
+        self.assertEqual(single, two)
+
+    def test_stream_recommendations_from_streamed_completion(self):
+        self.use_response(
+            '{"strengths": ["Focus"], "recommendations": '
+            '[{"resource_id": "MODERES001", "confidence_score": 0.7, "reason": "Fits"}]}'
+        )
+        events = list(self.engine.stream_recommendations(self.student, 2))
+        self.assertEqual([e for e, _ in events], ['analysis', 'analysis', 'recommendation'])
+        self.assertEqual(events[0][1]['source'], 'rule_based')
+        self.assertEqual(events[1][1]['analysis']['strengths'], ['Focus'])
+        self.assertEqual(events[2][1]['resource'], self.resource)
+
+    def test_stream_survives_scores_that_are_not_numbers(self):
+        for i in (2, 3, 4):
+            LearningResource.objects.create(
+                resource_id=f'MODERES00{i}', title=f'Mode Extra {i}', type='video',
+                difficulty_level='advanced', course_id='MODE101', recommendation_priority=5
+            )
+        self.use_response(
+            '{"recommendations": ['
+            '{"resource_id": "MODERES001", "confidence_score": "0.8"}, '
+            '{"resource_id": "MODERES002", "confidence_score": "high"}, '
+            '{"resource_id": "MODERES003", "confidence_score": null}, '
+            '{"resource_id": "MODERES004", "confidence_score": 7}]}'
+        )
+        events = list(self.engine.stream_recommendations(self.student, 4, use_cache=False))
+        scores = [payload['confidence_score'] for event, payload in events if event == 'recommendation']
+        self.assertEqual(scores, [0.8, 0.5, 0.5, 1.0])
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.engine.generate_recommendations(self.student, mode='three_call')
+
+
+@override_settings(LLM_TRANSPORT='fake', FAKE_GROQ_LATENCY_MS=0.0, FAKE_GROQ_RATE_LIMIT_RATE=0.0,
+                   FAKE_GROQ_MALFORMED_RATE=0.0, LLM_MAX_RETRIES=0, LLM_BREAKER_FAILURE_THRESHOLD=0)
+class FakeGroqTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='FAKE001', name='Fake Student', email='fake@example.com', performance_score=72.0
+        )
+        for i in range(8):
+            LearningResource.objects.create(
+                resource_id=f'FAKERES{i}', title=f'Fake {i}', type='video',
+                difficulty_level='intermediate', course_id='FAKE101', recommendation_priority=5
+            )
+
+    def engine(self, **behavior):
+        engine = AIRecommendationEngine()
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        engine.client = FakeGroq(behavior=FakeGroqBehavior(**behavior))
+        engine.async_client = AsyncFakeGroq(behavior=engine.client.behavior)
+        return engine
+
+    def test_transport_setting_selects_the_fake(self):
+        self.assertIsInstance(AIRecommendationEngine().client, FakeGroq)
+        self.assertIsInstance(get_engine().client, FakeGroq)
+
+    def test_ai_path_answers_deterministically_with_catalog_ids(self):
+        engine = self.engine()
+        first = engine.generate_recommendations(self.student, 3, use_cache=False)
+        again = engine.generate_recommendations(self.student, 3, use_cache=False)
+        self.assertEqual(len(first), 3)
+        self.assertTrue(all(r['reason'].startswith('Matches focus') for r in first))
+        self.assertEqual([r['resource'].pk for r in first], [r['resource'].pk for r in again])
+
+        # Cached prompts never reach the fake
+        calls = engine.client.behavior.stats['calls']
+        engine.generate_recommendations(self.student, 3, mode='single_call')
+        engine.generate_recommendations(self.student, 3, mode='single_call')
+        self.assertEqual(engine.client.behavior.stats['calls'], calls + 1)
+
+        async_recs = async_to_sync(engine.agenerate_recommendations)(self.student, 3, use_cache=False)
+        self.assertEqual([r['resource'].pk for r in async_recs], [r['resource'].pk for r in first])
+
+        events = list(engine.stream_recommendations(self.student, 3, use_cache=False))
+        streamed = [payload['resource'].pk for event, payload in events if event == 'recommendation']
+        self.assertEqual(streamed, [r['resource'].pk for r in first])
+
+    def test_rate_limits_and_malformed_output_fall_back(self):
+        for behavior in ({'rate_limit_rate': 1.0}, {'malformed_rate': 1.0}):
+            engine = self.engine(**behavior)
+            recommendations = engine.generate_recommendations(self.student, 3, use_cache=False)
+            self.assertEqual(len(recommendations), 3)
+            self.assertFalse(any(r['reason'].startswith('Matches focus') for r in recommendations))
+
+        with self.assertRaises(RateLimitError) as raised:
+            FakeGroq(behavior=FakeGroqBehavior(rate_limit_rate=1.0, retry_after=2.0)).chat.completions.create(
+                messages=[{'role': 'user', 'content': 'hi'}]
+            )
+        self.assertEqual(raised.exception.response.headers['retry-after'], '2.0')
+
+    def test_http_server_speaks_the_groq_api(self):
+        behavior = FakeGroqBehavior(rate_limit_rate=0.5, seed=3)
+        server = make_server(behavior=behavior)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = Groq(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}', max_retries=0)
+
+        prompt = 'Generate 2 recommendations: "recommendations" [{"id": "A"}, {"id": "B"}, {"id": "C"}]'
+        answers, limited = [], 0
+        for _ in range(6):
+            try:
+                response = client.chat.completions.create(
+                    model='test', messages=[{'role': 'user', 'content': prompt}]
+                )
+                answers.append(json.loads(response.choices[0].message.content))
+            except RateLimitError:
+                limited += 1
+        self.assertEqual(limited, behavior.stats['rate_limited'])
+        self.assertTrue(answers and limited)
+        self.assertTrue(all(answer == answers[0] for answer in answers))
+        self.assertEqual(len(answers[0]['recommendations']), 2)
+
+
+@override_settings(SERVER_TIMING_ENABLED=True, LLM_TRANSPORT='fake', FAKE_GROQ_LATENCY_MS=0.0,
+                   FAKE_GROQ_RATE_LIMIT_RATE=0.0, FAKE_GROQ_MALFORMED_RATE=0.0)
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        Student.objects.create(
+            student_id='TIME001', name='Timed', email='timed@example.com', performance_score=75.0
+        )
+        for i in range(4):
+            LearningResource.objects.create(
+                resource_id=f'TIMERES{i}', title=f'Timed {i}', type='article',
+                difficulty_level='intermediate', course_id='TIME101'
+            )
+
+    def phases(self, header):
+        return {metric.split(';')[0]: metric for metric in header.split(', ')}
+
+    def test_generate_reports_every_phase(self):
+        with self.assertLogs('webq_app.timing', 'INFO') as logs:
+            response = self.client.post(reverse('generate-recommendations'), {
+                'student_id': 'TIME001', 'max_recommendations': 2, 'force_regenerate': True
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = self.phases(response['Server-Timing'])
+        self.assertTrue({'db', 'llm', 'prompt', 'parse', 'serialize', 'total'} <= set(phases))
+        self.assertIn('desc="2 calls"', phases['llm'])  # analysis + ranking
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['path'], line['status']), (response.request['PATH_INFO'], 200))
+        self.assertEqual(line['phases']['llm']['count'], 2)
+        self.assertGreater(line['phases']['db']['count'], 0)
+
+    def test_streamed_phases_are_logged_when_the_body_ends(self):
+        with self.assertLogs('webq_app.timing', 'INFO') as logs:
+            response = self.client.get(reverse('stream-recommendations'),
+                                       {'student_id': 'TIME001', 'force_regenerate': 'true'})
+            self.assertNotIn('llm', self.phases(response['Server-Timing']))
+            b''.join(response.streaming_content)
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertTrue(line['streaming'])
+        self.assertEqual(line['phases']['llm']['count'], 2)
+
+    def test_disabled_adds_nothing(self):
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            response = self.client.get(reverse('resource-list-create'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(METRICS_ENABLED=True, LLM_TRANSPORT='fake', FAKE_GROQ_LATENCY_MS=0.0,
+                   FAKE_GROQ_RATE_LIMIT_RATE=0.0, FAKE_GROQ_MALFORMED_RATE=0.0, LLM_MAX_RETRIES=0,
+                   LLM_BREAKER_FAILURE_THRESHOLD=0)
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='METR001', name='Measured', email='measured@example.com', performance_score=64.0
+        )
+        for i in range(4):
+            LearningResource.objects.create(
+                resource_id=f'METRES{i}', title=f'Measured {i}', type='quiz',
+                difficulty_level='beginner', course_id='METR101'
+            )
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def test_exposition_covers_requests_llm_and_paths(self):
+        request_labels = {'url_name': 'generate-recommendations', 'method': 'POST'}
+        before = {
+            'requests': self.sample('webq_http_requests_total', status='2xx', **request_labels),
+            'latency': self.sample('webq_http_request_duration_seconds_count', **request_labels),
+            'queries': self.sample('webq_db_queries_total', url_name='generate-recommendations'),
+            'llm': self.sample('webq_llm_request_duration_seconds_count', call='chat'),
+            'ai': self.sample('webq_recommendation_path_total', path='ai', mode='two_call'),
+        }
+        # Server-Timing off: the metrics middleware still counts queries
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            response = self.client.post(reverse('generate-recommendations'), {
+                'student_id': 'METR001', 'max_recommendations': 2, 'force_regenerate': True
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.sample('webq_http_requests_total', status='2xx', **request_labels),
+                         before['requests'] + 1)
+        self.assertEqual(self.sample('webq_http_request_duration_seconds_count', **request_labels),
+                         before['latency'] + 1)
+        self.assertGreater(self.sample('webq_db_queries_total', url_name='generate-recommendations'),
+                           before['queries'])
+        self.assertEqual(self.sample('webq_llm_request_duration_seconds_count', call='chat'), before['llm'] + 2)
+        self.assertEqual(self.sample('webq_recommendation_path_total', path='ai', mode='two_call'),
+                         before['ai'] + 1)
+
+        scrape = self.client.get('/metrics')
+        self.assertEqual(scrape.status_code, status.HTTP_200_OK)
+        self.assertTrue(scrape['Content-Type'].startswith('text/plain'))
+        body = scrape.content.decode()
+        for name in ('webq_http_request_duration_seconds_bucket', 'webq_llm_request_duration_seconds_bucket',
+                     'webq_recommendation_path_total', 'webq_http_request_db_queries_bucket'):
+            self.assertIn(name, body)
+
+    def test_unresolved_paths_share_a_label(self):
+        before = self.sample('webq_http_requests_total', url_name='unmatched', method='GET', status='4xx')
+        self.client.get('/no/such/page/1')
+        self.client.get('/no/such/page/2')
+        self.assertEqual(self.sample('webq_http_requests_total', url_name='unmatched', method='GET',
+                                     status='4xx'), before + 2)
+
+    def test_rate_limits_parse_failures_and_cache_lookups_are_counted(self):
+        engine = AIRecommendationEngine()
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        before = {
+            'limited': self.sample('webq_llm_errors_total', reason='rate_limited'),
+            'fallback': self.sample('webq_recommendation_path_total', path='fallback', mode='two_call'),
+            'parse': self.sample('webq_llm_parse_failures_total', parser='recommendations'),
+            'hits': self.sample('webq_llm_cache_requests_total', backend='InMemoryLRUCache', result='hit'),
+        }
+
+        engine.client = FakeGroq(behavior=FakeGroqBehavior(rate_limit_rate=1.0))
+        engine.generate_recommendations(self.student, 2, use_cache=False)
+        self.assertEqual(self.sample('webq_llm_errors_total', reason='rate_limited'), before['limited'] + 2)
+        self.assertEqual(self.sample('webq_recommendation_path_total', path='fallback', mode='two_call'),
+                         before['fallback'] + 1)
+
+        engine.client = FakeGroq(behavior=FakeGroqBehavior(malformed_rate=1.0))
+        engine.generate_recommendations(self.student, 2, use_cache=False)
+        self.assertEqual(self.sample('webq_llm_parse_failures_total', parser='recommendations'),
+                         before['parse'] + 1)
+
+        engine.client = FakeGroq(behavior=FakeGroqBehavior())
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        engine.generate_recommendations(self.student, 2)
+        engine.generate_recommendations(self.student, 2)  # analysis and ranking both cached
+        self.assertEqual(self.sample('webq_llm_cache_requests_total', backend='InMemoryLRUCache', result='hit'),
+                         before['hits'] + 2)
+
+    def test_disabled_hides_the_endpoint(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResilienceTests(APITestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='RES001', name='Resilient', email='resilient@example.com', performance_score=58.0
+        )
+        for i in range(4):
+            LearningResource.objects.create(
+                resource_id=f'RESRES{i}', title=f'Resilient {i}', type='article',
+                difficulty_level='beginner', course_id='RES101'
+            )
+
+    def test_breaker_opens_then_admits_one_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())  # the trial
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        now[0] = 20.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.stats()['state'], CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()['times_opened'], 2)
+
+    def test_retries_honor_retry_after_within_the_budget(self):
+        sleeps = []
+        policy = LLMCallPolicy(max_retries=2, sleep=sleeps.append)
+        failures = [_rate_limit_error(1.5), _rate_limit_error(1.5)]
+
+        def attempt(timeout):
+            if failures:
+                raise failures.pop()
+            return 'ok'
+        self.assertEqual(policy.call(attempt), 'ok')
+        self.assertEqual(sleeps, [1.5, 1.5])
+
+        # A wait longer than the remaining budget is not worth making
+        failures.append(_rate_limit_error(1.5))
+        with budget(Deadline(0.5)), self.assertRaises(RateLimitError):
+            policy.call(attempt)
+        self.assertEqual(len(sleeps), 2)
+
+        with self.assertRaises(ValueError):
+            policy.call(lambda timeout: int('not a number'))
+        self.assertEqual(len(sleeps), 2)
+
+        with budget(Deadline(-1)), self.assertRaises(BudgetExhausted):
+            policy.call(attempt)
+
+    @override_settings(LLM_TRANSPORT='fake', LLM_LATENCY_BUDGET=0.3, LLM_BREAKER_FAILURE_THRESHOLD=0)
+    def test_spent_budget_answers_from_the_fallback(self):
+        engine = AIRecommendationEngine()
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        engine.client = FakeGroq(behavior=FakeGroqBehavior(latency_ms=200.0))
+        started = time.monotonic()
+        recommendations = engine.generate_recommendations(self.student, 2, use_cache=False)
+        # Analysis took 200ms; the ranking call timed out with what was left
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(recommendations), 2)
+        self.assertFalse(any(r['reason'].startswith('Matches focus') for r in recommendations))
+        self.assertEqual(engine.client.behavior.stats['calls'], 2)
+
+    @override_settings(LLM_TRANSPORT='fake', FAKE_GROQ_LATENCY_MS=0.0, FAKE_GROQ_RATE_LIMIT_RATE=1.0,
+                       FAKE_GROQ_MALFORMED_RATE=0.0, LLM_MAX_RETRIES=0, LLM_BREAKER_FAILURE_THRESHOLD=2)
+    def test_open_breaker_skips_the_llm_and_shows_in_debug(self):
+        url = reverse('debug-recommendations', args=['RES001'])
+        response = self.client.get(url)
+        self.assertEqual(response.data['ai_info']['llm_resilience']['circuit_breaker']['state'], 'closed')
+        self.assertEqual(response.data['recommendation_result']['count'], 3)  # rule-based
+
+        calls = get_engine().client.behavior.stats['calls']
+        response = self.client.get(url)
+        breaker = response.data['ai_info']['llm_resilience']['circuit_breaker']
+        self.assertEqual((breaker['state'], breaker['consecutive_failures']), ('open', 2))
+        self.assertEqual(response.data['recommendation_result']['count'], 3)
+        self.assertEqual(get_engine().client.behavior.stats['calls'], calls)
+        self.assertEqual(get_policy().breaker.rejected, 2)
+
+    def test_abandoned_trial_releases_the_breaker(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+        policy = LLMCallPolicy(breaker=breaker, max_retries=0)
+        engine = AIRecommendationEngine()
+        engine.cache = InMemoryLRUCache(default_ttl=60)
+        engine.model = 'test-model'
+        engine.client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions('x' * 50)))
+
+        breaker.record_failure()
+        now[0] = 10.0  # half-open: the stream below is the trial
+        with mock.patch('webq_app.resilience.get_policy', return_value=policy):
+            stream = engine._chat_stream('prompt', use_cache=False)
+            next(stream)
+            stream.close()  # client disconnected
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        breaker.release()
+
+        async def cancelled():
+            async def attempt(timeout):
+                await asyncio.sleep(10)
+            task = asyncio.ensure_future(policy.acall(attempt))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        async_to_sync(cancelled)()
+        self.assertTrue(breaker.allow())
+
+        # A trial that never reports back expires after reset_timeout
+        self.assertFalse(breaker.allow())
+        now[0] = 20.0
+        self.assertTrue(breaker.allow())
+
+    def test_hedged_request_wins_over_a_slow_primary(self):
+        policy = LLMCallPolicy(hedge_after=0.05)
+
+        def make_attempt(sleep):
+            delays = [0.5, 0.0]
+
+            def attempt(timeout):
+                delay = delays.pop(0)
+                return sleep(delay) or delay
+            return attempt
+
+        started = time.monotonic()
+        self.assertEqual(policy.call(make_attempt(time.sleep)), 0.0)
+        self.assertLess(time.monotonic() - started, 0.3)
+
+        async def acall():
+            async def attempt(timeout, delays=[0.5, 0.0]):
+                delay = delays.pop(0)
+                await asyncio.sleep(delay)
+                return delay
+            return await policy.acall(attempt)
+        started = time.monotonic()
+        self.assertEqual(async_to_sync(acall)(), 0.0)
+        self.assertLess(time.monotonic() - started, 0.3)
+
+
+class CandidateShortlistTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='CAND001', name='Candidate', email='candidate@example.com', performance_score=45.0
+        )
+        self.student.set_pending_courses(['Python Basics'])
+        self.student.set_completed_courses(['Web Development'])
+        # High-priority filler sorts first in catalog order
+        for i in range(30):
+            LearningResource.objects.create(
+                resource_id=f'FILL{i:02d}', title=f'Filler {i}', type='video',
+                difficulty_level='advanced', course_id='FILL101', recommendation_priority=10
+            )
+        self.python = LearningResource.objects.create(
+            resource_id='CANDPY', title='Python Fundamentals Tutorial', type='tutorial',
+            difficulty_level='beginner', course_id='PY101', recommendation_priority=3
+        )
+        self.web = LearningResource.objects.create(
+            resource_id='CANDWEB', title='Web Development Tutorial', type='tutorial',
+            difficulty_level='beginner', course_id='WEB101', recommendation_priority=3
+        )
+        self.sql = LearningResource.objects.create(
+            resource_id='CANDSQL', title='SQL Tutorial', type='tutorial',
+            difficulty_level='beginner', course_id='DB101', recommendation_priority=3
+        )
+        self.engine = AIRecommendationEngine()
+        self.engine.performance = self.engine._performance_data(self.student)
+
+    def ids(self, positions):
+        catalog = get_catalog()
+        return [catalog.resources[p].resource_id for p in positions]
+
+    def test_pending_courses_rank_first_and_completed_ones_drop(self):
+        ranked = self.ids(candidates.shortlist(get_catalog(), self.engine.performance, limit=3))
+        self.assertEqual(ranked, ['CANDPY', 'CANDSQL', 'CANDWEB'])
+
+        ranked = self.ids(candidates.shortlist(get_catalog(), self.engine.performance, {self.python.pk}, limit=2))
+        self.assertEqual(ranked, ['CANDSQL', 'CANDWEB'])
+
+    def test_token_budget_limits_rows(self):
+        catalog = get_catalog()
+        row_tokens = candidates.approx_tokens(catalog.prompt_row_json[0])
+        self.assertEqual(len(candidates.shortlist(catalog, self.engine.performance, limit=10)), 10)
+        budgeted = candidates.shortlist(catalog, self.engine.performance, limit=10, token_budget=row_tokens * 3)
+        self.assertIn(len(budgeted), (2, 3))
+
+    def test_numpy_free_ranking_matches(self):
+        catalog = get_catalog()
+        with mock.patch.object(candidates, 'SIMILARITY_WEIGHT', 0):
+            expected = candidates.shortlist(catalog, self.engine.performance, {self.web.pk}, limit=12)
+        with mock.patch.object(scoring, 'np', None):
+            self.assertEqual(candidates.shortlist(catalog, self.engine.performance, {self.web.pk}, limit=12),
+                             expected)
+
+    @override_settings(LLM_PROMPT_CANDIDATES=5)
+    def test_prompt_carries_the_shortlist(self):
+        Recommendation.objects.create(
+            student=self.student, resource=self.sql, confidence_score=0.5, reason='Earlier'
+        )
+        completions = StubCompletions('{"recommendations": [{"resource_id": "CANDPY", "confidence_score": 0.9}]}')
+        self.engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        self.engine.model = 'test-model'
+        self.engine.cache = InMemoryLRUCache(default_ttl=60)
+        for mode in ('two_call', 'single_call'):
+            recommendations = self.engine.generate_recommendations(self.student, 2, use_cache=False, mode=mode)
+            self.assertEqual(recommendations[0]['resource'], self.python)
+            prompt = completions.prompts[-1]
+            self.assertIn('"id":"CANDPY"', prompt)
+            self.assertNotIn('CANDSQL', prompt)  # already recommended
+            self.assertEqual(prompt.count('"id":'), 5)
+
+
+@override_settings(SIMILARITY_BUILD_IN_BACKGROUND=False)
+class SimilarityIndexTests(TestCase):
+    def setUp(self):
+        similarity.reset_index()
+        self.student = Student.objects.create(
+            student_id='SIM001', name='Similar', email='similar@example.com', performance_score=60.0
+        )
+        self.student.set_pending_courses(['Neural Networks'])
+        self.networks = LearningResource.objects.create(
+            resource_id='SIMNN', title='Deep Learning Lab', type='video', difficulty_level='intermediate',
+            course_id='ML401', description='Train neural networks: layers, backpropagation, networks in practice.'
+        )
+        self.graphs = LearningResource.objects.create(
+            resource_id='SIMGRAPH', title='Graph Algorithms', type='quiz', difficulty_level='intermediate',
+            course_id='CS301', description='Shortest paths over road networks and social graphs.'
+        )
+        for i in range(8):
+            LearningResource.objects.create(
+                resource_id=f'SIMX{i}', title=f'Spreadsheet Skills {i}', type='quiz',
+                difficulty_level='intermediate', course_id='OFF101', recommendation_priority=9,
+                description='Formulas, pivot tables and charts.'
+            )
+
+    def tearDown(self):
+        similarity.reset_index()
+
+    def test_top_k_ranks_by_title_and_description(self):
+        index = get_catalog().similarity_index
+        catalog = get_catalog()
+        positions, scores = index.top_k(['neural', 'networks'], 2)
+        self.assertEqual([catalog.resources[p] for p in positions], [self.networks, self.graphs])
+        self.assertGreater(scores[0], scores[1])
+        self.assertGreater(scores[1], 0)
+
+        positions, _ = index.top_k(['neural', 'networks'], 1, exclude_pks={self.networks.pk})
+        self.assertEqual(catalog.resources[positions[0]], self.graphs)
+        self.assertEqual(len(index.top_k([], 5)[0]), 0)
+
+    def test_changed_resources_are_the_only_ones_tokenized(self):
+        self.assertEqual(get_catalog().similarity_index.reused, 0)
+
+        self.graphs.description = 'Neural networks on graphs.'
+        self.graphs.save()
+        LearningResource.objects.get(resource_id='SIMX0').delete()
+        index = get_catalog().similarity_index
+        self.assertEqual((len(index), index.reused), (9, 8))
+
+    def test_index_persists_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.npz')
+            with override_settings(SIMILARITY_INDEX_PATH=path):
+                built = get_catalog().similarity_index
+                self.assertTrue(os.path.exists(path))
+                similarity.reset_index()  # as in a fresh process
+                invalidate_catalog()
+                loaded = get_catalog().similarity_index
+            self.assertEqual(loaded.reused, len(loaded))
+            self.assertTrue((built.column_weights == loaded.column_weights).all())
+
+    def test_similarity_mode_ranks_without_the_llm(self):
+        completions = StubCompletions('{}')
+        engine = AIRecommendationEngine()
+        engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        engine.model = 'test-model'
+        Recommendation.objects.create(student=self.student, resource=self.graphs, confidence_score=0.5)
+
+        recommendations = engine.generate_recommendations(self.student, 3, mode='similarity')
+        self.assertEqual(completions.calls, 0)
+        self.assertEqual(recommendations[0]['resource'], self.networks)
+        self.assertTrue(recommendations[0]['reason'].startswith('Related to your pending courses'))
+        self.assertNotIn(self.graphs, [r['resource'] for r in recommendations])
+
+        async_recs = async_to_sync(engine.agenerate_recommendations)(self.student, 3, mode='similarity')
+        self.assertEqual(async_recs, recommendations)
+
+    def test_requests_never_wait_for_the_index(self):
+        catalog = get_catalog()
+        performance_data = {'pending_courses': ['Neural Networks']}
+        with override_settings(SIMILARITY_BUILD_IN_BACKGROUND=True):
+            # Rule-based ranking until the build thread is done
+            self.assertIsNone(candidates.pending_similarities(catalog, performance_data))
+            for thread in threading.enumerate():
+                if thread.name == 'similarity-index':
+                    thread.join()
+            similarities = candidates.pending_similarities(catalog, performance_data)
+        self.assertEqual(catalog.resources[int(similarities.argmax())], self.networks)
+
+    def test_build_command_saves_and_queries(self):
+        catalog = get_catalog()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.npz')
+            out = StringIO()
+            call_command('build_similarity_index', path=path, query='Neural Networks', top=3, stdout=out)
+            lines = out.getvalue().splitlines()
+            self.assertIn('10 tokenized', lines[0])
+            self.assertIn('SIMNN', lines[1])
+            self.assertTrue(os.path.exists(path))
+
+            # An index already built in this process is still saved to a new path
+            catalog.similarity_index
+            other = os.path.join(tmp, 'other.npz')
+            call_command('build_similarity_index', path=other, stdout=StringIO())
+            self.assertTrue(os.path.exists(other))
+        # --path doesn't go through the settings, so nothing was invalidated
+        self.assertIs(get_catalog(), catalog)
+
+
+class RecommendationJobTests(APITestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            student_id='JOB001',
+            name='Job Student',
+            email='job@example.com',
+            performance_score=55.0
+        )
+        LearningResource.objects.create(
+            resource_id='JOBRES001',
+            title='Job Quiz',
+            type='quiz',
+            difficulty_level='intermediate',
+            course_id='JOB101',
+            recommendation_priority=5
+        )
+
+    def test_background_generation_round_trip(self):
+        response = self.client.post(reverse('generate-recommendations'), {
+            'student_id': 'JOB001',
+            'max_recommendations': 2,
+            'background': True
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Recommendation.objects.exists())
+
+        poll = self.client.get(response.data['status_url'])
+        self.assertEqual(poll.status_code, status.HTTP_200_OK)
+        self.assertEqual(poll.data['status'], 'queued')
+
+        call_command('run_recommendation_worker', once=True, concurrency=1, stdout=StringIO())
+
+        poll = self.client.get(response.data['status_url'])
+        self.assertEqual(poll.data['status'], 'succeeded')
+        self.assertEqual(poll.data['attempts'], 1)
+        self.assertEqual(len(poll.data['result']['recommendations']), 1)
+        self.assertEqual(Recommendation.objects.filter(student=self.student).count(), 1)
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        RecommendationJob.objects.create(student=self.student)
+        RecommendationJob.objects.create(student=self.student)
+
+        first = claim_jobs(1, 'worker-a')
+        second = claim_jobs(5, 'worker-b')
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0].pk, second[0].pk)
+        self.assertEqual(claim_jobs(5, 'worker-c'), [])
+
+    def test_worker_sweeps_jobs_left_running_by_a_dead_worker(self):
+        job = RecommendationJob.objects.create(
+            student=self.student, status='running', worker='dead-worker',
+            started_at=timezone.now() - timedelta(hours=1)
+        )
+        out = StringIO()
+        with override_settings(RECOMMENDATION_JOB_TIMEOUT=60):
+            call_command('run_recommendation_worker', once=True, concurrency=1, stdout=out)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIn('Requeued 1 stale jobs', out.getvalue())
+        self.assertIn('stopped after 1 jobs', out.getvalue())
+
+
+class RecommendationStreamParserTests(TestCase):
+    def test_objects_are_emitted_as_soon_as_complete(self):
+        text = (
+            '```json\n{"recommendations": [{"resource_id": "R1", "confidence_score": 0.9}, '
+            '{"resource_id": "R2", "reason": "has } and { inside"}]}\n```'
+        )
+        parser = RecommendationStreamParser()
+        emitted = []
+        for i in range(0, len(text), 7):
+            emitted.append([rec['resource_id'] for rec in parser.feed(text[i:i + 7])])
+
+        self.assertEqual(sum(emitted, []), ['R1', 'R2'])
+        # R1 is available before the stream reaches R2
+        first_r1 = next(i for i, ids in enumerate(emitted) if 'R1' in ids)
+        self.assertLess(first_r1 * 7, text.index('"R2"'))
+        self.assertTrue(parser.finished)
+
+
+class EngineRegistryTests(TestCase):
+    def tearDown(self):
+        reset_engine()
+
+    def test_engine_is_shared_and_rebuilt_on_settings_change(self):
+        engine = get_engine()
+        self.assertIs(get_engine(), engine)
+        self.assertIsNone(engine.client)
+
+        with self.settings(GROQ_API_KEY='test-key', GROQ_HTTP_MAX_CONNECTIONS=7):
+            pooled = get_engine()
+            self.assertIsNot(pooled, engine)
+            self.assertIs(get_engine(), pooled)
+            self.assertIsNotNone(pooled.client)
+            http_client = registry._http_client
+            self.assertEqual(http_client._transport._pool._max_connections, 7)
+
+        self.assertIsNone(get_engine().client)
+        self.assertTrue(http_client.is_closed)
+
+    @override_settings(GROQ_API_KEY='test-key')
+    def test_reset_closes_async_clients_on_their_running_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(loop.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(loop.call_soon_threadsafe, loop.stop)
+
+        async def client_for_this_loop():
+            return registry.get_async_client()
+        client = asyncio.run_coroutine_threadsafe(client_for_this_loop(), loop).result(5)
+        self.assertFalse(client._client.is_closed)
+
+        reset_engine()
+        # The close was scheduled on the loop that owns the pool; let it run
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result(5)
+        self.assertTrue(client._client.is_closed)
+
+
+class AnalyticsDashboardTests(APITestCase):
+    def setUp(self):
+        self.students = [
+            Student.objects.create(student_id=f'ANA{i}', name=f'Student {i}',
+                                   email=f'ana{i}@example.com', performance_score=score)
+            for i, score in enumerate([90.0, 72.0, 55.0, 30.0, 85.0])
+        ]
+        self.video = LearningResource.objects.create(
+            resource_id='ANARES1', title='Video', type='video',
+            difficulty_level='beginner', course_id='ANA101'
+        )
+        self.quiz = LearningResource.objects.create(
+            resource_id='ANARES2', title='Quiz', type='quiz',
+            difficulty_level='beginner', course_id='ANA101'
+        )
+        Recommendation.objects.create(student=self.students[0], resource=self.video,
+                                      confidence_score=0.9, reason='r', status='viewed')
+        Recommendation.objects.create(student=self.students[1], resource=self.quiz,
+                                      confidence_score=0.7, reason='r')
+
+    def test_live_dashboard_uses_three_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('analytics-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['overview'], {
+            'total_students': 5, 'total_resources': 2, 'total_recommendations': 2
+        })
+        self.assertEqual(response.data['performance_distribution'], {
+            'excellent': 2, 'good': 1, 'average': 1, 'needs_improvement': 1
+        })
+        self.assertEqual(response.data['recommendation_status_distribution']['viewed'], 1)
+        self.assertEqual(response.data['recommendation_status_distribution']['recommended'], 1)
+        self.assertEqual(response.data['resource_type_distribution']['quiz'], 1)
+        self.assertEqual(response.data['resource_type_distribution']['article'], 0)
+
+    @override_settings(ANALYTICS_USE_ROLLUP=True)
+    def test_rollup_tracks_saves_and_deletes(self):
+        call_command('rebuild_analytics_rollup', stdout=StringIO())
+
+        student = self.students[3]
+        student.performance_score = 95.0  # needs_improvement -> excellent
+        student.save()
+        rec = Recommendation.objects.get(student=self.students[1])
+        rec.status = 'completed'
+        rec.save()
+        self.quiz.delete()  # cascades to its recommendation
+        LearningResource.objects.create(resource_id='ANARES3', title='Article', type='article',
+                                        difficulty_level='advanced', course_id='ANA101')
+
+        self.assertEqual(
+            {k: v for k, v in read_rollup().items() if v},
+            {k: v for k, v in compute_counts().items() if v}
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('analytics-dashboard'))
+        self.assertEqual(response.data['performance_distribution']['excellent'], 3)
+        self.assertEqual(response.data['overview']['total_recommendations'], 1)
+        self.assertEqual(response.data['resource_type_distribution']['article'], 1)
+
+    @override_settings(ANALYTICS_USE_ROLLUP=True)
+    def test_bulk_saves_adjust_the_rollup_without_recounting(self):
+        call_command('rebuild_analytics_rollup', stdout=StringIO())
+
+        def row(student, resource):
+            return Recommendation(student=student, resource=resource, confidence_score=0.5,
+                                  reason='bulk', status='recommended', recommendation_date=timezone.now())
+
+        with mock.patch('webq_app.analytics.compute_counts', side_effect=AssertionError('full recount')):
+            # One new pair, one already stored as 'viewed' (left alone)
+            save_recommendations([row(self.students[2], self.video), row(self.students[0], self.video)], False)
+            # Forced: the 'viewed' pair is reset to 'recommended'
+            save_recommendations([row(self.students[0], self.video), row(self.students[3], self.quiz)], True)
+
+        self.assertEqual(
+            {k: v for k, v in read_rollup().items() if v},
+            {k: v for k, v in compute_counts().items() if v}
+        )
+        self.assertEqual(read_rollup()['recommendations.status.recommended'], 4)
+
+    @override_settings(ANALYTICS_USE_ROLLUP=True)
+    def test_empty_rollup_is_rebuilt_on_first_read(self):
+        self.assertFalse(AnalyticsRollup.objects.exists())
+        response = self.client.get(reverse('analytics-dashboard'))
+        self.assertEqual(response.data['overview']['total_students'], 5)
+        self.assertEqual(read_rollup()['students.total'], 5)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        # Several resources share a priority and title to exercise the tie-breaker
+        for i in range(7):
+            LearningResource.objects.create(
+                resource_id=f'PAGE{i}', title='Same Title' if i < 4 else f'Title {i}',
+                type='article', difficulty_level='beginner', course_id='PAGE101',
+                recommendation_priority=5 if i % 2 else 8
+            )
+        self.student = Student.objects.create(student_id='PAGESTU', name='Pager',
+                                              email='pager@example.com', performance_score=60.0)
+        for resource in LearningResource.objects.all():
+            Recommendation.objects.create(student=self.student, resource=resource, reason='r')
+
+    def _walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [row['resource_id'] for row in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_resource_pages_match_default_ordering(self):
+        ids, pages = self._walk(reverse('resource-list-create') + '?page_size=3')
+        expected = list(LearningResource.objects.order_by(
+            '-recommendation_priority', 'title', 'id'
+        ).values_list('resource_id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        url = reverse('resource-list-create') + '?page_size=3'
+        first = self.client.get(url)
+        self.assertIsNone(first.data['previous'])
+        self.assertNotIn('count', first.data)
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_page_size_is_capped_and_total_is_optional(self):
+        with self.settings(API_MAX_PAGE_SIZE=2):
+            response = self.client.get(reverse('student-list-create') + '?page_size=100&include_total=1')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(len(response.data['results']), 1)
+        with self.settings(API_MAX_PAGE_SIZE=2):
+            response = self.client.get(reverse('resource-list-create') + '?page_size=100')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_student_recommendations_are_paginated(self):
+        url = reverse('student-recommendations', kwargs={'student_id': 'PAGESTU'})
+        response = self.client.get(url + '?page_size=4&include_total=true')
+        self.assertEqual(response.data['total_recommendations'], 7)
+        self.assertEqual(len(response.data['recommendations']), 4)
+        rest = self.client.get(response.data['next'])
+        self.assertEqual(len(rest.data['recommendations']), 3)
+        self.assertIsNone(rest.data['next'])
+        seen = [r['id'] for r in response.data['recommendations'] + rest.data['recommendations']]
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+        bad = self.client.get(url + '?cursor=not-a-cursor')
+        self.assertEqual(bad.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_well_formed_cursors_with_wrong_value_types_are_rejected(self):
+        def cursor(position):
+            return urlsafe_b64encode(json.dumps({'p': position, 'r': 0}).encode()).decode().rstrip('=')
+
+        cases = [
+            (reverse('resource-list-create'), ['x', 't', 1]),
+            (reverse('resource-list-create'), [5, 't', None]),
+            (reverse('student-recommendations', kwargs={'student_id': 'PAGESTU'}), ['notadate', 1]),
+            (reverse('student-list-create'), ['x']),
+            (reverse('student-list-create'), [[1]]),
+        ]
+        for url, position in cases:
+            with self.subTest(url=url, position=position):
+                response = self.client.get(url, {'cursor': cursor(position)})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QueryCountTests(APITestCase):
+    """Endpoint query counts must not grow with the number of rows"""
+
+    def setUp(self):
+        resources = LearningResource.objects.bulk_create([
+            LearningResource(resource_id=f'QC{i:03d}', title=f'Resource {i}', type='video',
+                             difficulty_level='beginner', course_id='QC101')
+            for i in range(60)
+        ])
+        students = Student.objects.bulk_create([
+            Student(student_id=f'QCSTU{i:03d}', name=f'Student {i}',
+                    email=f'qc{i}@example.com', performance_score=50.0 + i)
+            for i in range(30)
+        ])
+        self.student = students[0]
+        self.student.set_completed_courses(['Python Basics'])
+        self.student.set_pending_courses(['Machine Learning'])
+        Recommendation.objects.bulk_create([
+            Recommendation(student=self.student, resource=resource, reason='r')
+            for resource in resources
+        ])
+
+    def test_student_recommendations(self):
+        url = reverse('student-recommendations', kwargs={'student_id': 'QCSTU000'})
+        # ETag state, student, page
+        with self.assertNumQueries(3):
+            response = self.client.get(url + '?page_size=60')
+        self.assertEqual(len(response.data['recommendations']), 60)
+        self.assertEqual(response.data['recommendations'][0]['student_name'], 'Student 0')
+
+    def test_student_performance(self):
+        url = reverse('student-performance', kwargs={'student_id': 'QCSTU000'})
+        # ETag state (one query, with subqueries), then student with count,
+        # enrollments, recent recommendations with resources
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.data['total_recommendations'], 60)
+        self.assertEqual(len(response.data['recent_activity']), 5)
+        self.assertEqual(response.data['completed_courses'], ['Python Basics'])
+
+    def test_student_list(self):
+        # students, enrollments
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('student-list-create') + '?page_size=30')
+        self.assertEqual(len(response.data['results']), 30)
+
+    def test_update_recommendation_status(self):
+        recommendation = Recommendation.objects.filter(student=self.student).first()
+        url = reverse('update-recommendation-status', kwargs={'recommendation_id': recommendation.id})
+        # load with student and resource, update
+        with self.assertNumQueries(2):
+            response = self.client.patch(url, {'status': 'viewed'}, format='json')
+        self.assertEqual(response.data['resource']['resource_id'], recommendation.resource.resource_id)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.student = Student.objects.create(student_id='ETAG001', name='Etag Student',
+                                              email='etag@example.com', performance_score=70.0)
+        self.resource = LearningResource.objects.create(
+            resource_id='ETAGRES1', title='Cached', type='video',
+            difficulty_level='beginner', course_id='ETAG101'
+        )
+        self.recommendation = Recommendation.objects.create(
+            student=self.student, resource=self.resource, reason='r'
+        )
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_resources_not_modified_until_catalog_changes(self):
+        url = reverse('resource-list-create')
+        first = self.client.get(url)
+        self.assertIn('ETag', first)
+        # Max(updated_at) to the second would miss deletes and same-second writes
+        self.assertNotIn('Last-Modified', first)
+        # Only the validator aggregate runs
+        with self.assertNumQueries(1):
+            self.assertEqual(self._revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        LearningResource.objects.create(resource_id='ETAGRES2', title='New', type='quiz',
+                                        difficulty_level='beginner', course_id='ETAG101')
+        self.assertEqual(self._revalidate(url, first).status_code, status.HTTP_200_OK)
+
+    def test_recommendations_revalidate_after_status_change_and_delete(self):
+        url = reverse('student-recommendations', kwargs={'student_id': 'ETAG001'})
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(
+            reverse('update-recommendation-status', kwargs={'recommendation_id': self.recommendation.id}),
+            {'status': 'viewed'}, format='json'
+        )
+        second = self._revalidate(url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+        self.recommendation.delete()
+        self.assertEqual(self._revalidate(url, second).status_code, status.HTTP_200_OK)
+
+    def test_performance_tracks_course_changes(self):
+        url = reverse('student-performance', kwargs={'student_id': 'ETAG001'})
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.student.set_pending_courses(['Machine Learning'])
+        self.assertEqual(self._revalidate(url, first).status_code, status.HTTP_200_OK)
+
+        missing = reverse('student-performance', kwargs={'student_id': 'NOPE'})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResourceImportTests(APITestCase):
+    def setUp(self):
+        LearningResource.objects.create(
+            resource_id='IMP001', title='Old Title', type='video',
+            difficulty_level='beginner', course_id='IMP101', description='Keep me'
+        )
+
+    def test_command_upserts_csv_and_reports_invalid_rows(self):
+        csv_text = (
+            "resource_id,title,type,difficulty_level,course_id,recommendation_priority\n"
+            "IMP001,New Title,video,beginner,IMP101,9\n"
+            "IMP002,Second,quiz,advanced,IMP101,\n"
+            "IMP003,Bad Type,podcast,beginner,IMP101,5\n"
+            "IMP004,Third,article,intermediate,IMP101,11\n"
+            "IMP005,Fourth,article,intermediate,IMP102,3\n"
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(csv_text)
+        self.addCleanup(os.remove, f.name)
+        catalog_version = get_catalog().version
+
+        out = StringIO()
+        call_command('import_resources', f.name, batch_size=2, stdout=out, stderr=StringIO())
+
+        self.assertIn('5 rows read, 3 upserted, 2 invalid', out.getvalue())
+        self.assertIn('line 4', out.getvalue())
+        updated = LearningResource.objects.get(resource_id='IMP001')
+        self.assertEqual((updated.title, updated.recommendation_priority), ('New Title', 9))
+        # Columns missing from the file are left alone
+        self.assertEqual(updated.description, 'Keep me')
+        self.assertEqual(LearningResource.objects.get(resource_id='IMP002').recommendation_priority, 5)
+        self.assertFalse(LearningResource.objects.filter(resource_id__in=['IMP003', 'IMP004']).exists())
+        self.assertNotEqual(get_catalog().version, catalog_version)
+
+    def test_jsonl_rows_with_different_columns_keep_their_own_omissions(self):
+        LearningResource.objects.create(
+            resource_id='IMP002', title='Second', type='quiz', difficulty_level='advanced',
+            course_id='IMP101', description='Keep me too', recommendation_priority=9
+        )
+        lines = [
+            {'resource_id': 'IMP001', 'title': 'New One', 'type': 'video', 'difficulty_level': 'beginner',
+             'course_id': 'IMP101', 'description': 'Replaced', 'recommendation_priority': 2},
+            {'resource_id': 'IMP002', 'title': 'New Two', 'type': 'quiz', 'difficulty_level': 'advanced',
+             'course_id': 'IMP101'},
+        ]
+        stream = StringIO('\n'.join(json.dumps(line) for line in lines))
+        report = import_resources(stream, 'jsonl')
+        self.assertEqual(report['imported'], 2)
+
+        first = LearningResource.objects.get(resource_id='IMP001')
+        self.assertEqual((first.description, first.recommendation_priority), ('Replaced', 2))
+        second = LearningResource.objects.get(resource_id='IMP002')
+        self.assertEqual((second.title, second.description, second.recommendation_priority),
+                         ('New Two', 'Keep me too', 9))
+
+    def test_upload_endpoint_streams_jsonl(self):
+        lines = [
+            json.dumps({'resource_id': 'UPL001', 'title': 'Uploaded', 'type': 'tutorial',
+                        'difficulty_level': 'beginner', 'course_id': 'UPL101'}),
+            '',
+            '{not json',
+            json.dumps({'resource_id': 'UPL001', 'title': 'Uploaded twice', 'type': 'tutorial',
+                        'difficulty_level': 'beginner', 'course_id': 'UPL101'}),
+        ]
+        upload = SimpleUploadedFile('resources.jsonl', '\n'.join(lines).encode())
+        response = self.client.post(reverse('import-resources'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['rows'], response.data['invalid']), (3, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        self.assertEqual(LearningResource.objects.get(resource_id='UPL001').title, 'Uploaded twice')
+
+        dry = SimpleUploadedFile('more.jsonl', lines[0].replace('UPL001', 'UPL002').encode())
+        response = self.client.post(reverse('import-resources'), {'file': dry, 'dry_run': 'true'},
+                                    format='multipart')
+        self.assertEqual(response.data['imported'], 1)
+        self.assertFalse(LearningResource.objects.filter(resource_id='UPL002').exists())
+
+        bad = SimpleUploadedFile('resources.xml', b'<xml/>')
+        response = self.client.post(reverse('import-resources'), {'file': bad}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(student_id='EXP001', name='Export, Student',
+                                              email='export@example.com', performance_score=80.0)
+        other = Student.objects.create(student_id='EXP002', name='Other',
+                                       email='other@example.com', performance_score=40.0)
+        resources = LearningResource.objects.bulk_create([
+            LearningResource(resource_id=f'EXPRES{i}', title=f'Export {i}', type='quiz',
+                             difficulty_level='advanced', course_id='EXP101')
+            for i in range(3)
+        ])
+        for i, resource in enumerate(resources):
+            Recommendation.objects.create(student=self.student, resource=resource, reason='Because "reasons"',
+                                          status='viewed' if i == 0 else 'recommended')
+        Recommendation.objects.create(student=other, resource=resources[0], reason='r')
+
+    def _content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_recommendations_ndjson_with_filters(self):
+        response = self.client.get(reverse('export-recommendations'),
+                                   {'status': 'recommended', 'student_id': 'EXP001'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([row['resource_id'] for row in rows], ['EXPRES1', 'EXPRES2'])
+        self.assertEqual(rows[0]['student_name'], 'Export, Student')
+        self.assertEqual(rows[0]['difficulty_level'], 'advanced')
+
+    def test_recommendations_csv_and_date_range(self):
+        today = timezone.localdate().isoformat()
+        response = self.client.get(reverse('export-recommendations'),
+                                   {'format': 'csv', 'since': today, 'until': today})
+        self.assertIn('attachment; filename="recommendations.csv"', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(self._content(response))))
+        self.assertEqual(rows[0][:3], ['id', 'student_id', 'student_name'])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][2], 'Export, Student')
+
+        response = self.client.get(reverse('export-recommendations'), {'until': '2000-01-01'})
+        self.assertEqual(self._content(response), '')
+
+    def test_students_export_and_validation(self):
+        response = self.client.get(reverse('export-students'), {'format': 'csv'})
+        self.assertEqual(len(self._content(response).splitlines()), 3)
+
+        for params in ({'format': 'xml'}, {'since': 'yesterday'}, {'status': 'lost'}):
+            response = self.client.get(reverse('export-recommendations'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SyntheticDataTests(TestCase):
+    def _generate(self, **options):
+        call_command('generate_synthetic_data', students=30, resources=12, recs_per_student=4,
+                     courses=8, batch_size=7, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_generates_requested_rows_reproducibly(self):
+        self._generate(prefix='A')
+        self.assertEqual(Student.objects.filter(student_id__startswith='A').count(), 30)
+        self.assertEqual(LearningResource.objects.filter(resource_id__startswith='A').count(), 12)
+        recs = Recommendation.objects.filter(student__student_id__startswith='A')
+        self.assertEqual(recs.count(), 120)
+        # Dates are spread out rather than all stamped 'now'
+        self.assertGreater(recs.values('recommendation_date').distinct().count(), 100)
+        # ...without switching off auto_now_add for everyone else
+        self.assertTrue(Recommendation._meta.get_field('recommendation_date').auto_now_add)
+        student = Student.objects.with_courses().get(student_id='A00000003')
+        courses = student.get_courses()
+        self.assertFalse(set(courses['completed']) & set(courses['pending']))
+
+        # Same seed, same data
+        self._generate(prefix='B')
+        def scores(prefix):
+            students = Student.objects.filter(student_id__startswith=prefix).order_by('id')
+            return list(students.values_list('performance_score', flat=True))
+        self.assertEqual(scores('A'), scores('B'))
+
+        with self.assertRaises(CommandError):
+            self._generate(prefix='A')
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_covers_every_url_and_engine_method(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'run.json')
+            call_command('run_benchmarks', sizes=[10], iterations=2, engine_iterations=2, warmup=0,
+                         use_current_db=True, output=output, baseline=os.path.join(tmp, 'none.json'),
+                         stdout=StringIO(), stderr=StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        api = {r['name']: r for r in report['results'] if r['kind'] == 'api'}
+        self.assertEqual(set(api), {pattern.name for pattern in urlpatterns})
+        self.assertFalse([name for name, r in api.items() if r['errors']])
+        # The importer calls reset_queries(), which must not hide its statements
+        self.assertGreater(api['import-resources']['queries'], 0)
+        engine = {r['name'] for r in report['results'] if r['kind'] == 'engine'}
+        self.assertTrue({'fallback_ranking', 'recommendation_prompt', 'parse_recommendations'} <= engine)
+        # The generated rows are gone, so the same command can run again
+        self.assertFalse(Student.objects.filter(student_id__startswith='BENCH10_').exists())
+        self.assertFalse(LearningResource.objects.filter(resource_id__startswith='BENCH10_').exists())
+
+    def test_compare_flags_slower_or_chattier_benchmarks(self):
+        def run(p50, queries):
+            return {'results': [{'size': 10, 'kind': 'api', 'name': 'x',
+                                 'p50_ms': p50, 'p95_ms': p50, 'queries': queries}]}
+        self.assertEqual(compare(run(10, 3), run(11, 3)), [])
+        # Under the absolute floor, however large the relative change
+        self.assertEqual(compare(run(0.1, 3), run(0.3, 3)), [])
+        slower = compare(run(10, 3), run(20, 3))
+        self.assertEqual(len(slower[0]['reasons']), 2)
+        self.assertEqual(compare(run(10, 3), run(10, 4))[0]['reasons'], ['queries 3 -> 4'])
+
+    def test_percentile_is_nearest_rank(self):
+        samples = list(range(1, 11))
+        self.assertEqual(percentile(samples, 50), 5)
+        self.assertEqual(percentile(samples, 95), 10)
+        self.assertEqual(percentile(samples, 10), 1)
+        self.assertEqual(percentile(samples, 0), 1)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', check=True, stdout=out)
+        self.assertIn('rec_student_status_date_idx', out.getvalue())
+        self.assertIn('resource_diff_type_prio_idx', out.getvalue())
+
+
+class CourseListMigrationTests(TransactionTestCase):
+    migrate_from = ('webq_app', '0005_course_enrollment')
+    migrate_to = ('webq_app', '0006_copy_course_lists')
+
+    def test_json_course_lists_become_enrollments(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        OldStudent = apps.get_model('webq_app', 'Student')
+        OldStudent.objects.create(
+            student_id='MIG001', name='Migrated', email='mig@example.com',
+            completed_courses='["Python Basics", "Algorithms"]',
+            pending_courses='["Algorithms", "Machine Learning"]'
+        )
+        OldStudent.objects.create(
+            student_id='MIG002', name='Broken', email='broken@example.com',
+            completed_courses='not json'
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([self.migrate_to])
+        apps = executor.loader.project_state([self.migrate_to]).apps
+        Enrollment = apps.get_model('webq_app', 'Enrollment')
+        rows = set(Enrollment.objects.values_list('student__student_id', 'course__name', 'status'))
+        self.assertEqual(rows, {
+            ('MIG001', 'Python Basics', 'completed'),
+            ('MIG001', 'Algorithms', 'completed'),
+            ('MIG001', 'Machine Learning', 'pending'),
+        })
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
@@ -0,0 +1,247 @@
+"""Per-request phase timings, reported as a Server-Timing header and a log line.
+
+``ServerTimingMiddleware`` opens a collector for each request. ``phase()``
+and ``timed()`` add to it, and the query hook installed on every database
+connection counts queries against it. Outside a timed request, a hook costs
+a single ContextVar lookup.
+"""
+import inspect
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional['RequestTimings']] = ContextVar('webq_request_timings', default=None)
+
+# Header descriptions per phase; anything else is described in calls
+UNITS = {'db': 'queries'}
+
+
+class RequestTimings:
+    """Call count and wall time per phase for one request.
+
+    Phases can nest (queries run inside serialization, for example), so
+    they don't add up to the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, list] = {}  # name -> [count, seconds]
+        self._lock = threading.Lock()  # sync_to_async threads share the collector
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        metrics = [
+            f'{name};dur={seconds * 1000:.1f};desc="{count} {UNITS.get(name, "calls")}"'
+            for name, (count, seconds) in self.phases.items()
+        ]
+        metrics.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def summary(self) -> Dict:
+        return {
+            'total_ms': round(self.elapsed() * 1000, 1),
+            'phases': {
+                name: {'count': count, 'ms': round(seconds * 1000, 1)}
+                for name, (count, seconds) in self.phases.items()
+            },
+        }
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+class phase:
+    """Time the enclosed block as ``name`` when a request is being timed.
+
+    A plain class rather than @contextmanager: this sits on hot paths and
+    the generator machinery costs several times more when timing is off.
+    """
+    __slots__ = ('name', 'timings', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timed(name: str):
+    """Decorator form of ``phase`` for functions, coroutines and generators.
+
+    Generators are charged only for the time spent producing items, not for
+    the time their consumer holds them.
+    """
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timings = _current.get()
+                if timings is None:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.add(name, time.perf_counter() - start)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                timings = _current.get()
+                if timings is None:
+                    return (yield from func(*args, **kwargs))
+                elapsed = 0.0
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(generator)
+                        except StopIteration as stop:
+                            return stop.value
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        yield item
+                finally:
+                    generator.close()
+                    timings.add(name, elapsed)
+            return generator_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _query_timer(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - start)
+
+
+def install_query_timer(connection) -> None:
+    # Wrappers outlive reconnects, so only add ours once per connection object
+    if _query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _query_timer)
+
+
+def enabled() -> bool:
+    return getattr(settings, 'SERVER_TIMING_ENABLED', False)
+
+
+class ServerTimingMiddleware:
+    """Adds ``Server-Timing`` and logs one JSON line per request.
+
+    For streaming responses, the header covers only the work done before
+    the body starts. The log line is written once the stream is exhausted,
+    so it includes everything.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not enabled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        response['Server-Timing'] = timings.header()
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = self._timed_stream(
+                response.streaming_content, request, response, timings
+            )
+        else:
+            self._log(request, response, timings)
+        return response
+
+    def _timed_stream(self, content, request, response, timings):
+        iterator = iter(content)
+        try:
+            while True:
+                # The body is produced after the middleware returned; time it
+                # against the same request
+                token = _current.set(timings)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self._log(request, response, timings)
+
+    @staticmethod
+    def _log(request, response, timings):
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'streaming': response.streaming,
+            **timings.summary(),
+        }))
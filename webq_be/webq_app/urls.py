@@ -9,13 +9,22 @@ urlpatterns = [
     
     # Learning resource endpoints
     path('resources/', views.LearningResourceListCreateView.as_view(), name='resource-list-create'),
+    path('resources/import/', views.import_learning_resources, name='import-resources'),
     path('resources/<str:resource_id>/', views.LearningResourceDetailView.as_view(), name='resource-detail'),
     
     # Recommendation endpoints
     path('recommendations/', views.generate_recommendations, name='generate-recommendations'),
+    path('recommendations/async/', views.GenerateRecommendationsAsyncView.as_view(), name='generate-recommendations-async'),
+    path('recommendations/stream/', views.stream_recommendations, name='stream-recommendations'),
+    path('recommendations/batch/', views.generate_recommendations_batch, name='generate-recommendations-batch'),
     path('recommendations/<str:student_id>/', views.get_student_recommendations, name='student-recommendations'),
+    path('recommendations/jobs/<uuid:job_id>/', views.get_recommendation_job, name='recommendation-job-detail'),
     path('recommendations/update/<int:recommendation_id>/', views.update_recommendation_status, name='update-recommendation-status'),
     
+    # Bulk exports
+    path('exports/recommendations/', views.export_recommendations, name='export-recommendations'),
+    path('exports/students/', views.export_students, name='export-students'),
+    
     # Debug endpoint
     path('debug/recommendations/<str:student_id>/', views.debug_recommendations, name='debug-recommendations'),
     
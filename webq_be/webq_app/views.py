@@ -1,44 +1,125 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
-from .models import Student, LearningResource, Recommendation
+from django.http import JsonResponse, StreamingHttpResponse
+from .models import Student, LearningResource, Recommendation, RecommendationJob
 from .serializers import (
     StudentSerializer, StudentPerformanceSerializer,
     LearningResourceSerializer, RecommendationSerializer,
-    GenerateRecommendationSerializer
+    GenerateRecommendationSerializer, BulkGenerateRecommendationSerializer,
+    RecommendationJobSerializer
+)
+from .engine_registry import get_engine
+from .catalog import get_catalog
+from .services import (
+    agenerate_student_recommendations, existing_recommendations, generate_recommendations_bulk,
+    generate_student_recommendations, store_student_recommendations, use_llm_cache
+)
+from .jobs import enqueue_recommendation_job, enqueue_recommendation_jobs
+from .importer import FORMATS as IMPORT_FORMATS, detect_format, import_resources, open_text
+from .exports import (
+    FORMATS as EXPORT_FORMATS, recommendation_rows, stream as export_stream, student_rows
+)
+from .analytics import get_dashboard
+from .pagination import KeysetPagination
+from . import resilience, timing
+from .conditional import (
+    conditional_get, resources_state, student_performance_state, student_recommendations_state
 )
-from .ai_engine import AIRecommendationEngine
 import logging
 
 logger = logging.getLogger(__name__)
 
 class StudentListCreateView(generics.ListCreateAPIView):
-    queryset = Student.objects.all()
+    queryset = Student.objects.with_courses()
     serializer_class = StudentSerializer
+    keyset_ordering = ('id',)
 
 class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Student.objects.all()
+    queryset = Student.objects.with_courses()
     serializer_class = StudentSerializer
     lookup_field = 'student_id'
 
 class StudentPerformanceView(generics.RetrieveAPIView):
     """Get detailed student performance data"""
-    queryset = Student.objects.all()
+    queryset = Student.objects.with_courses().with_performance()
     serializer_class = StudentPerformanceSerializer
     lookup_field = 'student_id'
 
+    @method_decorator(conditional_get(student_performance_state))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 class LearningResourceListCreateView(generics.ListCreateAPIView):
     queryset = LearningResource.objects.all()
     serializer_class = LearningResourceSerializer
+    # Meta.ordering plus the primary key as a unique tie-breaker
+    keyset_ordering = ('-recommendation_priority', 'title', 'id')
+
+    @method_decorator(conditional_get(resources_state))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
 class LearningResourceDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = LearningResource.objects.all()
     serializer_class = LearningResourceSerializer
     lookup_field = 'resource_id'
 
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def import_learning_resources(request):
+    """Upsert learning resources from an uploaded CSV or JSONL file"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload a CSV or JSONL file in the "file" field'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    fmt = request.data.get('format') or detect_format(upload.name)
+    if fmt not in IMPORT_FORMATS:
+        return Response({'error': f'Unsupported format. Must be one of: {list(IMPORT_FORMATS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+    try:
+        # Large uploads are spooled to a temporary file and read back line by line
+        with open_text(upload.file) as stream:
+            report = import_resources(stream, fmt, dry_run=dry_run)
+        return Response(report)
+
+    except UnicodeDecodeError as e:
+        return Response({
+            'error': 'File must be UTF-8 encoded',
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error importing resources: {e}")
+        return Response({
+            'error': 'Failed to import resources',
+            'detail': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _queued(job, student_id):
+    return Response({
+        'message': 'Recommendation generation queued',
+        'student_id': student_id,
+        'job_id': str(job.job_id),
+        'status': job.status,
+        'status_url': reverse('recommendation-job-detail', kwargs={'job_id': job.job_id})
+    }, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['POST'])
 def generate_recommendations(request):
     """Generate AI-powered recommendations for a student"""
@@ -51,94 +132,282 @@ def generate_recommendations(request):
     max_recommendations = serializer.validated_data['max_recommendations']
 
     try:
-        student = get_object_or_404(Student, student_id=student_id)
-        
-        # Check if we should generate new recommendations
-        if not force_regenerate:
-            existing_count = student.recommendation_set.filter(
-                status='recommended'
-            ).count()
-            
-            if existing_count >= max_recommendations:
-                return Response({
-                    'message': f'Student already has {existing_count} active recommendations',
-                    'student_id': student_id,
-                    'existing_recommendations': existing_count
-                })
-
-        # Initialize AI engine
-        ai_engine = AIRecommendationEngine()
-        
-        # Generate recommendations
-        recommendations_data = ai_engine.generate_recommendations(
-            student, max_recommendations
-        )
+        student = get_object_or_404(Student.objects.with_courses(), student_id=student_id)
 
-        # Create recommendation records
-        created_recommendations = []
-        for rec_data in recommendations_data:
-            recommendation, created = Recommendation.objects.get_or_create(
-                student=student,
-                resource=rec_data['resource'],
-                defaults={
-                    'confidence_score': rec_data['confidence_score'],
-                    'reason': rec_data['reason'],
-                    'status': 'recommended'
-                }
+        if serializer.validated_data['background']:
+            job = enqueue_recommendation_job(
+                student, max_recommendations, force_regenerate,
+                serializer.validated_data.get('mode', '')
             )
-            
-            if created or force_regenerate:
-                if force_regenerate and not created:
-                    # Update existing recommendation
-                    recommendation.confidence_score = rec_data['confidence_score']
-                    recommendation.reason = rec_data['reason']
-                    recommendation.recommendation_date = timezone.now()
-                    recommendation.status = 'recommended'
-                    recommendation.save()
-                
-                created_recommendations.append(recommendation)
-
-        # Serialize response
-        serializer = RecommendationSerializer(created_recommendations, many=True)
-        
+            return _queued(job, student_id)
+
+        return Response(generate_student_recommendations(
+            student, max_recommendations, force_regenerate,
+            mode=serializer.validated_data.get('mode')
+        ))
+
+    except Exception as e:
+        logger.error(f"Error generating recommendations: {e}")
         return Response({
-            'message': f'Generated {len(created_recommendations)} recommendations',
+            'error': 'Failed to generate recommendations',
+            'detail': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _queue_batch(student_ids, max_recommendations, force_regenerate, mode):
+    # Preserve request order while dropping duplicates
+    student_ids = list(dict.fromkeys(student_ids))
+    students = {s.student_id: s for s in Student.objects.filter(student_id__in=student_ids)}
+    jobs = enqueue_recommendation_jobs(
+        [students[sid] for sid in student_ids if sid in students],
+        max_recommendations, force_regenerate, mode
+    )
+    job_for = {job.student.student_id: job for job in jobs}
+
+    results = []
+    for student_id in student_ids:
+        job = job_for.get(student_id)
+        if job is None:
+            results.append({'student_id': student_id, 'status': 'not_found'})
+            continue
+        results.append({
             'student_id': student_id,
-            'recommendations': serializer.data
+            'status': job.status,
+            'job_id': str(job.job_id),
+            'status_url': reverse('recommendation-job-detail', kwargs={'job_id': job.job_id}),
+        })
+    return Response({
+        'message': f'Queued recommendation generation for {len(jobs)} students',
+        'results': results
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
+def generate_recommendations_batch(request):
+    """Generate recommendations for many students in one request.
+
+    Lists above BULK_GENERATE_MAX_STUDENTS must set ``background``, which
+    queues a job per student for run_recommendation_worker instead.
+    """
+    serializer = BulkGenerateRecommendationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if serializer.validated_data['background']:
+            return _queue_batch(
+                serializer.validated_data['student_ids'],
+                serializer.validated_data['max_recommendations'],
+                serializer.validated_data['force_regenerate'],
+                serializer.validated_data.get('mode', ''),
+            )
+
+        results = generate_recommendations_bulk(
+            serializer.validated_data['student_ids'],
+            max_recommendations=serializer.validated_data['max_recommendations'],
+            force_regenerate=serializer.validated_data['force_regenerate'],
+            mode=serializer.validated_data.get('mode'),
+        )
+        generated = sum(r.get('generated', 0) for r in results)
+
+        return Response({
+            'message': f'Generated {generated} recommendations for {len(results)} students',
+            'results': results
         })
 
     except Exception as e:
-        logger.error(f"Error generating recommendations: {e}")
+        logger.error(f"Error generating bulk recommendations: {e}")
         return Response({
             'error': 'Failed to generate recommendations',
             'detail': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class AsyncAPIView(APIView):
+    """APIView whose handlers may be coroutines, for ASGI deployments.
+
+    Parsing, authentication (with SessionAuthentication's CSRF check),
+    permissions, throttling and exception handling are DRF's own; the
+    checks that may query the database run in a worker thread.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+class GenerateRecommendationsAsyncView(AsyncAPIView):
+    """Async variant of generate_recommendations for ASGI deployments.
+
+    Takes the same payload and returns the same response body, but never
+    blocks a worker thread while waiting on Groq.
+    """
+
+    async def post(self, request):
+        serializer = GenerateRecommendationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        student_id = serializer.validated_data['student_id']
+        force_regenerate = serializer.validated_data['force_regenerate']
+        max_recommendations = serializer.validated_data['max_recommendations']
+
+        try:
+            student = await Student.objects.with_courses().aget(student_id=student_id)
+        except Student.DoesNotExist:
+            raise NotFound()
+
+        try:
+            if serializer.validated_data['background']:
+                job = await sync_to_async(enqueue_recommendation_job)(
+                    student, max_recommendations, force_regenerate,
+                    serializer.validated_data.get('mode', '')
+                )
+                return _queued(job, student_id)
+
+            return Response(await agenerate_student_recommendations(
+                student, max_recommendations, force_regenerate,
+                mode=serializer.validated_data.get('mode')
+            ))
+
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {e}")
+            return Response({
+                'error': 'Failed to generate recommendations',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets EventSource clients (Accept: text/event-stream) pass content negotiation"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses reach the renderer; streams bypass it
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+@api_view(['GET', 'POST'])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_recommendations(request):
+    """Stream recommendation generation as Server-Sent Events.
+
+    Accepts the generate payload as a JSON body (POST) or as query
+    parameters (GET, for EventSource clients). Emits ``analysis`` events,
+    one ``recommendation`` event per validated resource, then ``done`` once
+    the results are stored.
+    """
+    data = request.data if request.method == 'POST' else request.query_params
+    serializer = GenerateRecommendationSerializer(data=data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    student = get_object_or_404(Student.objects.with_courses(), student_id=serializer.validated_data['student_id'])
+    force_regenerate = serializer.validated_data['force_regenerate']
+    max_recommendations = serializer.validated_data['max_recommendations']
+    # Same answer as generate_recommendations, as the stream's only event
+    existing = existing_recommendations(student, max_recommendations, force_regenerate)
+
+    def events():
+        if existing is not None:
+            yield _sse('done', existing)
+            return
+        recommendations_data = []
+        try:
+            ai_engine = get_engine()
+            for event, payload in ai_engine.stream_recommendations(
+                student, max_recommendations, use_cache=use_llm_cache(force_regenerate),
+                mode=serializer.validated_data.get('mode')
+            ):
+                if event == 'recommendation':
+                    recommendations_data.append(payload)
+                    with timing.phase('serialize'):
+                        resource = LearningResourceSerializer(payload['resource']).data
+                    payload = {
+                        'resource': resource,
+                        'confidence_score': payload['confidence_score'],
+                        'reason': payload['reason'],
+                    }
+                yield _sse(event, payload)
+
+            created_recommendations = store_student_recommendations(
+                student, recommendations_data, force_regenerate
+            )
+            yield _sse('done', {
+                'message': f'Generated {len(created_recommendations)} recommendations',
+                'student_id': student.student_id,
+                'recommendation_ids': [r.id for r in created_recommendations],
+            })
+        except Exception as e:
+            logger.error(f"Error streaming recommendations: {e}")
+            yield _sse('error', {'error': 'Failed to generate recommendations', 'detail': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+    return response
+
+@api_view(['GET'])
+def get_recommendation_job(request, job_id):
+    """Poll the status and result of a queued recommendation job"""
+    job = get_object_or_404(RecommendationJob.objects.select_related('student'), job_id=job_id)
+    return Response(RecommendationJobSerializer(job).data)
+
+@conditional_get(student_recommendations_state)
 @api_view(['GET'])
 def get_student_recommendations(request, student_id):
-    """Retrieve all recommendations for a student"""
+    """Retrieve a student's recommendations, newest first, one page at a time"""
     try:
         student = get_object_or_404(Student, student_id=student_id)
         
         # Filter by status if provided
         status_filter = request.GET.get('status', None)
-        recommendations = student.recommendation_set.all()
+        # rec.student is already known to the related manager; only the resource needs a join
+        recommendations = student.recommendation_set.select_related('resource')
         
         if status_filter:
             recommendations = recommendations.filter(status=status_filter)
         
-        # Order by recommendation date (newest first)
-        recommendations = recommendations.order_by('-recommendation_date')
+        # Newest first; the id breaks ties between identical timestamps
+        paginator = KeysetPagination(ordering=('-recommendation_date', '-id'))
+        page = paginator.paginate_queryset(recommendations, request)
         
-        serializer = RecommendationSerializer(recommendations, many=True)
+        with timing.phase('serialize'):
+            serialized = RecommendationSerializer(page, many=True).data
+        data = paginator.get_paginated_data(serialized, 'recommendations')
+        if 'count' in data:
+            data['total_recommendations'] = data.pop('count')
         
         return Response({
             'student_id': student_id,
             'student_name': student.name,
-            'total_recommendations': recommendations.count(),
-            'recommendations': serializer.data
+            **data
         })
 
+    except NotFound as e:
+        return Response({
+            'error': 'Failed to retrieve recommendations',
+            'detail': str(e.detail)
+        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(f"Error retrieving recommendations: {e}")
         return Response({
@@ -152,15 +421,16 @@ def get_student_recommendations(request, student_id):
 def debug_recommendations(request, student_id):
     """Debug endpoint to check recommendation generation"""
     try:
-        student = get_object_or_404(Student, student_id=student_id)
+        student = get_object_or_404(Student.objects.with_courses(), student_id=student_id)
         
         # Basic checks
-        total_resources = LearningResource.objects.count()
+        catalog = get_catalog()
+        total_resources = len(catalog)
         existing_recommendations = student.recommendation_set.count()
         existing_resource_ids = list(student.recommendation_set.values_list('resource__id', flat=True))
         
         # Check AI engine
-        ai_engine = AIRecommendationEngine()
+        ai_engine = get_engine()
         
         debug_info = {
             'student_info': {
@@ -172,18 +442,21 @@ def debug_recommendations(request, student_id):
             },
             'resources_info': {
                 'total_resources': total_resources,
+                'catalog_version': catalog.version,
                 'existing_recommendations': existing_recommendations,
                 'existing_resource_ids': existing_resource_ids
             },
             'ai_info': {
                 'has_api_key': bool(settings.GEMINI_API_KEY),
-                'has_model': ai_engine.model is not None
+                'has_model': ai_engine.model is not None,
+                'llm_cache': ai_engine.cache.stats(),
+                'llm_resilience': resilience.get_policy().stats()
             }
         }
         
         # Try to get some sample resources
         sample_resources = []
-        for resource in LearningResource.objects.all()[:5]:
+        for resource in catalog.resources[:5]:
             sample_resources.append({
                 'id': resource.id,
                 'resource_id': resource.resource_id,
@@ -229,7 +502,9 @@ def debug_recommendations(request, student_id):
 def update_recommendation_status(request, recommendation_id):
     """Update the status of a specific recommendation"""
     try:
-        recommendation = get_object_or_404(Recommendation, id=recommendation_id)
+        recommendation = get_object_or_404(
+            Recommendation.objects.select_related('student', 'resource'), id=recommendation_id
+        )
         new_status = request.data.get('status')
         
         valid_statuses = ['recommended', 'viewed', 'completed', 'dismissed']
@@ -241,8 +516,9 @@ def update_recommendation_status(request, recommendation_id):
         recommendation.status = new_status
         recommendation.save()
         
-        serializer = RecommendationSerializer(recommendation)
-        return Response(serializer.data)
+        with timing.phase('serialize'):
+            data = RecommendationSerializer(recommendation).data
+        return Response(data)
 
     except Exception as e:
         logger.error(f"Error updating recommendation status: {e}")
@@ -255,49 +531,41 @@ def update_recommendation_status(request, recommendation_id):
 def get_analytics_dashboard(request):
     """Get system-wide analytics and insights"""
     try:
-        total_students = Student.objects.count()
-        total_resources = LearningResource.objects.count()
-        total_recommendations = Recommendation.objects.count()
-        
-        # Performance distribution
-        excellent_students = Student.objects.filter(performance_score__gte=85).count()
-        good_students = Student.objects.filter(
-            performance_score__gte=70, performance_score__lt=85
-        ).count()
-        average_students = Student.objects.filter(
-            performance_score__gte=50, performance_score__lt=70
-        ).count()
-        needs_improvement = Student.objects.filter(performance_score__lt=50).count()
-        
-        # Recommendation status distribution
-        rec_stats = {}
-        for status, _ in Recommendation.STATUS_CHOICES:
-            rec_stats[status] = Recommendation.objects.filter(status=status).count()
-        
-        # Resource type distribution
-        resource_stats = {}
-        for res_type, _ in LearningResource.RESOURCE_TYPES:
-            resource_stats[res_type] = LearningResource.objects.filter(type=res_type).count()
-
-        return Response({
-            'overview': {
-                'total_students': total_students,
-                'total_resources': total_resources,
-                'total_recommendations': total_recommendations
-            },
-            'performance_distribution': {
-                'excellent': excellent_students,
-                'good': good_students,
-                'average': average_students,
-                'needs_improvement': needs_improvement
-            },
-            'recommendation_status_distribution': rec_stats,
-            'resource_type_distribution': resource_stats
-        })
+        # ?source=live bypasses the rollup table
+        live = request.query_params.get('source') == 'live'
+        return Response(get_dashboard(live=live))
 
     except Exception as e:
         logger.error(f"Error generating analytics: {e}")
         return Response({
             'error': 'Failed to generate analytics',
             'detail': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _export(request, rows_func, basename):
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'error': f'Invalid format. Must be one of: {list(EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        names, rows = rows_func(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': 'Invalid export filter', 'detail': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(export_stream(fmt, names, rows), content_type=EXPORT_FORMATS[fmt])
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    response['Content-Disposition'] = f'attachment; filename="{basename}.{extension}"'
+    return response
+
+# Plain Django views: DRF would treat ?format= as a renderer override
+@require_GET
+def export_recommendations(request):
+    """Stream recommendations joined with student and resource fields (?format=ndjson|csv)"""
+    return _export(request, recommendation_rows, 'recommendations')
+
+@require_GET
+def export_students(request):
+    """Stream students (?format=ndjson|csv, ?since=&until= on created_at)"""
+    return _export(request, student_rows, 'students')
+
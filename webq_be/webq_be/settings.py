@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'webq_app.timing.ServerTimingMiddleware',  # outermost, so its total covers the others
+    'webq_app.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -99,8 +101,14 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'webq_app.pagination.KeysetPagination',
 }
 
+# List endpoints page with keyset cursors (?cursor=...&page_size=...)
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=50, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=500, cast=int)
+API_PAGINATION_INCLUDE_TOTAL = config('API_PAGINATION_INCLUDE_TOTAL', default=False, cast=bool)  # ?include_total=true per request
+
 # Fix 2: Enhanced CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -148,4 +156,93 @@ if not DEBUG:
 
 # AI Settings
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
-GROQ_API_KEY = config('GROQ_API_KEY', default='')
\ No newline at end of file
+GROQ_API_KEY = config('GROQ_API_KEY', default='')
+GROQ_BASE_URL = config('GROQ_BASE_URL', default='')  # empty uses the Groq default
+
+# Pooled HTTP transport shared by every request in a process
+GROQ_HTTP_MAX_CONNECTIONS = config('GROQ_HTTP_MAX_CONNECTIONS', default=20, cast=int)
+GROQ_HTTP_MAX_KEEPALIVE = config('GROQ_HTTP_MAX_KEEPALIVE', default=10, cast=int)
+GROQ_HTTP_KEEPALIVE_EXPIRY = config('GROQ_HTTP_KEEPALIVE_EXPIRY', default=30.0, cast=float)  # seconds
+GROQ_HTTP_TIMEOUT = config('GROQ_HTTP_TIMEOUT', default=30.0, cast=float)  # seconds
+GROQ_HTTP_CONNECT_TIMEOUT = config('GROQ_HTTP_CONNECT_TIMEOUT', default=5.0, cast=float)  # seconds
+GROQ_HTTP2 = config('GROQ_HTTP2', default=False, cast=bool)  # requires the 'h2' package
+
+# Resilience around Groq calls (webq_app.resilience). The budget bounds the
+# LLM time of one recommendation request across calls and retries; when it is
+# spent the rule-based ranking answers. 0 disables the budget, the timeout,
+# the breaker (threshold) or hedging
+LLM_LATENCY_BUDGET = config('LLM_LATENCY_BUDGET', default=12.0, cast=float)  # seconds per request
+LLM_ATTEMPT_TIMEOUT = config('LLM_ATTEMPT_TIMEOUT', default=8.0, cast=float)  # seconds per call
+LLM_MAX_RETRIES = config('LLM_MAX_RETRIES', default=2, cast=int)  # on timeouts, 429s and 5xx
+LLM_RETRY_BACKOFF_BASE = config('LLM_RETRY_BACKOFF_BASE', default=0.25, cast=float)  # seconds, full jitter
+LLM_RETRY_BACKOFF_CAP = config('LLM_RETRY_BACKOFF_CAP', default=2.0, cast=float)  # seconds; Retry-After wins
+LLM_BREAKER_FAILURE_THRESHOLD = config('LLM_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)  # consecutive failures
+LLM_BREAKER_RESET_TIMEOUT = config('LLM_BREAKER_RESET_TIMEOUT', default=30.0, cast=float)  # seconds open before a trial
+LLM_HEDGE_AFTER = config('LLM_HEDGE_AFTER', default=0.0, cast=float)  # seconds before a duplicate request
+
+# Candidate shortlist sent to the LLM (webq_app.candidates): the best-fitting
+# resources for the student, up to this many rows and this many prompt tokens
+LLM_PROMPT_CANDIDATES = config('LLM_PROMPT_CANDIDATES', default=20, cast=int)
+LLM_PROMPT_TOKEN_BUDGET = config('LLM_PROMPT_TOKEN_BUDGET', default=1200, cast=int)  # 0 = rows limit only
+
+# 'two_call' (analysis, then recommendations), 'single_call' (both in one prompt)
+# or 'similarity' (ranked locally by content similarity, no LLM call)
+AI_ENGINE_MODE = config('AI_ENGINE_MODE', default='two_call')
+
+# Local similarity index (webq_app.similarity): hashed TF-IDF vectors of
+# resource titles and descriptions. With a path, the index is saved there and
+# a restart only re-tokenizes changed resources (gunicorn.conf.py sets one)
+SIMILARITY_DIMENSIONS = config('SIMILARITY_DIMENSIONS', default=1024, cast=int)  # hash buckets per vector
+SIMILARITY_INDEX_PATH = config('SIMILARITY_INDEX_PATH', default='')  # '' = keep in memory only
+SIMILARITY_BUILD_IN_BACKGROUND = config('SIMILARITY_BUILD_IN_BACKGROUND', default=True, cast=bool)  # False = the first request after a catalog change builds it
+
+# 'groq' (the Groq API, needs GROQ_API_KEY), 'fake' (in-process stand-in for
+# offline tests and load runs) or a dotted path to a transport class
+LLM_TRANSPORT = config('LLM_TRANSPORT', default='groq')
+
+# Fake Groq behavior, for LLM_TRANSPORT=fake and manage.py run_fake_groq
+FAKE_GROQ_LATENCY_MS = config('FAKE_GROQ_LATENCY_MS', default=300.0, cast=float)  # median
+FAKE_GROQ_LATENCY_SIGMA = config('FAKE_GROQ_LATENCY_SIGMA', default=0.35, cast=float)  # lognormal spread, 0 = fixed
+FAKE_GROQ_RATE_LIMIT_RATE = config('FAKE_GROQ_RATE_LIMIT_RATE', default=0.0, cast=float)  # share of 429 responses
+FAKE_GROQ_RETRY_AFTER = config('FAKE_GROQ_RETRY_AFTER', default=1.0, cast=float)  # seconds, sent with 429s
+FAKE_GROQ_MALFORMED_RATE = config('FAKE_GROQ_MALFORMED_RATE', default=0.0, cast=float)  # share of truncated JSON
+FAKE_GROQ_SEED = config('FAKE_GROQ_SEED', default=0, cast=int)
+
+# Background recommendation jobs (manage.py run_recommendation_worker)
+RECOMMENDATION_WORKER_CONCURRENCY = config('RECOMMENDATION_WORKER_CONCURRENCY', default=4, cast=int)
+RECOMMENDATION_JOB_TIMEOUT = config('RECOMMENDATION_JOB_TIMEOUT', default=600, cast=int)  # seconds before a running job is requeued
+RECOMMENDATION_REQUEUE_INTERVAL = config('RECOMMENDATION_REQUEUE_INTERVAL', default=60, cast=float)  # seconds between a worker's sweeps for stale jobs
+
+# Students per synchronous POST /api/recommendations/batch/. Each costs one or
+# two LLM calls, so larger lists must be queued with "background": true
+BULK_GENERATE_MAX_STUDENTS = config('BULK_GENERATE_MAX_STUDENTS', default=100, cast=int)
+BULK_GENERATE_MAX_QUEUED = config('BULK_GENERATE_MAX_QUEUED', default=10000, cast=int)  # students per background batch
+
+# Server-Timing header and a JSON 'request_timing' log line per request with
+# DB, LLM, prompt, parse and serialization phases (webq_app.timing)
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=DEBUG, cast=bool)
+
+# Prometheus metrics at /metrics (webq_app.metrics). The endpoint has no auth,
+# so it is off outside DEBUG: enable it where only the scraper can reach it.
+# Under gunicorn, gunicorn.conf.py sets up PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = config('METRICS_ENABLED', default=DEBUG, cast=bool)
+
+# Resource catalog snapshot (webq_app.catalog): how often to check whether
+# another process changed the table, and when to reload regardless
+CATALOG_CHECK_INTERVAL = config('CATALOG_CHECK_INTERVAL', default=5.0, cast=float)  # seconds, 0 = never
+CATALOG_MAX_AGE = config('CATALOG_MAX_AGE', default=300.0, cast=float)  # seconds, 0 = never
+
+# Bulk resource imports and streaming exports
+RESOURCE_IMPORT_BATCH_SIZE = config('RESOURCE_IMPORT_BATCH_SIZE', default=1000, cast=int)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)  # rows per fetch for /api/exports/
+
+# LLM response cache: 'tiered' (memory + database), 'memory', 'database',
+# 'none' or a dotted path to a BaseResponseCache subclass
+LLM_CACHE_BACKEND = config('LLM_CACHE_BACKEND', default='tiered')
+LLM_CACHE_TTL = config('LLM_CACHE_TTL', default=3600, cast=int)  # seconds
+LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=1024, cast=int)
+LLM_CACHE_BYPASS_ON_FORCE_REGENERATE = config('LLM_CACHE_BYPASS_ON_FORCE_REGENERATE', default=True, cast=bool)
+
+# Serve the analytics dashboard from the incrementally maintained rollup
+# table (manage.py rebuild_analytics_rollup) instead of counting live
+ANALYTICS_USE_ROLLUP = config('ANALYTICS_USE_ROLLUP', default=False, cast=bool)
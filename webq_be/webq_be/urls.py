@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from webq_app.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('webq_app.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]